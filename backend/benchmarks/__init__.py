@@ -0,0 +1,67 @@
+#бенчмарки запускаются из папки backend, например: python -m benchmarks.serialization
+#каждый поднимает отдельную тестовую БД, рабочая db.sqlite3 не трогается
+import atexit
+import os
+import shutil
+import tempfile
+import time
+
+import django
+
+def setup(debug=False, file_database=False, throttle=False):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tictactoe.settings')
+    django.setup()
+
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment(debug=debug)
+    #бенчмарки шлют запросы подряд от одного пользователя - бюджеты GAME_THROTTLE_RATES ответили бы 429
+    #и мерили бы отказ, а не запрос; ограничение включает только нагрузочный тест
+    settings.GAME_THROTTLE_ENABLED = throttle
+    if file_database and connection.vendor == 'sqlite':
+        #in-memory БД SQLite при записи из нескольких потоков не ждет блокировку, а сразу падает
+        #с "database table is locked"; для параллельных бенчмарков - временный файл
+        directory = tempfile.mkdtemp()
+        atexit.register(shutil.rmtree, directory, True)
+        connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=0)
+
+def make_users(count, prefix='bench'):
+    from django.contrib.auth.models import User
+    from game.models import UserProfile
+
+    users = [User.objects.create_user(f'{prefix}{i}', password='bench-password') for i in range(count)]
+    UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+    return users
+
+def start_game(player_x, player_o, **board_options):
+    from game.models import Room, Game
+
+    room = Room.objects.create(name='bench', creator=player_x, **board_options)
+    room.add_player(player_x)
+    room.add_player(player_o)
+    room.status = Room.PLAYING
+    room.touch('status')
+    game = Game.objects.create(room=room, player_x=player_x, player_o=player_o,
+                               board_size=room.board_size, win_length=room.win_length)
+    return room, game
+
+def measure(func, iterations):
+    #среднее время вызова в микросекундах и число SQL-запросов на вызов
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    func()
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - started
+    return elapsed / iterations * 1e6, len(queries) / iterations
+
+def print_table(headers, rows):
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    for line in [headers, ['-' * width for width in widths], *rows]:
+        print('  '.join(str(value).ljust(width) for value, width in zip(line, widths)))
@@ -0,0 +1,71 @@
+#стоимость аутентификации частого опроса: сессия в БД + пользователь из БД (как было) против
+#сессии из кэша (cached_db) + пользователя из кэша процесса и против подписанного токена.
+#Запросы - те, что фронтенд шлет по таймеру: состояние комнаты (GameRoom.js) и список комнат (RoomList.js)
+import argparse
+
+from benchmarks import setup, make_users, start_game, measure, print_table
+
+#чтение сессии и пользователя сессии; остальные запросы к auth_user (создатель и игроки комнат) - работа view
+AUTH_QUERIES = ('FROM "django_session"', 'FROM "auth_user" WHERE "auth_user"."id" =')
+
+def modes():
+    #(название, настройки сессий и бэкендов, по токену ли)
+    db_session = {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+    }
+    cached_session = {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'AUTHENTICATION_BACKENDS': ['game.authentication.CachedModelBackend'],
+    }
+    return [
+        ('session db', db_session, False),
+        ('session cached_db', cached_session, False),
+        ('token', cached_session, True),
+    ]
+
+def auth_queries(func):
+    #SQL-запросы аутентификации за один вызов
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    return sum(any(pattern in query['sql'] for pattern in AUTH_QUERIES) for query in queries)
+
+def main():
+    parser = argparse.ArgumentParser(description='Стоимость аутентификации частых запросов')
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup()
+    from django.test import Client
+    from django.test.utils import override_settings
+    from game.authentication import get_user_cache, make_token
+
+    player_x, player_o = make_users(2)
+    room, game = start_game(player_x, player_o)
+    game.make_move(1, 1, player_x)
+
+    rows = []
+    for name, options, use_token in modes():
+        with override_settings(**options):
+            get_user_cache()._users.clear()
+            client = Client()
+            if use_token:
+                client.defaults['HTTP_AUTHORIZATION'] = f'Token {make_token(player_x)}'
+            else:
+                client.force_login(player_x)
+
+            for endpoint, func in [
+                ('GET /api/rooms/<id>/?view=compact', lambda: client.get(f'/api/rooms/{room.id}/', {'view': 'compact'})),
+                ('GET /api/rooms/', lambda: client.get('/api/rooms/')),
+            ]:
+                assert func().status_code == 200
+                micros, queries = measure(func, args.iterations)
+                rows.append([name, endpoint, f'{micros:.1f}', f'{queries:.1f}', auth_queries(func)])
+
+    print_table(['режим', 'запрос', 'мкс/запрос', 'SQL/запрос', 'SQL аутентификации'], rows)
+
+if __name__ == '__main__':
+    main()
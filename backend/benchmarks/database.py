@@ -0,0 +1,145 @@
+#пропускная способность записи ходов при параллельных игроках на текущей БД (см. DB_ENGINE в settings.py).
+#SQLite: настройки по умолчанию против OPTIONS из settings.py (WAL, busy_timeout, synchronous=NORMAL, BEGIN IMMEDIATE);
+#PostgreSQL: новое соединение на каждый запрос против постоянных соединений (CONN_MAX_AGE).
+#Каждая операция ведет себя как запрос: в конце close_old_connections(), как после ответа Django.
+#Писатель - игрок со своей партией: в транзакции читает игру и делает ход условным UPDATE;
+#читатели параллельно листают список комнат
+#  python -m benchmarks.database --writers 8 --readers 4 --duration 5
+#  DB_ENGINE=postgresql DB_NAME=tictactoe python -m benchmarks.database
+import argparse
+import random
+import threading
+import time
+
+from benchmarks import setup, make_users, start_game, print_table
+from benchmarks.loadtest import percentile
+
+#режим журнала сохраняется в файле БД, поэтому для сравнения возвращаем его явно
+SQLITE_DEFAULTS = {'init_command': 'PRAGMA journal_mode = DELETE; PRAGMA synchronous = FULL'}
+
+#поле без реальных шансов на победу: партия идет, пока не заполнится
+BOARD = {'board_size': 15, 'win_length': 15}
+
+def modes():
+    #(название, OPTIONS соединения, CONN_MAX_AGE)
+    from django.conf import settings
+    from django.db import connection
+
+    database = settings.DATABASES['default']
+    conn_max_age = database['CONN_MAX_AGE'] or 60
+    if connection.vendor == 'sqlite':
+        return [
+            ('sqlite default', SQLITE_DEFAULTS, 0),
+            ('sqlite tuned', database['OPTIONS'], conn_max_age),
+        ]
+    return [
+        (f'{connection.vendor} CONN_MAX_AGE=0', database['OPTIONS'], 0),
+        (f'{connection.vendor} CONN_MAX_AGE={conn_max_age}', database['OPTIONS'], conn_max_age),
+    ]
+
+class Worker(threading.Thread):
+    def __init__(self, operation, deadline):
+        super().__init__(daemon=True)
+        self.operation = operation
+        self.deadline = deadline
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        from django.db import DatabaseError, close_old_connections, connection
+
+        try:
+            while time.monotonic() < self.deadline:
+                started = time.perf_counter()
+                try:
+                    self.operation()
+                except DatabaseError:
+                    #"database is locked" и подобное - в реальном сервере это 500
+                    self.errors += 1
+                else:
+                    self.latencies.append(time.perf_counter() - started)
+                close_old_connections()
+        finally:
+            connection.close()
+
+def writer_operation(game_id):
+    from django.db import transaction
+    from game.models import Game, StaleGameError
+
+    rng = random.Random(game_id)
+
+    def operation():
+        with transaction.atomic():
+            game = Game.objects.select_related('player_x', 'player_o').get(pk=game_id)
+            x_bits, o_bits = game.bitboards
+            free = [cell for cell in range(game.geometry.cells) if not (x_bits | o_bits) >> cell & 1]
+            if not free or game.status != Game.ONGOING:
+                #новая партия в той же строке
+                game.save_if_unchanged(board_state=game.geometry.pack(0, 0), moves=b'', current_turn=Game.X,
+                                       status=Game.ONGOING, winner_id=None, finished_at=None)
+                return
+            row, col = divmod(rng.choice(free), game.geometry.size)
+            player = game.player_x if game.current_turn == Game.X else game.player_o
+            try:
+                game.make_move(row, col, player)
+            except StaleGameError:
+                pass
+
+    return operation
+
+def reader_operation():
+    from game.models import Room
+
+    list(Room.objects.filter(status=Room.PLAYING).order_by('-created_at').values('id', 'name', 'player_count')[:20])
+
+def run_mode(name, options, conn_max_age, game_ids, readers, duration):
+    from django.db import connection, connections
+
+    #настройки читаются при открытии соединения, а у каждого потока оно свое и новое
+    connection.close()
+    connections.settings['default'].update(OPTIONS=dict(options), CONN_MAX_AGE=conn_max_age)
+
+    deadline = time.monotonic() + duration
+    writers = [Worker(writer_operation(game_id), deadline) for game_id in game_ids]
+    reader_threads = [Worker(reader_operation, deadline) for _ in range(readers)]
+    started = time.perf_counter()
+    for worker in writers + reader_threads:
+        worker.start()
+    for worker in writers + reader_threads:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    writes = sorted(latency * 1000 for worker in writers for latency in worker.latencies)
+    reads = sum(len(worker.latencies) for worker in reader_threads)
+    return [
+        name,
+        len(writes),
+        f'{len(writes) / elapsed:.1f}',
+        f'{percentile(writes, 0.5):.1f}' if writes else '-',
+        f'{percentile(writes, 0.95):.1f}' if writes else '-',
+        sum(worker.errors for worker in writers),
+        f'{reads / elapsed:.1f}',
+        sum(worker.errors for worker in reader_threads),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description='Запись ходов при параллельных игроках в разных режимах БД')
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=5, help='секунд на каждый режим')
+    args = parser.parse_args()
+
+    setup(file_database=True)
+
+    users = make_users(args.writers * 2)
+    game_ids = [start_game(users[i], users[i + 1], **BOARD)[1].id for i in range(0, len(users), 2)]
+
+    rows = [
+        run_mode(name, options, conn_max_age, game_ids, args.readers, args.duration)
+        for name, options, conn_max_age in modes()
+    ]
+    print(f"{args.writers} писателей, {args.readers} читателей, {args.duration:g} с на режим")
+    print_table(['mode', 'writes', 'writes/s', 'p50 ms', 'p95 ms', 'write errors', 'reads/s', 'read errors'], rows)
+
+if __name__ == '__main__':
+    main()
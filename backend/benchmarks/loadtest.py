@@ -0,0 +1,261 @@
+#нагрузочный тест API: N игроков параллельно проходят регистрация/логин -> quick_game -> опрос room_detail ->
+#ходы -> leave_room. По каждому эндпоинту печатается пропускная способность, p50/p95/p99 задержки
+#и число SQL-запросов на запрос. На 429 игрок, как фронтенд, ждет Retry-After секунд и повторяет запрос.
+#По умолчанию запросы идут в этом же процессе через тестовый клиент Django на отдельной тестовой БД;
+#с --url - по HTTP к запущенному серверу (SQL-запросы тогда не считаются)
+import argparse
+import http.cookiejar
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import setup, print_table
+
+_ID_RE = re.compile(r'/\d+/')
+
+def endpoint_name(method, path):
+    #id комнат в пути заменяем, чтобы запросы к разным комнатам попали в одну строку отчета
+    return f"{method} {_ID_RE.sub('/<id>/', path.split('?')[0])}"
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(list)  # эндпоинт -> [(секунды, SQL-запросы или None, статус)]
+        self.counters = defaultdict(int)
+
+    def add(self, endpoint, seconds, queries, status_code):
+        with self._lock:
+            self._samples[endpoint].append((seconds, queries, status_code))
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def rows(self, elapsed):
+        rows = []
+        for endpoint, samples in sorted(self._samples.items()):
+            latencies = sorted(seconds * 1000 for seconds, _, _ in samples)
+            queries = [count for _, count, _ in samples if count is not None]
+            errors = sum(1 for _, _, status_code in samples if status_code >= 500)
+            throttled = sum(1 for _, _, status_code in samples if status_code == 429)
+            rows.append([
+                endpoint,
+                len(samples),
+                f'{len(samples) / elapsed:.1f}',
+                f'{percentile(latencies, 0.5):.1f}',
+                f'{percentile(latencies, 0.95):.1f}',
+                f'{percentile(latencies, 0.99):.1f}',
+                f'{sum(queries) / len(queries):.1f}' if queries else '-',
+                throttled,
+                errors,
+            ])
+        return rows
+
+    def p95(self):
+        return {
+            endpoint: percentile(sorted(seconds * 1000 for seconds, _, _ in samples), 0.95)
+            for endpoint, samples in self._samples.items()
+        }
+
+    def server_errors(self):
+        return sum(1 for samples in self._samples.values() for _, _, status_code in samples if status_code >= 500)
+
+class InProcessTransport:
+    #тестовый клиент Django: своя сессия на игрока, SQL-запросы считаются на соединении потока
+    def __init__(self, recorder):
+        from django.test import Client
+
+        self.recorder = recorder
+        self.client = Client(raise_request_exception=False)
+
+    def request(self, method, path, data=None):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                if method == 'GET':
+                    response = self.client.get(path)
+                else:
+                    response = self.client.post(path, data or {}, content_type='application/json')
+                elapsed = time.perf_counter() - started
+            self.recorder.add(endpoint_name(method, path), elapsed, len(queries), response.status_code)
+            if response.status_code != 429:
+                break
+            time.sleep(float(response['Retry-After']))
+        if response.get('Content-Type') != 'application/json':
+            return response.status_code, None
+        return response.status_code, json.loads(response.content)
+
+    def close(self):
+        from django.db import connection
+
+        connection.close()
+
+class HttpTransport:
+    #HTTP к запущенному серверу: сессионная кука и CSRF-токен, как у фронтенда
+    def __init__(self, recorder, base_url):
+        self.recorder = recorder
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+        self.opener.open(f'{self.base_url}/api/csrf/').read()
+
+    def _csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def request(self, method, path, data=None):
+        headers = {}
+        body = None
+        if method != 'GET':
+            headers = {'Content-Type': 'application/json', 'X-CSRFToken': self._csrf_token(), 'Referer': self.base_url}
+            body = json.dumps(data or {}).encode()
+        request = urllib.request.Request(f'{self.base_url}{path}', data=body, headers=headers, method=method)
+
+        while True:
+            started = time.perf_counter()
+            try:
+                with self.opener.open(request) as response:
+                    status_code, content = response.status, response.read()
+            except urllib.error.HTTPError as error:
+                status_code, content = error.code, error.read()
+                retry_after = error.headers.get('Retry-After')
+            elapsed = time.perf_counter() - started
+            self.recorder.add(endpoint_name(method, path), elapsed, None, status_code)
+            if status_code != 429:
+                break
+            time.sleep(float(retry_after or 1))
+        if not content or status_code >= 500:
+            return status_code, None
+        return status_code, json.loads(content)
+
+    def close(self):
+        pass
+
+def wait_for_opponent(transport, room_id, timeout, poll_interval):
+    #полная информация о комнате, когда в ней началась игра, или None по таймауту
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status_code, data = transport.request('GET', f'/api/rooms/{room_id}/')
+        if status_code == 200 and data['game']:
+            return data
+        time.sleep(poll_interval)
+    return None
+
+def play_game(transport, room_id, symbol, rng, poll_interval, timeout):
+    #ходим в случайную свободную клетку, пока игра не закончится; опрос - компактным ответом.
+    #Соперник, который не ходит дольше timeout (например, его запрос упал с 5xx), - партия не засчитывается
+    deadline = time.monotonic() + timeout
+    while True:
+        status_code, state = transport.request('GET', f'/api/rooms/{room_id}/?view=compact')
+        if status_code != 200 or state['status'] != 'ongoing':
+            return status_code == 200
+        if state['current_turn'] != symbol:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(poll_interval)
+            continue
+        deadline = time.monotonic() + timeout
+        free = [(row, col) for row, cells in enumerate(state['board']) for col, cell in enumerate(cells) if not cell]
+        row, col = rng.choice(free)
+        #409 (соперник или повтор успел изменить игру) - просто перечитываем состояние
+        transport.request('POST', f'/api/rooms/{room_id}/move/?view=compact', {'row': row, 'col': col})
+
+def run_player(make_transport, recorder, index, args):
+    rng = random.Random(args.seed * 100003 + index)
+    transport = make_transport()
+    try:
+        username = f'load{args.run_id}_{index}'
+        password = 'load-test-password'
+        transport.request('POST', '/api/register/', {
+            'username': username, 'email': f'{username}@example.com',
+            'password': password, 'password_confirm': password,
+        })
+        status_code, data = transport.request('POST', '/api/login/', {'username': username, 'password': password})
+        if status_code != 200:
+            recorder.count('login_failed')
+            return
+        user_id = data['user']['id']
+
+        for _ in range(args.games):
+            #если пары не нашлось (оба игрока одновременно создали по комнате), выходим и ищем заново
+            for _ in range(args.match_attempts):
+                status_code, data = transport.request('POST', '/api/quick-game/', {'board_size': args.board_size})
+                if status_code != 200:
+                    recorder.count('quick_game_failed')
+                    break
+                room_id = data['room']['id']
+                room = wait_for_opponent(transport, room_id, args.match_timeout, args.poll_interval)
+                if room:
+                    symbol = 'X' if room['game']['player_x']['id'] == user_id else 'O'
+                    if play_game(transport, room_id, symbol, rng, args.poll_interval, args.match_timeout):
+                        recorder.count('games_played')
+                    transport.request('POST', f'/api/rooms/{room_id}/leave/')
+                    break
+                recorder.count('match_timeouts')
+                transport.request('POST', f'/api/rooms/{room_id}/leave/')
+            else:
+                recorder.count('unmatched')
+    finally:
+        transport.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест API игры')
+    parser.add_argument('--players', type=int, default=20, help='число одновременных игроков')
+    parser.add_argument('--games', type=int, default=3, help='игр на игрока')
+    parser.add_argument('--board-size', type=int, default=3)
+    parser.add_argument('--poll-interval', type=float, default=0.01, help='пауза между опросами room_detail, сек')
+    parser.add_argument('--match-timeout', type=float, default=5, help='сколько ждать соперника (и его хода), сек')
+    parser.add_argument('--match-attempts', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--url', help='адрес запущенного сервера, например http://127.0.0.1:8000')
+    parser.add_argument('--max-p95', type=float, help='порог p95 в мс: при превышении код выхода 1')
+    parser.add_argument('--no-throttle', action='store_true', help='без ограничения частоты запросов (только без --url)')
+    args = parser.parse_args()
+    args.run_id = int(time.time())
+
+    recorder = Recorder()
+    if args.url:
+        make_transport = lambda: HttpTransport(recorder, args.url)
+    else:
+        #--no-throttle - предельная пропускная способность: игроки опрашивают комнату без пауз
+        setup(file_database=True, throttle=not args.no_throttle)
+        from django.conf import settings
+
+        #регистрация/логин меряют view, а не PBKDF2 (он занимает сотни мс и держит GIL)
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        make_transport = lambda: InProcessTransport(recorder)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.players) as executor:
+        for future in [executor.submit(run_player, make_transport, recorder, index, args) for index in range(args.players)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    print_table(['эндпоинт', 'запросов', 'rps', 'p50 мс', 'p95 мс', 'p99 мс', 'SQL/запрос', '429', '5xx'], recorder.rows(elapsed))
+    total = sum(int(row[1]) for row in recorder.rows(elapsed))
+    print()
+    print(f"игроков: {args.players}, время: {elapsed:.1f} с, запросов: {total} ({total / elapsed:.1f} rps)")
+    print(', '.join(f'{name}: {value}' for name, value in sorted(recorder.counters.items())))
+
+    failed = recorder.server_errors() > 0
+    if args.max_p95 is not None:
+        slow = {endpoint: p95 for endpoint, p95 in recorder.p95().items() if p95 > args.max_p95}
+        for endpoint, p95 in sorted(slow.items()):
+            print(f'p95 {endpoint}: {p95:.1f} мс > {args.max_p95} мс')
+        failed = failed or bool(slow)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
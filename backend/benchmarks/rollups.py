@@ -0,0 +1,91 @@
+#история статистики: агрегаты по партиям (Game по finished_at) против чтения сводок game/rollups.py,
+#которые завершение партии пополняет приращениями. Заодно - время пересчета истории backfill_stats
+import argparse
+import datetime
+import random
+import time
+from datetime import timedelta
+
+from benchmarks import setup, make_users, measure, print_table
+
+def scan_user_history(user_id, since):
+    #как без сводок: группировка партий игрока по дню finished_at
+    from django.db.models import Avg, Count, F, Q
+    from django.db.models.functions import TruncDate
+    from game import rollups
+    from game.models import Game
+
+    start, _ = rollups.day_bounds(since)
+    return list(Game.objects.filter(
+        Q(player_x_id=user_id) | Q(player_o_id=user_id), finished_at__gte=start
+    ).exclude(status=Game.ONGOING).annotate(period=TruncDate('finished_at', tzinfo=datetime.timezone.utc)).values('period').annotate(
+        games_played=Count('id'),
+        wins=Count('id', filter=Q(winner_id=user_id)),
+        draws=Count('id', filter=Q(status=Game.DRAW)),
+        avg_duration=Avg(F('finished_at') - F('created_at')),
+    ).order_by('period'))
+
+def scan_global_history(since):
+    from django.db.models import Count, Q
+    from django.db.models.functions import TruncHour
+    from game.models import Game
+
+    return list(Game.objects.filter(finished_at__gte=since).exclude(status=Game.ONGOING).annotate(
+        period=TruncHour('finished_at')
+    ).values('period').annotate(
+        games_played=Count('id'), draws=Count('id', filter=Q(status=Game.DRAW)),
+    ).order_by('period'))
+
+def main():
+    parser = argparse.ArgumentParser(description='История статистики: сводки против агрегатов по партиям')
+    parser.add_argument('--games', type=int, default=50000)
+    parser.add_argument('--players', type=int, default=50)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    from django.db.models import F
+    from django.utils import timezone
+    from game import rollups
+    from game.models import Game
+
+    users = make_users(args.players)
+    now = timezone.now()
+    games = []
+    for _ in range(args.games):
+        player_x, player_o = random.sample(users, 2)
+        status = random.choice([Game.X_WINS, Game.O_WINS, Game.DRAW])
+        winner = {Game.X_WINS: player_x, Game.O_WINS: player_o}.get(status)
+        games.append(Game(player_x=player_x, player_o=player_o, status=status, winner=winner,
+                          finished_at=now - timedelta(seconds=random.uniform(0, args.days * 86400))))
+    Game.objects.bulk_create(games, batch_size=2000)
+    #created_at проставляется при вставке текущим временем - сдвигаем на длительность партии
+    Game.objects.update(created_at=F('finished_at') - timedelta(seconds=30))
+
+    started = time.perf_counter()
+    today = rollups.today()
+    day = rollups.first_game_day()
+    while day <= today:
+        rollups.rebuild_day(day)
+        day += timedelta(days=1)
+    backfill = time.perf_counter() - started
+
+    user_id = users[0].id
+    since = today - timedelta(days=29)
+    hour_since = rollups.hour_of(now - timedelta(days=1))
+    rows = []
+    for name, func in [
+        ('игрок, 30 дней: агрегаты по партиям', lambda: scan_user_history(user_id, since)),
+        ('игрок, 30 дней: сводки', lambda: rollups.user_history(user_id, since)),
+        ('все, 24 часа: агрегаты по партиям', lambda: scan_global_history(hour_since)),
+        ('все, 24 часа: сводки', lambda: rollups.global_history(hour_since)),
+    ]:
+        micros, queries = measure(func, args.iterations)
+        rows.append([name, f'{micros / 1000:.2f}', f'{queries:.0f}'])
+
+    print_table(['история', 'мс', 'SQL'], rows)
+    print(f'\nПересчет {args.games} партий за {args.days} дней: {backfill:.1f} с')
+
+if __name__ == '__main__':
+    main()
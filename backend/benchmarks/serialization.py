@@ -0,0 +1,66 @@
+#сравнение стоимости ответа room_detail/make_move: полные вложенные сериализаторы против ?view=compact
+import argparse
+
+from benchmarks import setup, make_users, start_game, measure, print_table
+
+def main():
+    parser = argparse.ArgumentParser(description='Стоимость полного и компактного ответа room_detail')
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup()
+    from django.test import Client
+    from game.authentication import make_token
+    from game.models import Room, Game
+    from game.serializers import RoomSerializer, GameSerializer, COMPACT_GAME_FIELDS, compact_game_row, compact_game_data
+
+    player_x, player_o = make_users(2)
+    room, game = start_game(player_x, player_o)
+    for row, col, player in [(0, 0, player_x), (1, 1, player_o), (2, 2, player_x)]:
+        game.make_move(row, col, player)
+
+    def full_serializers():
+        #то, что делает room_detail без ?view=compact: комната, игроки, игра со вложенной комнатой
+        fresh_room = Room.objects.get(id=room.id)
+        data = RoomSerializer(fresh_room).data
+        data['game'] = GameSerializer(fresh_room.game).data
+
+    def compact_from_row():
+        row = Game.objects.filter(room_id=room.id).values_list(*COMPACT_GAME_FIELDS).first()
+        compact_game_row(row, '1.3')
+
+    def full_serializers_no_db():
+        GameSerializer(game).data
+
+    def compact_no_db():
+        compact_game_data(game, '1.3')
+
+    #room_detail - async view (_async_view): force_authenticate из APIClient до нее не доходит, а 403 мерить
+    #незачем. Входим токеном, как опрашивающий клиент
+    client = Client(HTTP_AUTHORIZATION=f'Token {make_token(player_x)}')
+
+    def request_full():
+        return client.get(f'/api/rooms/{room.id}/')
+
+    def request_compact():
+        return client.get(f'/api/rooms/{room.id}/', {'view': 'compact'})
+
+    assert request_full().status_code == 200
+    assert request_compact().status_code == 200
+
+    rows = []
+    for name, func in [
+        ('GameSerializer (объект в памяти)', full_serializers_no_db),
+        ('compact_game_data (объект в памяти)', compact_no_db),
+        ('room_detail: сериализация + чтение', full_serializers),
+        ('room_detail compact: сериализация + чтение', compact_from_row),
+        ('GET /api/rooms/<id>/', request_full),
+        ('GET /api/rooms/<id>/?view=compact', request_compact),
+    ]:
+        micros, queries = measure(func, args.iterations)
+        rows.append([name, f'{micros:.1f}', f'{queries:.1f}'])
+
+    print_table(['сценарий', 'мкс/запрос', 'SQL/запрос'], rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#режим зрителя: стоимость раздачи одной партии N зрителям после каждого хода. Каждый зритель читает комнату
+#один раз после хода; сравниваются чтение из БД с сериализаторами на каждый запрос и общий снимок
+#(game/spectators.py). Время и SQL на зрителя должны оставаться постоянными при росте N.
+#Без снимка каждый запрос делает одно и то же, поэтому этот режим меряется на первых --sample зрителях
+import argparse
+import json
+import time
+
+from benchmarks import setup, make_users, start_game, print_table
+
+MOVES = [(0, 0), (1, 1), (2, 2), (0, 2), (2, 0), (1, 0)]
+
+def main():
+    parser = argparse.ArgumentParser(description='Раздача состояния партии зрителям')
+    parser.add_argument('--viewers', type=int, nargs='+', default=[2, 100, 10000])
+    parser.add_argument('--moves', type=int, default=3)
+    parser.add_argument('--sample', type=int, default=500)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+    from game.cache import game_cache
+    from game.models import Room
+    from game.serializers import RoomSerializer, GameSerializer
+    from game.spectators import get_snapshots
+
+    def per_request(room_id):
+        #что пришлось бы делать room_detail для каждого зрителя без общего снимка
+        room = Room.objects.get(id=room_id)
+        data = RoomSerializer(room).data
+        data['game'] = GameSerializer(room.game).data
+        return json.dumps(data).encode()
+
+    def snapshot(room_id):
+        snapshots = get_snapshots()
+        return (snapshots.peek(room_id) or snapshots.get(room_id)).body
+
+    queries = 0
+
+    def count_query(execute, sql, params, many, context):
+        #CaptureQueriesContext хранит не больше 9000 запросов - на 10000 зрителей считаем сами
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    player_x, player_o = make_users(2)
+    rows = []
+    for name, serve, sample in [
+        ('БД + сериализаторы на запрос', per_request, args.sample),
+        ('общий снимок', snapshot, None),
+    ]:
+        for viewers in args.viewers:
+            measured = min(viewers, sample or viewers)
+            room, game = start_game(player_x, player_o)
+            builds = get_snapshots().stats().get('builds', 0)
+            elapsed = 0
+            queries = 0
+            for row, col in MOVES[:args.moves]:
+                game.make_move(row, col, player_x if game.current_turn == 'X' else player_o)
+                game_cache.store_game(room.id, game)
+                with connection.execute_wrapper(count_query):
+                    started = time.perf_counter()
+                    for _ in range(measured):
+                        serve(room.id)
+                    elapsed += time.perf_counter() - started
+            reads = measured * args.moves
+            rows.append([
+                name, viewers, f'{elapsed / reads * 1e6:.1f}', f'{queries / reads:.3f}',
+                get_snapshots().stats().get('builds', 0) - builds,
+            ])
+
+    print_table(['режим', 'зрителей', 'мкс/зритель', 'SQL/зритель', 'сборок снимка'], rows)
+
+if __name__ == '__main__':
+    main()
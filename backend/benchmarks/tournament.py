@@ -0,0 +1,92 @@
+#турниры: создание тура пачкой (game/tournaments.py) против комнаты за комнатой, как их создает create_room,
+#и таблица одним запросом с агрегатами против подсчета по партиям в Python
+import argparse
+import time
+
+from benchmarks import setup, make_users, print_table
+
+def per_room_round(tournament, round_number, pairs):
+    #как без bulk_create: Room.save с подбором кода, два add_player и партия - на каждый матч отдельно
+    from game.models import Room, Game
+
+    for player_x_id, player_o_id in pairs:
+        room = Room.objects.create(name=tournament.name, creator_id=tournament.creator_id, status=Room.PLAYING)
+        room.add_player(player_x_id)
+        room.add_player(player_o_id)
+        Game.objects.create(room=room, player_x_id=player_x_id, player_o_id=player_o_id,
+                            tournament=tournament, tournament_round=round_number)
+
+def python_standings(tournament):
+    #таблица циклом по партиям: участники, затем каждая партия каждого участника
+    from django.db.models import Q
+    from game.models import Game
+
+    rows = []
+    for entry in tournament.entries.select_related('user'):
+        wins = draws = played = 0
+        games = Game.objects.filter(Q(player_x=entry.user) | Q(player_o=entry.user), tournament=tournament)
+        for game in games.exclude(status=Game.ONGOING):
+            played += 1
+            wins += game.winner_id == entry.user_id
+            draws += game.status == Game.DRAW
+        rows.append((entry.user.username, played, wins, draws))
+    return rows
+
+def finish_round(tournament):
+    from django.db.models import F
+    from game.models import Game
+
+    Game.objects.filter(tournament=tournament, status=Game.ONGOING).update(
+        status=Game.X_WINS, winner=F('player_x')
+    )
+
+def timed(func):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+    return elapsed * 1000, len(queries)
+
+def main():
+    parser = argparse.ArgumentParser(description='Создание тура и таблица турнира')
+    parser.add_argument('--players', type=int, default=64)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import transaction
+    from game import tournaments
+    from game.models import Tournament, TournamentPlayer
+
+    users = make_users(args.players)
+    tournament = Tournament.objects.create(name='bench', creator=users[0])
+    TournamentPlayer.objects.bulk_create([
+        TournamentPlayer(tournament=tournament, user=user, seed=seed) for seed, user in enumerate(users, 1)
+    ])
+    user_ids = [user.id for user in users]
+
+    rows = []
+    for round_number, (name, create) in enumerate([
+        ('комната за комнатой', per_room_round),
+        ('bulk_create', tournaments._create_round),
+    ], 1):
+        pairs = tournaments.round_robin_pairs(user_ids, round_number)
+
+        def create_round():
+            with transaction.atomic():
+                create(tournament, round_number, pairs)
+
+        millis, queries = timed(create_round)
+        rows.append([f'тур: {name}', len(pairs), f'{millis:.1f}', queries])
+        finish_round(tournament)
+
+    for name, func in [('таблица: цикл в Python', python_standings), ('таблица: агрегаты в БД', tournaments.standings)]:
+        millis, queries = timed(lambda: func(tournament))
+        rows.append([name, args.players, f'{millis:.1f}', queries])
+
+    print_table(['операция', 'матчей/игроков', 'мс', 'SQL'], rows)
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile, Room, Game
+from .models import UserProfile, Room, Game, Tournament, TournamentPlayer, UserDailyStats, HourlyStats
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -16,7 +16,33 @@ class RoomAdmin(admin.ModelAdmin):
 
 @admin.register(Game)
 class GameAdmin(admin.ModelAdmin):
-    list_display = ['room', 'player_x', 'player_o', 'current_turn', 'status', 'winner', 'created_at']
+    list_display = ['room_name', 'room_code', 'player_x', 'player_o', 'current_turn', 'status', 'winner', 'created_at']
     list_filter = ['status', 'current_turn', 'created_at']
-    search_fields = ['room__name', 'player_x__username', 'player_o__username']
-    readonly_fields = ['created_at', 'finished_at']
\ No newline at end of file
+    search_fields = ['room_name', 'room_code', 'player_x__username', 'player_o__username']
+    readonly_fields = ['origin_room_id', 'room_code', 'room_name', 'created_at', 'finished_at']
+
+class TournamentPlayerInline(admin.TabularInline):
+    model = TournamentPlayer
+    extra = 0
+    readonly_fields = ['joined_at']
+
+@admin.register(Tournament)
+class TournamentAdmin(admin.ModelAdmin):
+    list_display = ['name', 'format', 'status', 'creator', 'current_round', 'winner', 'created_at']
+    list_filter = ['format', 'status', 'created_at']
+    search_fields = ['name', 'creator__username']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+    inlines = [TournamentPlayerInline]
+
+@admin.register(UserDailyStats)
+class UserDailyStatsAdmin(admin.ModelAdmin):
+    #сводки пишутся только приращениями и backfill_stats - правка руками разошлась бы с партиями
+    list_display = ['user', 'day', 'games_played', 'wins', 'losses', 'draws']
+    list_filter = ['day']
+    search_fields = ['user__username']
+    readonly_fields = ['user', 'day', 'games_played', 'wins', 'losses', 'draws', 'duration_total']
+
+@admin.register(HourlyStats)
+class HourlyStatsAdmin(admin.ModelAdmin):
+    list_display = ['hour', 'games_played', 'x_wins', 'o_wins', 'draws']
+    readonly_fields = ['hour', 'games_played', 'x_wins', 'o_wins', 'draws', 'duration_total']
@@ -0,0 +1,43 @@
+#ASGI-обработчик с фиксированным числом потоков для синхронного кода.
+#Стандартный ASGIHandler открывает на каждый запрос свой ThreadSensitiveContext, то есть свой поток
+#(он создается уже на сигнале request_started и живет до конца ответа) - тысяча ждущих long-poll
+#клиентов держит тысячу потоков и тысячу соединений с БД. Здесь запросы по кругу закрепляются за одним
+#из GAME_ASGI_THREADS постоянных контекстов: весь синхронный код запроса (middleware, ORM, DRF-views)
+#по-прежнему выполняется в одном потоке, а потоков и соединений с БД - ровно GAME_ASGI_THREADS,
+#и CONN_MAX_AGE снова работает. Транзакция не должна переживать await - у нас это так: atomic-блоки
+#целиком внутри одного sync_to_async, ATOMIC_REQUESTS не используется.
+#
+#Цена - блокировка очереди: контекст выполняет синхронный код своих запросов по одному, поэтому медленный
+#участок (запись, ждущая блокировку SQLite до busy_timeout, поиск хода бота, выгрузка) задерживает все
+#запросы, попавшие в тот же контекст. Такие участки в async view идут через unpinned - в общий пул потоков
+#вне контекстов, а синхронные DRF-view должны оставаться короткими
+from itertools import cycle
+
+from asgiref.sync import SyncToAsync, ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+
+def unpinned(func):
+    #sync_to_async(thread_sensitive=False): func выполняется в общем пуле потоков, а не в закрепленном контексте.
+    #Атомарный блок должен быть целиком внутри func; соединение потока пула проверяется перед каждым вызовом
+    #(CONN_MAX_AGE, CONN_HEALTH_CHECKS) - как это делает обработчик в начале запроса
+    def run(*args, **kwargs):
+        close_old_connections()
+        return func(*args, **kwargs)
+    return sync_to_async(run, thread_sensitive=False)
+
+class GameASGIHandler(ASGIHandler):
+    def __init__(self):
+        super().__init__()
+        #контексты никогда не закрываются, поэтому их потоки переиспользуются между запросами
+        self._contexts = cycle([ThreadSensitiveContext() for _ in range(settings.GAME_ASGI_THREADS)])
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await super().__call__(scope, receive, send)
+        token = SyncToAsync.thread_sensitive_context.set(next(self._contexts))
+        try:
+            await self.handle(scope, receive, send)
+        finally:
+            SyncToAsync.thread_sensitive_context.reset(token)
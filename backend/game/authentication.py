@@ -0,0 +1,114 @@
+#аутентификация частых запросов (опрос комнаты, список комнат) без обращений к БД.
+#Пользователи берутся из кэша процесса (UserCache) - и для сессий (CachedModelBackend), и для токенов.
+#Токен - подписанные SECRET_KEY id пользователя и хэш его пароля (как у сессии): хранить его негде,
+#проверка - только подпись и срок GAME_AUTH_TOKEN_MAX_AGE. Смена пароля делает токены недействительными,
+#выход из аккаунта - нет: клиент просто забывает токен
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core import signing
+from django.db.models.signals import post_delete, post_save
+from django.utils.crypto import constant_time_compare
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+TOKEN_SALT = 'game.authentication.token'
+TOKEN_KEYWORD = 'Token'
+
+class UserCache:
+    #LRU активных пользователей по id; запись живет ttl секунд, чтобы блокировку или смену пароля
+    #в другом процессе было видно. Изменения в этом процессе сбрасывают запись сразу (сигналы ниже)
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._users = OrderedDict()  # user_id -> (User, время загрузки)
+
+    def get(self, user_id):
+        #копия пользователя: запросы не делят один экземпляр (и его кэш связанных объектов)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._users.move_to_end(user_id)
+                return copy.copy(entry[0])
+
+        user = User.objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            self.forget(user_id)
+            return None
+        with self._lock:
+            self._users[user_id] = (user, now)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.size:
+                self._users.popitem(last=False)
+        return copy.copy(user)
+
+    def forget(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+def get_user_cache():
+    global _user_cache
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                _user_cache = UserCache(settings.GAME_AUTH_USER_CACHE_SIZE, settings.GAME_AUTH_USER_CACHE_TTL)
+    return _user_cache
+
+def _forget_user(sender, instance, **kwargs):
+    get_user_cache().forget(instance.pk)
+
+post_save.connect(_forget_user, sender=User, dispatch_uid='game.authentication.forget_saved_user')
+post_delete.connect(_forget_user, sender=User, dispatch_uid='game.authentication.forget_deleted_user')
+
+class CachedModelBackend(ModelBackend):
+    #сессия хранит только id пользователя; сам пользователь на каждом запросе - из кэша процесса
+    def get_user(self, user_id):
+        return get_user_cache().get(int(user_id))
+
+def make_token(user):
+    return signing.dumps([user.pk, user.get_session_auth_hash()], salt=TOKEN_SALT, compress=True)
+
+def user_from_token(token):
+    #пользователь токена или None (подпись, срок, смена пароля, пользователь заблокирован)
+    try:
+        user_id, auth_hash = signing.loads(token, salt=TOKEN_SALT, max_age=settings.GAME_AUTH_TOKEN_MAX_AGE)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    user = get_user_cache().get(user_id)
+    if user is None or not constant_time_compare(auth_hash, user.get_session_auth_hash()):
+        return None
+    return user
+
+def get_request_token(request):
+    #токен из заголовка "Authorization: Token <токен>"; None - заголовка нет или схема другая
+    parts = get_authorization_header(request).split()
+    if len(parts) != 2 or parts[0].lower() != TOKEN_KEYWORD.lower().encode():
+        return None
+    try:
+        return parts[1].decode()
+    except UnicodeDecodeError:
+        return None
+
+class SignedTokenAuthentication(BaseAuthentication):
+    #стоит перед SessionAuthentication: запрос с токеном не читает сессию вовсе
+    def authenticate(self, request):
+        token = get_request_token(request)
+        if token is None:
+            return None
+        user = user_from_token(token)
+        if user is None:
+            raise AuthenticationFailed('Недействительный токен')
+        return user, token
+
+    def authenticate_header(self, request):
+        return TOKEN_KEYWORD
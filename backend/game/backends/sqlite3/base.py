@@ -0,0 +1,30 @@
+#SQLite для нескольких одновременных писателей (ENGINE 'game.backends.sqlite3').
+#Понимает те же OPTIONS, что SQLite-бэкенд Django 5.1, и при обновлении Django его можно заменить на штатный:
+#  init_command - SQL через ';', выполняется на каждом новом соединении (PRAGMA действуют на соединение);
+#  transaction_mode - DEFERRED/IMMEDIATE/EXCLUSIVE для BEGIN в transaction.atomic
+from django.db.backends.sqlite3 import base
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        #свои ключи в sqlite3.connect не передаем
+        kwargs = super().get_connection_params()
+        self.init_command = kwargs.pop('init_command', None)
+        self.transaction_mode = kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        if self.init_command:
+            for statement in self.init_command.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        #обычный BEGIN (DEFERRED) берет блокировку записи только на первом UPDATE, и если другой писатель
+        #успел закоммитить после нашего чтения, SQLite сразу отвечает "database is locked", не дожидаясь
+        #busy_timeout. BEGIN IMMEDIATE берет блокировку в начале транзакции и честно ждет очереди
+        if self.transaction_mode:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,76 @@
+#бот-соперник: на 3x3 ходит по таблице решений, на больших полях - alpha-beta с лимитом времени.
+#Уровень сложности - вероятность сделать лучший ход вместо случайного
+import random
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from . import engine, solver
+
+LEVELS = {
+    'easy': 0.3,
+    'medium': 0.7,
+    'hard': 1.0,
+}
+
+_table = None
+_cache = None
+_bot_user = None
+_lock = threading.Lock()
+
+def get_table():
+    global _table
+    if _table is None:
+        with _lock:
+            if _table is None:
+                _table = solver.load_table(settings.GAME_SOLVER_TABLE_PATH)
+    return _table
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = solver.TranspositionCache(settings.GAME_SOLVER_CACHE_SIZE)
+    return _cache
+
+def get_bot_user():
+    #служебный пользователь бота: неактивный, без пароля, имя нельзя занять при регистрации
+    global _bot_user
+    if _bot_user is None:
+        with _lock:
+            if _bot_user is None:
+                user, created = User.objects.get_or_create(
+                    username=settings.GAME_BOT_USERNAME,
+                    defaults={'is_active': False}
+                )
+                if created:
+                    user.set_unusable_password()
+                    user.save(update_fields=['password'])
+                _bot_user = user
+    return _bot_user
+
+def best_cell(geometry, x_bits, o_bits, symbol):
+    if geometry is engine.CLASSIC:
+        return get_table().best_move(x_bits, o_bits)
+    mover, other = (x_bits, o_bits) if symbol == engine.X else (o_bits, x_bits)
+    searcher = solver.Searcher(geometry, get_cache(), settings.GAME_BOT_TIME_BUDGET)
+    return searcher.best_move(mover, other)
+
+def choose_move(game, level, rng=random):
+    #(row, col) хода бота в текущей позиции игры
+    geometry = game.geometry
+    x_bits, o_bits = game.bitboards
+    if rng.random() < LEVELS[level]:
+        cell = best_cell(geometry, x_bits, o_bits, game.current_turn)
+    else:
+        free = geometry.full_mask & ~(x_bits | o_bits)
+        cell = rng.choice([cell for cell in range(geometry.cells) if free >> cell & 1])
+    return divmod(cell, geometry.size)
+
+def reply(game, level):
+    #ход бота в game (условная запись, как у игрока); возвращает клетку
+    row, col = choose_move(game, level)
+    game.make_move(row, col, get_bot_user())
+    return row, col
@@ -0,0 +1,153 @@
+#кэш состояния комнат и игр по id комнаты: чтение room_detail/make_move для активных игр идет из памяти.
+#Бэкенд - алиас settings.CACHES['games'] (по умолчанию locmem: LRU по MAX_ENTRIES и TTL по TIMEOUT).
+#locmem живет внутри процесса - при нескольких воркерах подключите общий Redis, иначе воркеры
+#будут видеть устаревшее состояние до истечения TTL
+import threading
+from collections import Counter
+
+from django.core.cache import caches
+from django.db import transaction
+from django.dispatch import Signal
+
+from .models import Room, Game
+
+ROOM_FIELDS = ('code', 'status', 'player_count', 'version', 'board_size', 'win_length', 'bot_level')
+GAME_FIELDS = (
+    'id', 'player_x_id', 'player_o_id', 'board_size', 'win_length', 'board_state', 'moves',
+    'current_turn', 'status', 'winner_id', 'version', 'created_at', 'finished_at', 'tournament_id',
+)
+
+#состояние комнаты в кэше изменилось (после коммита, в процессе, который его изменил); аргумент room_id
+state_changed = Signal()
+
+def state_version(state):
+    game_version = state['game']['version'] if state['game'] else 0
+    return f"{state['room']['version']}.{game_version}"
+
+class GameStateCache:
+    def __init__(self, alias='games'):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _key(self, room_id):
+        return f'room:{room_id}'
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, room_id):
+        #состояние комнаты из кэша; при промахе читаем из БД тремя запросами и кладем в кэш.
+        #None - комнаты нет
+        state = self.backend.get(self._key(room_id))
+        if state is not None:
+            self._count('hits')
+            return state
+
+        self._count('misses')
+        room = Room.objects.filter(id=room_id).values(*ROOM_FIELDS).first()
+        if room is None:
+            return None
+        state = {
+            'room': room,
+            'members': frozenset(Room.players.through.objects.filter(room_id=room_id).values_list('user_id', flat=True)),
+            'game': Game.objects.filter(room_id=room_id).values(*GAME_FIELDS).first(),
+        }
+        if state['game']:
+            state['game']['board_state'] = bytes(state['game']['board_state'])
+            state['game']['moves'] = bytes(state['game']['moves'])
+        #add, а не set: не затираем запись, которую параллельно успел записать ход
+        self.backend.add(self._key(room_id), state)
+        return state
+
+    def version(self, room_id):
+        state = self.get(room_id)
+        return state_version(state) if state else None
+
+    def build_room(self, room_id, state):
+        room = Room(id=room_id, **state['room'])
+        room._state.adding = False
+        room._state.db = 'default'
+        return room
+
+    def build_game(self, room_id, state):
+        #экземпляр Game из кэша, пригодный для make_move (запись идет условным UPDATE по версии)
+        game = Game(room_id=room_id, **state['game'])
+        game._state.adding = False
+        game._state.db = 'default'
+        return game
+
+    def store_game(self, room_id, game):
+        #write-through после коммита хода: в кэше сразу новое состояние игры
+        def write():
+            state = self.backend.get(self._key(room_id))
+            if state is None:
+                return
+            #параллельный ход мог записать более новое состояние раньше нас
+            if state['game'] and state['game']['id'] == game.id and state['game']['version'] >= game.version:
+                return
+            state['game'] = {field: getattr(game, field) for field in GAME_FIELDS}
+            state['game']['board_state'] = bytes(game.board_state)
+            state['game']['moves'] = bytes(game.moves)
+            self.backend.set(self._key(room_id), state)
+            self._count('writes')
+            state_changed.send(sender=GameStateCache, room_id=room_id)
+        transaction.on_commit(write)
+
+    def invalidate(self, room_id):
+        #вход/выход/смена статуса комнаты: проще перечитать все из БД при следующем запросе
+        def delete():
+            self.backend.delete(self._key(room_id))
+            self._count('invalidations')
+            state_changed.send(sender=GameStateCache, room_id=room_id)
+        transaction.on_commit(delete)
+
+    def room_id_by_code(self, code):
+        #id комнаты по коду приглашения; при промахе - поиск по уникальному индексу code. None - комнаты нет.
+        #Код комнаты не меняется, поэтому запись живет до удаления комнаты (forget_code) или до TTL
+        key = f'code:{code}'
+        room_id = self.backend.get(key)
+        if room_id is not None:
+            self._count('code_hits')
+            return room_id
+
+        self._count('code_misses')
+        room_id = Room.objects.filter(code=code).values_list('id', flat=True).first()
+        if room_id is not None:
+            self.backend.set(key, room_id)
+        return room_id
+
+    def forget_code(self, code):
+        #комнату удалили: ее id может достаться новой комнате с другим кодом
+        def delete():
+            self.backend.delete(f'code:{code}')
+        transaction.on_commit(delete)
+
+    def heartbeat_due(self, room_id, interval):
+        #True не чаще раза в interval секунд на комнату: отметку активности в БД пишет первый запрос
+        return self.backend.add(f'{self._key(room_id)}:heartbeat', True, timeout=interval)
+
+    def _rendered_key(self, room_id, state):
+        #код в ключе: id удаленной комнаты SQLite может выдать новой, а код уникален
+        return f"{self._key(room_id)}:full:{state['room']['code']}:{state_version(state)}"
+
+    def get_rendered(self, room_id, state):
+        #готовый полный ответ room_detail для этой версии состояния
+        return self.backend.get(self._rendered_key(room_id, state))
+
+    def set_rendered(self, room_id, state, data):
+        self.backend.set(self._rendered_key(room_id, state), data)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters.get('hits', 0) + counters.get('misses', 0)
+        counters['hit_rate'] = round(counters.get('hits', 0) / lookups, 3) if lookups else None
+        return counters
+
+game_cache = GameStateCache()
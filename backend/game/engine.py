@@ -0,0 +1,172 @@
+#битовый движок для поля NxN с победой K в ряд: позиция - два числа (клетки X и клетки O),
+#бит i соответствует клетке (i // size, i % size). Для 3x3 это два 9-битных числа,
+#для гомоку 15x15 - плотные битовые массивы на 225 бит (python int)
+from functools import lru_cache
+
+X = 'X'
+O = 'O'
+DRAW = 'draw'
+
+MIN_SIZE = 3
+MAX_SIZE = 19
+MIN_WIN_LENGTH = 3
+
+#для маленьких полей победа проверяется по готовой таблице на все наборы клеток
+_TABLE_MAX_CELLS = 12
+
+#направления линий: горизонталь, вертикаль, две диагонали
+_DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+class Geometry:
+    #геометрия поля: выигрышные маски и маски, проходящие через каждую клетку.
+    #Объекты неизменяемы и кэшируются в get_geometry
+    def __init__(self, size, win_length):
+        self.size = size
+        self.win_length = win_length
+        self.cells = size * size
+        self.full_mask = (1 << self.cells) - 1
+        self.packed_size = (2 * self.cells + 7) // 8
+        self.move_size = 1 if self.cells <= 256 else 2
+        self.empty = self.pack(0, 0)
+
+        #все отрезки длины win_length по четырем направлениям
+        masks = []
+        for row in range(size):
+            for col in range(size):
+                for d_row, d_col in _DIRECTIONS:
+                    end_row = row + d_row * (win_length - 1)
+                    end_col = col + d_col * (win_length - 1)
+                    if 0 <= end_row < size and 0 <= end_col < size:
+                        mask = 0
+                        for step in range(win_length):
+                            mask |= 1 << self.cell_index(row + d_row * step, col + d_col * step)
+                        masks.append(mask)
+        self.win_masks = tuple(masks)
+
+        #для каждой клетки - только отрезки через неё: после хода проверяется не больше 4*K масок
+        self.lines_through = tuple(
+            tuple(mask for mask in self.win_masks if mask >> cell & 1)
+            for cell in range(self.cells)
+        )
+
+        self._winning = None
+        if self.cells <= _TABLE_MAX_CELLS:
+            self._winning = bytes(
+                any(bits & mask == mask for mask in self.win_masks)
+                for bits in range(1 << self.cells)
+            )
+
+    def __repr__(self):
+        return f"Geometry({self.size}x{self.size}, {self.win_length} in a row)"
+
+    def cell_index(self, row, col):
+        return row * self.size + col
+
+    def contains(self, row, col):
+        return 0 <= row < self.size and 0 <= col < self.size
+
+    def is_occupied(self, x_bits, o_bits, row, col):
+        return bool((x_bits | o_bits) >> self.cell_index(row, col) & 1)
+
+    def symbol_at(self, x_bits, o_bits, row, col):
+        cell = self.cell_index(row, col)
+        if x_bits >> cell & 1:
+            return X
+        if o_bits >> cell & 1:
+            return O
+        return ''
+
+    def place(self, x_bits, o_bits, row, col, symbol):
+        #возвращает новую позицию, исходные числа не меняются
+        bit = 1 << self.cell_index(row, col)
+        if symbol == X:
+            return x_bits | bit, o_bits
+        return x_bits, o_bits | bit
+
+    def is_win(self, bits):
+        #полная проверка набора клеток одного игрока
+        if self._winning is not None:
+            return bool(self._winning[bits])
+        return any(bits & mask == mask for mask in self.win_masks)
+
+    def wins_through(self, bits, row, col):
+        #инкрементальная проверка: только линии через последнюю поставленную клетку
+        if self._winning is not None:
+            return bool(self._winning[bits])
+        return any(bits & mask == mask for mask in self.lines_through[self.cell_index(row, col)])
+
+    def is_full(self, x_bits, o_bits):
+        return x_bits | o_bits == self.full_mask
+
+    def outcome(self, x_bits, o_bits):
+        #'X', 'O', 'draw' или None, если игра продолжается
+        if self.is_win(x_bits):
+            return X
+        if self.is_win(o_bits):
+            return O
+        if self.is_full(x_bits, o_bits):
+            return DRAW
+        return None
+
+    def outcome_after(self, x_bits, o_bits, row, col, symbol):
+        #результат после хода symbol в (row, col) без полного обхода поля
+        if self.wins_through(x_bits if symbol == X else o_bits, row, col):
+            return symbol
+        if self.is_full(x_bits, o_bits):
+            return DRAW
+        return None
+
+    def to_grid(self, x_bits, o_bits):
+        #поле в виде списка строк, как его отдает API
+        return [[self.symbol_at(x_bits, o_bits, row, col) for col in range(self.size)] for row in range(self.size)]
+
+    def from_grid(self, grid):
+        x_bits = o_bits = 0
+        for row, cells in enumerate(grid):
+            for col, cell in enumerate(cells):
+                if cell == X:
+                    x_bits |= 1 << self.cell_index(row, col)
+                elif cell == O:
+                    o_bits |= 1 << self.cell_index(row, col)
+        return x_bits, o_bits
+
+    #хранение в БД: X в младших cells битах, O в следующих, little-endian
+    def pack(self, x_bits, o_bits):
+        return (x_bits | o_bits << self.cells).to_bytes(self.packed_size, 'little')
+
+    def unpack(self, data):
+        value = int.from_bytes(bytes(data), 'little')
+        return value & self.full_mask, value >> self.cells & self.full_mask
+
+    #журнал ходов: номер клетки, один байт на ход (два - на полях больше 16x16); X ходит первым
+    def pack_move(self, row, col):
+        return self.cell_index(row, col).to_bytes(self.move_size, 'little')
+
+    def unpack_moves(self, data):
+        data = bytes(data)
+        return [int.from_bytes(data[i:i + self.move_size], 'little') for i in range(0, len(data), self.move_size)]
+
+    def replay(self, cells):
+        #позиция после ходов cells, без хранения промежуточных досок
+        x_bits = o_bits = 0
+        for ply, cell in enumerate(cells):
+            if ply % 2 == 0:
+                x_bits |= 1 << cell
+            else:
+                o_bits |= 1 << cell
+        return x_bits, o_bits
+
+@lru_cache(maxsize=None)
+def get_geometry(size=3, win_length=3):
+    if not MIN_SIZE <= size <= MAX_SIZE:
+        raise ValueError(f"Размер поля должен быть от {MIN_SIZE} до {MAX_SIZE}")
+    if not MIN_WIN_LENGTH <= win_length <= size:
+        raise ValueError(f"Длина линии должна быть от {MIN_WIN_LENGTH} до размера поля")
+    return Geometry(size, win_length)
+
+def default_win_length(size):
+    #на маленьких полях - линия во всю ширину, на больших - гомоку (5 в ряд)
+    return min(size, 5)
+
+CLASSIC = get_geometry(3, 3)
+EMPTY = CLASSIC.empty
@@ -0,0 +1,183 @@
+#потоковая выгрузка партий, статистики игроков и комнат в NDJSON/CSV для аналитики.
+#Строки читаются из БД пачками и сразу отдаются, так что память не растет с числом строк.
+#Команда export читает пачки через iterator(chunk_size=...), HTTP-выгрузка - генератором render (WSGI)
+#или async-генератором arender (ASGI): каждая пачка - отдельный запрос после последней строки прошлой пачки
+#(по порядку watermark, key), под ASGI - в потоке вне закрепленных за запросами контекстов. Инкрементальная выгрузка - с отметки since
+#(включительно, повторы убираются по id)
+import csv
+
+from django.db.models import Q
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import engine
+from .asgi import unpinned
+from .models import Game, Room, UserProfile
+
+CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+class BaseExport:
+    #columns - поля для values_list, fields - имена колонок в выгрузке, watermark - поле для since,
+    #key - уникальное поле; выгрузка идет в порядке (watermark, key), обе колонки есть в columns
+    columns = ()
+    fields = ()
+    watermark = None
+    key = 'id'
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def convert(self, row):
+        return row
+
+    def ordered(self, since=None):
+        queryset = self.get_queryset()
+        if since is not None:
+            queryset = queryset.filter(**{f'{self.watermark}__gte': since})
+        return queryset.order_by(*filter(None, (self.watermark, self.key)))
+
+    def rows(self, since=None, chunk_size=CHUNK_SIZE):
+        for row in self.ordered(since).values_list(*self.columns).iterator(chunk_size=chunk_size):
+            yield self.convert(row)
+
+    def position(self, row):
+        #(watermark, key) строки до convert - откуда продолжить следующую пачку
+        mark = row[self.columns.index(self.watermark)] if self.watermark else None
+        return mark, row[self.columns.index(self.key)]
+
+    def chunk(self, since=None, position=None, chunk_size=CHUNK_SIZE):
+        #пачка строк после position и позиция ее последней строки; ([], None) - строки кончились.
+        #Курсор между пачками не держим, так что пачки можно читать из разных потоков и соединений
+        queryset = self.ordered(since)
+        if position is not None:
+            mark, key = position
+            after = Q(**{f'{self.key}__gt': key})
+            if self.watermark:
+                after = Q(**{f'{self.watermark}__gt': mark}) | (Q(**{self.watermark: mark}) & after)
+            queryset = queryset.filter(after)
+        rows = list(queryset.values_list(*self.columns)[:chunk_size])
+        if not rows:
+            return [], None
+        return [self.convert(row) for row in rows], self.position(rows[-1])
+
+class GameExport(BaseExport):
+    #завершенные партии в порядке завершения; moves - номера клеток по порядку ходов (X первый).
+    #Комната - из архива партии: к моменту выгрузки ее обычно уже нет
+    columns = (
+        'id', 'origin_room_id', 'room_code', 'room_name', 'player_x_id', 'player_o_id', 'board_size', 'win_length',
+        'status', 'winner_id', 'created_at', 'finished_at', 'moves',
+    )
+    fields = (
+        'id', 'room', 'room_code', 'room_name', 'player_x', 'player_o', 'board_size', 'win_length',
+        'status', 'winner', 'created_at', 'finished_at', 'moves',
+    )
+    watermark = 'finished_at'
+
+    def get_queryset(self):
+        #finished_at записывается вместе с завершающим ходом, так что у завершенных партий он всегда есть
+        return Game.objects.exclude(status=Game.ONGOING).filter(finished_at__isnull=False)
+
+    def convert(self, row):
+        board_size, win_length = row[6], row[7]
+        return row[:-1] + (engine.get_geometry(board_size, win_length).unpack_moves(row[-1]),)
+
+class ProfileExport(BaseExport):
+    #статистика - текущий снимок, без since
+    columns = ('user_id', 'user__username', 'games_played', 'wins', 'losses', 'draws')
+    fields = ('user', 'username', 'games_played', 'wins', 'losses', 'draws')
+    key = 'user_id'
+
+    def get_queryset(self):
+        return UserProfile.objects.all()
+
+class RoomExport(BaseExport):
+    #комнаты, которые есть сейчас; комнаты сыгранных партий (в том числе удаленные) - колонки room* выгрузки games
+    columns = (
+        'id', 'name', 'code', 'creator_id', 'status', 'player_count',
+        'board_size', 'win_length', 'bot_level', 'created_at',
+    )
+    fields = (
+        'id', 'name', 'code', 'creator', 'status', 'player_count',
+        'board_size', 'win_length', 'bot_level', 'created_at',
+    )
+    watermark = 'created_at'
+
+    def get_queryset(self):
+        return Room.objects.all()
+
+EXPORTS = {
+    'games': GameExport(),
+    'profiles': ProfileExport(),
+    'rooms': RoomExport(),
+}
+
+def parse_since(value):
+    #ISO-время; без часового пояса - в текущем. None - строка не разобрана
+    try:
+        since = parse_datetime(value)
+    except ValueError:
+        return None
+    if since is not None and timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+class _Echo:
+    #csv.writer пишет в "файл", а мы сразу отдаем строку дальше
+    def write(self, value):
+        return value
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return ' '.join(map(str, value))
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+def formatter(exporter, output):
+    #строки заголовка и функция строка -> текст для формата output ('ndjson' или 'csv')
+    if output == 'csv':
+        writer = csv.writer(_Echo())
+        return [writer.writerow(exporter.fields)], lambda row: writer.writerow([_csv_value(value) for value in row])
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    return [], lambda row: encoder.encode(dict(zip(exporter.fields, row))) + '\n'
+
+def _fetch_chunk(exporter, line, since, position, chunk_size):
+    rows, position = exporter.chunk(since, position, chunk_size)
+    #пачка превращается в текст здесь же - event loop получает готовый кусок ответа
+    return ''.join(line(row) for row in rows), len(rows), position
+
+def render(exporter, output, since=None, chunk_size=CHUNK_SIZE):
+    #синхронный генератор для StreamingHttpResponse под WSGI: async-итератор там читается целиком
+    header, line = formatter(exporter, output)
+    if header:
+        yield ''.join(header)
+    position = None
+    while True:
+        text, count, position = _fetch_chunk(exporter, line, since, position, chunk_size)
+        if count:
+            yield text
+        if count < chunk_size:
+            return
+
+async def arender(exporter, output, since=None, chunk_size=CHUNK_SIZE):
+    #async-генератор для StreamingHttpResponse под ASGI: ответ уходит клиенту пачка за пачкой,
+    #а синхронный итератор Django 4.2 сначала прочитал бы целиком в память
+    header, line = formatter(exporter, output)
+    if header:
+        yield ''.join(header)
+    #пачки читаются в общем пуле потоков (asgi.unpinned), а не в потоке, закрепленном за запросом
+    fetch = unpinned(_fetch_chunk)
+    position = None
+    while True:
+        text, count, position = await fetch(exporter, line, since, position, chunk_size)
+        if count:
+            yield text
+        if count < chunk_size:
+            return
@@ -0,0 +1,118 @@
+#таблица лидеров в памяти: отсортированный список ключей (-wins, losses, user_id), место игрока - bisect
+#за O(log n). После каждой завершенной партии приращения применяются к списку (stats.apply_deltas),
+#а раз в GAME_LEADERBOARD_REFRESH_INTERVAL секунд список перечитывается из БД по индексу profile_rank_idx -
+#так подтягиваются партии, сыгранные в других процессах
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from .models import UserProfile
+
+STAT_FIELDS = ('games_played', 'wins', 'losses', 'draws')
+
+def rank_key(user_id, stats):
+    games_played, wins, losses, draws = stats
+    return (-wins, losses, user_id)
+
+class Leaderboard:
+    def __init__(self, refresh_interval):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._keys = []  # отсортированные rank_key
+        self._stats = {}  # user_id -> (games_played, wins, losses, draws)
+        self._names = {}
+        self._excluded = set()  # неактивные пользователи (в том числе бот) в таблицу не попадают
+        self._loaded_at = None
+
+    def refresh(self):
+        #строки уже идут в порядке таблицы (индекс), сортировать в python не нужно
+        rows = UserProfile.objects.filter(games_played__gt=0, user__is_active=True).order_by(
+            '-wins', 'losses', 'user_id'
+        ).values_list('user_id', 'user__username', *STAT_FIELDS)
+        keys = []
+        stats = {}
+        names = {}
+        for user_id, username, *values in rows.iterator(chunk_size=5000):
+            stats[user_id] = tuple(values)
+            names[user_id] = username
+            keys.append(rank_key(user_id, stats[user_id]))
+        excluded = set(User.objects.filter(is_active=False).values_list('id', flat=True))
+        with self._lock:
+            self._keys, self._stats, self._names, self._excluded = keys, stats, names, excluded
+            self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.refresh_interval:
+            return
+        with self._refresh_lock:
+            if self._loaded_at is loaded_at:
+                self.refresh()
+
+    def apply(self, deltas):
+        #{user_id: Counter приращений} завершенных партий, уже записанных в БД
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for user_id, delta in deltas.items():
+                if user_id in self._excluded:
+                    continue
+                old = self._stats.get(user_id)
+                if old is None:
+                    old = (0, 0, 0, 0)
+                else:
+                    del self._keys[bisect_left(self._keys, rank_key(user_id, old))]
+                new = tuple(value + delta.get(field, 0) for field, value in zip(STAT_FIELDS, old))
+                self._stats[user_id] = new
+                insort(self._keys, rank_key(user_id, new))
+
+    def _entries(self, keys):
+        #(user_id, статистика) для среза ключей; вызывается под self._lock
+        return [(user_id, self._stats[user_id]) for *_, user_id in keys]
+
+    def _rows(self, start, entries):
+        missing = [user_id for user_id, _ in entries if user_id not in self._names]
+        if missing:
+            #игроки, впервые попавшие в таблицу после последнего перечитывания
+            names = dict(User.objects.filter(id__in=missing).values_list('id', 'username'))
+            with self._lock:
+                self._names.update(names)
+        return [
+            dict({'rank': rank, 'user': {'id': user_id, 'username': self._names.get(user_id)}}, **dict(zip(STAT_FIELDS, stats)))
+            for rank, (user_id, stats) in enumerate(entries, start)
+        ]
+
+    def top(self, limit):
+        self._ensure_fresh()
+        with self._lock:
+            entries = self._entries(self._keys[:limit])
+            total = len(self._keys)
+        return total, self._rows(1, entries)
+
+    def around(self, user_id, radius):
+        #место игрока (None - еще не играл) и соседи: radius выше и radius ниже
+        self._ensure_fresh()
+        with self._lock:
+            total = len(self._keys)
+            stats = self._stats.get(user_id)
+            if stats is None:
+                return total, None, []
+            index = bisect_left(self._keys, rank_key(user_id, stats))
+            start = max(index - radius, 0)
+            entries = self._entries(self._keys[start:index + radius + 1])
+        return total, index + 1, self._rows(start + 1, entries)
+
+_leaderboard = None
+_leaderboard_lock = threading.Lock()
+
+def get_leaderboard():
+    global _leaderboard
+    if _leaderboard is None:
+        with _leaderboard_lock:
+            if _leaderboard is None:
+                _leaderboard = Leaderboard(settings.GAME_LEADERBOARD_REFRESH_INTERVAL)
+    return _leaderboard
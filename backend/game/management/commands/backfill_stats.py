@@ -0,0 +1,41 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game import rollups
+
+def parse_day(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Неверная дата {value}, нужно ГГГГ-ММ-ДД')
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводки статистики по дням и часам из истории партий, день за днем'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='первый день (ГГГГ-ММ-ДД), по умолчанию день первой партии')
+        parser.add_argument('--until', help='день, на котором остановиться (не включая), по умолчанию сегодня; дни - по UTC')
+        parser.add_argument('--chunk-size', type=int, default=rollups.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        today = rollups.today()
+        until = parse_day(options['until']) if options['until'] else today
+        #сегодняшние сводки пишут завершающиеся сейчас партии - пересчет затер бы их приращения
+        if until > today:
+            raise CommandError('--until не может быть позже сегодняшнего дня')
+        since = parse_day(options['since']) if options['since'] else rollups.first_game_day()
+        if since is None:
+            self.stdout.write('Завершенных партий нет')
+            return
+
+        day = since
+        days = total = 0
+        while day < until:
+            count = rollups.rebuild_day(day, options['chunk_size'])
+            if count:
+                self.stdout.write(f'{day}: партий {count}')
+            days += 1
+            total += count
+            day += datetime.timedelta(days=1)
+        self.stdout.write(f'Дней пересчитано: {days}, партий: {total}')
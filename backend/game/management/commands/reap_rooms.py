@@ -0,0 +1,25 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from game import reaper
+
+class Command(BaseCommand):
+    help = 'Завершает зависшие партии и удаляет брошенные комнаты (один проход или периодически с --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='повторять каждые --interval секунд')
+        parser.add_argument('--interval', type=float, default=settings.GAME_REAPER_INTERVAL)
+        parser.add_argument('--batch-size', type=int, default=settings.GAME_REAPER_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        while True:
+            forfeited, removed = reaper.reap(options['batch_size'])
+            self.stdout.write(f"Партий завершено: {forfeited}, комнат удалено: {removed}")
+            if not options['loop']:
+                return
+            #между проходами соединение с БД не держим
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,171 @@
+#очередь быстрой игры: ожидающие комнаты лежат в памяти по вариантам поля и диапазонам рейтинга,
+#поэтому пара находится за O(1) без GROUP BY по всем комнатам. Каждый процесс держит свою очередь,
+#комнаты из других процессов (и созданные вручную) находит запасной поиск по БД
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Room, UserProfile
+
+class Ticket:
+    __slots__ = ('room_id', 'user_id', 'bucket', 'enqueued_at')
+
+    def __init__(self, room_id, user_id, bucket):
+        self.room_id = room_id
+        self.user_id = user_id
+        self.bucket = bucket
+        self.enqueued_at = time.monotonic()
+
+class MatchmakingQueue:
+    def __init__(self, band_width, band_spread, history_size=1000):
+        self.band_width = band_width
+        self.band_spread = band_spread
+        self._lock = threading.Lock()
+        self._buckets = defaultdict(deque)  # (board_size, win_length, band) -> очередь билетов
+        self._tickets = {}  # room_id -> живой билет; отмененные билеты удаляются из очереди лениво
+        self._waits = deque(maxlen=history_size)
+        self._matches = 0
+
+    def band(self, rating):
+        return rating // self.band_width
+
+    def enqueue(self, room_id, user_id, board_size, win_length, rating):
+        ticket = Ticket(room_id, user_id, (board_size, win_length, self.band(rating)))
+        with self._lock:
+            self._tickets[room_id] = ticket
+            self._buckets[ticket.bucket].append(ticket)
+
+    def cancel(self, room_id):
+        with self._lock:
+            self._tickets.pop(room_id, None)
+
+    def pop_candidate(self, user_id, board_size, win_length, rating):
+        #сначала свой диапазон рейтинга, потом соседние
+        band = self.band(rating)
+        bands = [band]
+        for offset in range(1, self.band_spread + 1):
+            bands += [band - offset, band + offset]
+
+        with self._lock:
+            for candidate_band in bands:
+                bucket = self._buckets.get((board_size, win_length, candidate_band))
+                own = []
+                ticket = None
+                while bucket:
+                    head = bucket.popleft()
+                    if self._tickets.get(head.room_id) is not head:
+                        continue
+                    if head.user_id == user_id:
+                        own.append(head)
+                        continue
+                    ticket = head
+                    del self._tickets[head.room_id]
+                    break
+                if bucket is not None:
+                    bucket.extendleft(reversed(own))
+                    if not bucket:
+                        del self._buckets[(board_size, win_length, candidate_band)]
+                if ticket:
+                    return ticket
+        return None
+
+    def banded_room_ids(self, max_wait):
+        #комнаты, которые еще ждут соперника своего диапазона рейтинга
+        now = time.monotonic()
+        with self._lock:
+            return [room_id for room_id, ticket in self._tickets.items() if now - ticket.enqueued_at < max_wait]
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self._waits.append(seconds)
+            self._matches += 1
+
+    def metrics(self):
+        with self._lock:
+            depth = defaultdict(int)
+            for ticket in self._tickets.values():
+                board_size, win_length, band = ticket.bucket
+                depth[f"{board_size}x{board_size}/{win_length}"] += 1
+            waits = sorted(self._waits)
+            matches = self._matches
+
+        def percentile(p):
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))], 3)
+
+        return {
+            'queue_depth': sum(depth.values()),
+            'queue_depth_by_variant': dict(depth),
+            'matches': matches,
+            'wait_seconds': {
+                'avg': round(sum(waits) / len(waits), 3) if waits else None,
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': round(waits[-1], 3) if waits else None,
+            },
+        }
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = MatchmakingQueue(settings.GAME_MATCHMAKING_BAND_WIDTH, settings.GAME_MATCHMAKING_BAND_SPREAD)
+    return _queue
+
+def player_rating(user):
+    #рейтинг для подбора: разница побед и поражений
+    row = UserProfile.objects.filter(user=user).values_list('wins', 'losses').first()
+    return row[0] - row[1] if row else 0
+
+def enqueue(room, user):
+    get_queue().enqueue(room.id, user.id, room.board_size, room.win_length, player_rating(user))
+
+def cancel(room_id):
+    get_queue().cancel(room_id)
+
+def _claim(room_id, user):
+    #захват комнаты условным UPDATE: из двух одновременных запросов комнату получит только один
+    claimed = Room.objects.filter(id=room_id, status=Room.WAITING).exclude(players=user).update(status=Room.PLAYING)
+    return claimed == 1
+
+def find_match(user, board_size, win_length):
+    #комната, захваченная для user (уже в статусе PLAYING), или None
+    queue = get_queue()
+    rating = player_rating(user)
+
+    ticket = queue.pop_candidate(user.id, board_size, win_length, rating)
+    while ticket:
+        if _claim(ticket.room_id, user):
+            queue.record_wait(time.monotonic() - ticket.enqueued_at)
+            return Room.objects.get(id=ticket.room_id)
+        ticket = queue.pop_candidate(user.id, board_size, win_length, rating)
+
+    #запасной путь по БД: строки, заблокированные другими запросами, пропускаются (skip_locked).
+    #Комнаты из нашей очереди отдаем игрокам другого рейтинга только после GAME_MATCHMAKING_BAND_TIMEOUT
+    with transaction.atomic():
+        candidates = Room.objects.select_for_update(skip_locked=True).filter(
+            status=Room.WAITING,
+            player_count=1,
+            board_size=board_size,
+            win_length=win_length
+        ).exclude(
+            players=user
+        ).exclude(
+            id__in=queue.banded_room_ids(settings.GAME_MATCHMAKING_BAND_TIMEOUT)
+        ).order_by('created_at')[:10]
+        for room in candidates:
+            if _claim(room.id, user):
+                queue.cancel(room.id)
+                queue.record_wait((timezone.now() - room.created_at).total_seconds())
+                room.status = Room.PLAYING
+                return room
+    return None
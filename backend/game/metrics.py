@@ -0,0 +1,207 @@
+#метрики запросов по view: время ответа, число и время SQL-запросов, время сериализаторов, размер ответа.
+#Гистограммы копятся в памяти процесса (у каждого воркера свои) и отдаются через /api/metrics/
+#в JSON или в текстовом формате Prometheus
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from rest_framework.serializers import BaseSerializer
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+#метрика -> (границы гистограммы, описание для Prometheus)
+METRICS = {
+    'request_duration_seconds': (TIME_BUCKETS, 'Время обработки запроса'),
+    'db_queries': (QUERY_BUCKETS, 'SQL-запросов на запрос'),
+    'db_duration_seconds': (TIME_BUCKETS, 'Суммарное время SQL-запросов'),
+    'serializer_duration_seconds': (TIME_BUCKETS, 'Время сериализаторов DRF'),
+    'response_size_bytes': (SIZE_BUCKETS, 'Размер тела ответа'),
+}
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последний - больше верхней границы (+Inf)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        #оценка сверху: граница корзины, в которую попал квантиль
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self, scale=1):
+        if not self.count:
+            return None
+        return {
+            'avg': round(self.sum / self.count * scale, 3),
+            'p50': round(self.quantile(0.5) * scale, 3),
+            'p95': round(self.quantile(0.95) * scale, 3),
+            'p99': round(self.quantile(0.99) * scale, 3),
+            'max': round(self.max * scale, 3),
+        }
+
+class RequestSample:
+    #то, что набирается за время одного запроса
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'serializer_depth', 'sql')
+
+    def __init__(self, keep_sql=False):
+        self.queries = 0
+        self.db_time = 0
+        self.serializer_time = 0
+        self.serializer_depth = 0
+        self.sql = [] if keep_sql else None
+
+    def __call__(self, execute, sql, params, many, context):
+        #execute_wrapper соединения: считаем каждый SQL-запрос
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            if self.sql is not None:
+                self.sql.append((elapsed, sql, params))
+
+current_sample = ContextVar('current_sample', default=None)
+
+def count_query(execute, sql, params, many, context):
+    #execute_wrapper каждого соединения: запрос засчитывается замеру текущего запроса.
+    #Замер берется из ContextVar, а sync_to_async переносит контекст в свой поток, поэтому
+    #учитываются и запросы async view, которые идут в потоке ORM, а не в потоке запроса
+    sample = current_sample.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    return sample(execute, sql, params, many, context)
+
+def install_query_counting(sender=None, connection=None, **kwargs):
+    #обработчик connection_created; соединение переоткрывается с тем же объектом - второй раз не добавляем
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}  # (view, method) -> {'status': {...}, метрика: Histogram}
+
+    def observe(self, view, method, status_code, duration, sample, response_size):
+        values = {
+            'request_duration_seconds': duration,
+            'db_queries': sample.queries,
+            'db_duration_seconds': sample.db_time,
+            'serializer_duration_seconds': sample.serializer_time,
+            'response_size_bytes': response_size,
+        }
+        status_class = f'{status_code // 100}xx'
+        with self._lock:
+            entry = self._views.get((view, method))
+            if entry is None:
+                entry = {name: Histogram(buckets) for name, (buckets, _) in METRICS.items()}
+                entry['status'] = {}
+                self._views[(view, method)] = entry
+            entry['status'][status_class] = entry['status'].get(status_class, 0) + 1
+            for name, value in values.items():
+                if value is not None:
+                    entry[name].observe(value)
+
+    def snapshot(self):
+        #JSON-сводка: времена в миллисекундах, квантили - по границам корзин
+        with self._lock:
+            result = []
+            for (view, method), entry in sorted(self._views.items()):
+                result.append({
+                    'view': view,
+                    'method': method,
+                    'requests': entry['request_duration_seconds'].count,
+                    'status': dict(entry['status']),
+                    'wall_ms': entry['request_duration_seconds'].summary(1000),
+                    'db_queries': entry['db_queries'].summary(),
+                    'db_ms': entry['db_duration_seconds'].summary(1000),
+                    'serializer_ms': entry['serializer_duration_seconds'].summary(1000),
+                    'response_bytes': entry['response_size_bytes'].summary(),
+                })
+            return result
+
+    def prometheus(self):
+        lines = []
+        with self._lock:
+            views = sorted(self._views.items())
+            lines += ['# HELP game_requests_total Число запросов', '# TYPE game_requests_total counter']
+            for (view, method), entry in views:
+                for status_class, count in sorted(entry['status'].items()):
+                    lines.append(f'game_requests_total{{view="{view}",method="{method}",status="{status_class}"}} {count}')
+            for name, (buckets, description) in METRICS.items():
+                lines += [f'# HELP game_{name} {description}', f'# TYPE game_{name} histogram']
+                for (view, method), entry in views:
+                    histogram = entry[name]
+                    labels = f'view="{view}",method="{method}"'
+                    cumulative = 0
+                    for bound, count in zip(buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'game_{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f'game_{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f'game_{name}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(f'game_{name}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+    return _registry
+
+_serializer_timing_installed = False
+
+def install_serializer_timing():
+    #оборачиваем BaseSerializer.data: время считается только у внешнего вызова,
+    #вложенные сериализаторы и ListSerializer не учитываются дважды
+    global _serializer_timing_installed
+    with _registry_lock:
+        if _serializer_timing_installed:
+            return
+        _serializer_timing_installed = True
+
+    original = BaseSerializer.data
+
+    @wraps(original.fget)
+    def data(self):
+        sample = current_sample.get()
+        if sample is None or sample.serializer_depth:
+            return original.fget(self)
+        sample.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            sample.serializer_time += time.perf_counter() - started
+            sample.serializer_depth -= 1
+
+    BaseSerializer.data = property(data)
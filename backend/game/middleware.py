@@ -0,0 +1,77 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+logger = logging.getLogger('game.metrics')
+
+class MetricsMiddleware:
+    #замеряет каждый запрос и складывает результат в metrics.get_registry() по имени view.
+    #Стоит первым после CORS, чтобы в замер попали запросы сессий и аутентификации.
+    #Работает и в синхронном, и в асинхронном стеке: под ASGI async view не уходят из-за него в поток
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.GAME_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_request_ms = settings.GAME_METRICS_SLOW_REQUEST_MS
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        metrics.install_serializer_timing()
+        #SQL считается обработчиком на всех соединениях: у потоков ORM (sync_to_async) они свои
+        connection_created.connect(metrics.install_query_counting, dispatch_uid='game.metrics.install_query_counting')
+        for connection in connections.all():
+            metrics.install_query_counting(connection=connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sample, token = self.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_sample.reset(token)
+        self.finish(request, response, time.perf_counter() - started, sample)
+        return response
+
+    async def __acall__(self, request):
+        sample, token = self.start()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_sample.reset(token)
+        self.finish(request, response, time.perf_counter() - started, sample)
+        return response
+
+    def start(self):
+        sample = metrics.RequestSample(keep_sql=self.slow_request_ms is not None)
+        return sample, metrics.current_sample.set(sample)
+
+    def finish(self, request, response, duration, sample):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        #у потоковых ответов (SSE) размер заранее неизвестен
+        size = None if response.streaming else len(response.content)
+        metrics.get_registry().observe(view, request.method, response.status_code, duration, sample, size)
+
+        if self.slow_request_ms is not None and duration * 1000 >= self.slow_request_ms:
+            self.log_slow_request(request, response, duration, sample)
+
+    def log_slow_request(self, request, response, duration, sample):
+        lines = [
+            f"{request.method} {request.get_full_path()} -> {response.status_code}: {duration * 1000:.1f} ms, "
+            f"{sample.queries} SQL ({sample.db_time * 1000:.1f} ms), serializers {sample.serializer_time * 1000:.1f} ms"
+        ]
+        for elapsed, sql, params in sample.sql:
+            lines.append(f"  {elapsed * 1000:.1f} ms: {sql} {params}")
+        logger.warning('\n'.join(lines))
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:18
+
+from django.db import migrations, models
+
+
+#упаковка зафиксирована здесь, чтобы миграция не зависела от будущих изменений game.engine
+def board_to_state(apps, schema_editor):
+    Game = apps.get_model('game', 'Game')
+    for game in Game.objects.only('id', 'board').iterator():
+        x_bits = o_bits = 0
+        for row, cells in enumerate(game.board or []):
+            for col, cell in enumerate(cells):
+                if cell == 'X':
+                    x_bits |= 1 << (row * 3 + col)
+                elif cell == 'O':
+                    o_bits |= 1 << (row * 3 + col)
+        game.board_state = (x_bits | o_bits << 9).to_bytes(3, 'little')
+        game.save(update_fields=['board_state'])
+
+
+def state_to_board(apps, schema_editor):
+    Game = apps.get_model('game', 'Game')
+    for game in Game.objects.only('id', 'board_state').iterator():
+        value = int.from_bytes(bytes(game.board_state), 'little')
+        game.board = [
+            ['X' if value >> (row * 3 + col) & 1 else 'O' if value >> (9 + row * 3 + col) & 1 else ''
+             for col in range(3)]
+            for row in range(3)
+        ]
+        game.save(update_fields=['board'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0002_versioned_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='board_state',
+            field=models.BinaryField(default=b'\x00\x00\x00'),
+        ),
+        migrations.RunPython(board_to_state, state_to_board),
+        migrations.RemoveField(
+            model_name='game',
+            name='board',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0003_bitboard_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='board_size',
+            field=models.PositiveSmallIntegerField(default=3),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='win_length',
+            field=models.PositiveSmallIntegerField(default=3),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='board_size',
+            field=models.PositiveSmallIntegerField(default=3),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='win_length',
+            field=models.PositiveSmallIntegerField(default=3),
+        ),
+    ]
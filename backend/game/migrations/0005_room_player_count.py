@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:23
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_player_count(apps, schema_editor):
+    Room = apps.get_model('game', 'Room')
+    for room in Room.objects.annotate(players_total=Count('players')).only('id').iterator():
+        Room.objects.filter(pk=room.pk).update(player_count=room.players_total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0004_board_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='player_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_player_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['status', 'created_at'], name='room_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0005_room_player_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='bot_level',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+    ]
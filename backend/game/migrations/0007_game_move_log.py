@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0006_room_bot_level'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='moves',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='room',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='game.room'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0007_game_move_log'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['finished_at', 'id'], name='game_finished_idx'),
+        ),
+    ]
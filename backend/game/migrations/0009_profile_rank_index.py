@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0008_game_finished_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['-wins', 'losses', 'user'], name='profile_rank_idx'),
+        ),
+    ]
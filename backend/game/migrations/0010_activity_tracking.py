@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:48
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0009_profile_rank_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='last_activity',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='last_activity',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['status', 'last_activity'], name='game_status_activity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['last_activity'], name='room_activity_idx'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('game', '0010_activity_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tournament',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('format', models.CharField(choices=[('round_robin', 'Round robin'), ('single_elimination', 'Single elimination')], default='round_robin', max_length=20)),
+                ('status', models.CharField(choices=[('registration', 'Registration'), ('running', 'Running'), ('finished', 'Finished')], default='registration', max_length=15)),
+                ('board_size', models.PositiveSmallIntegerField(default=3)),
+                ('win_length', models.PositiveSmallIntegerField(default=3)),
+                ('current_round', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TournamentPlayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seed', models.PositiveIntegerField(blank=True, null=True)),
+                ('eliminated_round', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='tournament_round',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tournamentplayer',
+            name='tournament',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='game.tournament'),
+        ),
+        migrations.AddField(
+            model_name='tournamentplayer',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tournament_entries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='creator',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='created_tournaments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='players',
+            field=models.ManyToManyField(related_name='tournaments', through='game.TournamentPlayer', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='winner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='won_tournaments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='tournament',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='games', to='game.tournament'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['tournament', 'tournament_round', 'status'], name='game_tournament_round_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tournamentplayer',
+            constraint=models.UniqueConstraint(fields=('tournament', 'user'), name='tournament_player_unique'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 14:07
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def fill_room_fields(apps, schema_editor):
+    #комнаты, которые уже удалены или отвязаны от партий, восстановить не из чего
+    Game = apps.get_model('game', 'Game')
+    Room = apps.get_model('game', 'Room')
+    room = Room.objects.filter(pk=OuterRef('room_id'))
+    Game.objects.filter(room__isnull=False).update(
+        origin_room_id=F('room_id'),
+        room_code=Subquery(room.values('code')[:1]),
+        room_name=Subquery(room.values('name')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0012_stats_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='origin_room_id',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='room_code',
+            field=models.CharField(blank=True, default='', max_length=6),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='room_name',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.RunPython(fill_room_fields, migrations.RunPython.noop),
+    ]
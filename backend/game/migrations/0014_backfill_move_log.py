@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 16:20
+
+from django.db import migrations
+
+
+#партии, начатые до журнала ходов (0007), получили пустой moves при камнях на доске.
+#Порядок ходов не сохранился - восстанавливаем журнал, чередуя камни X и O по номерам клеток:
+#промежуточные позиции условны, но каждая позиция содержит только настоящие камни, а последняя совпадает с доской.
+#Упаковка зафиксирована здесь, чтобы миграция не зависела от будущих изменений game.engine
+def fill_move_log(apps, schema_editor):
+    Game = apps.get_model('game', 'Game')
+    for game in Game.objects.filter(moves=b'').only('id', 'board_size', 'board_state').iterator():
+        cells = game.board_size * game.board_size
+        value = int.from_bytes(bytes(game.board_state), 'little')
+        x_cells = [cell for cell in range(cells) if value >> cell & 1]
+        o_cells = [cell for cell in range(cells) if value >> (cells + cell) & 1]
+        #X ходит первым: камней X столько же, сколько O, или на один больше; иначе доска не из партии
+        if not x_cells or len(x_cells) - len(o_cells) not in (0, 1):
+            continue
+        order = [cell for pair in zip(x_cells, o_cells) for cell in pair] + x_cells[len(o_cells):]
+        move_size = 1 if cells <= 256 else 2
+        game.moves = b''.join(cell.to_bytes(move_size, 'little') for cell in order)
+        game.save(update_fields=['moves'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0013_game_room_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_move_log, migrations.RunPython.noop),
+    ]
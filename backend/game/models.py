@@ -1,8 +1,11 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
 import random
 import string
 
+from . import engine
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     games_played = models.IntegerField(default=0)
@@ -10,6 +13,12 @@ class UserProfile(models.Model):
     losses = models.IntegerField(default=0)
     draws = models.IntegerField(default=0)
     
+    class Meta:
+        indexes = [
+            #порядок таблицы лидеров (game/leaderboard.py)
+            models.Index(fields=['-wins', 'losses', 'user'], name='profile_rank_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.user.username} - W:{self.wins} L:{self.losses} D:{self.draws}"
 
@@ -24,24 +33,105 @@ class Room(models.Model):
         (FINISHED, 'Finished'),
     ]
     
+    MAX_PLAYERS = 2
+    
     name = models.CharField(max_length=100)
     code = models.CharField(max_length=6, unique=True)
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_rooms')
     players = models.ManyToManyField(User, related_name='joined_rooms', blank=True)
+    player_count = models.PositiveSmallIntegerField(default=0)  # денормализовано, меняется в add_player/remove_player
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=WAITING)
+    board_size = models.PositiveSmallIntegerField(default=3)
+    win_length = models.PositiveSmallIntegerField(default=3)  # сколько в ряд нужно для победы
+    version = models.PositiveIntegerField(default=0)  # растет при каждом изменении состава/статуса
+    bot_level = models.CharField(max_length=10, blank=True, default='')  # уровень бота, пусто - игра двух людей
+    last_activity = models.DateTimeField(default=timezone.now)  # запросы игроков и изменения комнаты (см. game/reaper.py)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    CODE_ALPHABET = string.ascii_uppercase + string.digits
+    CODE_LENGTH = 6
+    CODE_ATTEMPTS = 10
+    
+    @classmethod
+    def normalize_code(cls, code):
+        #код вводят руками: регистр и пробелы по краям не важны
+        return code.strip().upper()
+    
+    @classmethod
+    def generate_code(cls):
+        return ''.join(random.choices(cls.CODE_ALPHABET, k=cls.CODE_LENGTH))
+    
+    @classmethod
+    def free_codes(cls, count):
+        #count разных кодов, которых пока нет в БД, для bulk_create (save() там не вызывается):
+        #одна выборка по уникальному индексу на попытку, занятые коды заменяются новыми
+        codes = set()
+        while len(codes) < count:
+            candidates = {cls.generate_code() for _ in range(count - len(codes))} - codes
+            codes |= candidates - set(cls.objects.filter(code__in=candidates).values_list('code', flat=True))
+        return list(codes)
+    
     def save(self, *args, **kwargs):
-        if not self.code:
-            self.code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        super().save(*args, **kwargs)
+        if self.code or not self._state.adding:
+            return super().save(*args, **kwargs)
+        
+        #36^6 кодов против числа живых комнат: совпадение редкое, и его ловит сам уникальный индекс -
+        #пробуем вставить и при конфликте берем новый код, без предварительных SELECT
+        for _ in range(self.CODE_ATTEMPTS):
+            self.code = self.generate_code()
+            try:
+                #точка сохранения: неудачная вставка не ломает внешнюю транзакцию (PostgreSQL)
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                #нарушено другое ограничение - это не наш случай
+                if not Room.objects.filter(code=self.code).exists():
+                    raise
+        self.code = ''
+        raise IntegrityError('Не удалось подобрать свободный код комнаты')
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='room_status_created_idx'),
+            #поиск брошенных комнат (game/reaper.py)
+            models.Index(fields=['last_activity'], name='room_activity_idx'),
+        ]
     
     def __str__(self):
         return f"Room {self.name} ({self.code})"
     
-    @property
-    def player_count(self):
-        return self.players.count()
+    def touch(self, *fields):
+        #сохраняем переданные поля и поднимаем версию одним UPDATE, без перезаписи остальных колонок;
+        #любое изменение комнаты - это и отметка активности
+        values = {field: getattr(self, field) for field in fields}
+        self.last_activity = timezone.now()
+        Room.objects.filter(pk=self.pk).update(
+            version=models.F('version') + 1, last_activity=self.last_activity, **values
+        )
+        self.refresh_from_db(fields=['version'])
+    
+    def add_player(self, user):
+        #место занимаем условным UPDATE, так что два одновременных входа не переполнят комнату;
+        #счетчик и состав меняются в одной транзакции - подбор соперника не увидит одно без другого
+        with transaction.atomic():
+            taken = Room.objects.filter(pk=self.pk, player_count__lt=self.MAX_PLAYERS).update(
+                player_count=models.F('player_count') + 1
+            )
+            if not taken:
+                return False
+            self.players.add(user)
+        self.refresh_from_db(fields=['player_count'])
+        return True
+    
+    def remove_player(self, user):
+        with transaction.atomic():
+            self.players.remove(user)
+            Room.objects.filter(pk=self.pk).update(player_count=models.F('player_count') - 1)
+        self.refresh_from_db(fields=['player_count'])
+
+class StaleGameError(Exception):
+    #игру успели изменить между чтением и записью (двойной клик, повтор запроса)
+    pass
 
 class Game(models.Model):
     X = 'X'
@@ -64,60 +154,89 @@ class Game(models.Model):
         (DRAW, 'Draw'),
     ]
     
-    room = models.OneToOneField(Room, on_delete=models.CASCADE)
+    #после выхода игроков партия отвязывается от комнаты и остается в архиве (для повторов и статистики)
+    room = models.OneToOneField(Room, on_delete=models.SET_NULL, null=True, blank=True)
+    #комната на момент создания партии: room обнуляется при выходе игроков, а пустые и брошенные комнаты
+    #удаляются - архив партий (выгрузка, повторы) хранит ее id, код и название сам
+    origin_room_id = models.PositiveIntegerField(null=True, blank=True)
+    room_code = models.CharField(max_length=6, blank=True, default='')
+    room_name = models.CharField(max_length=100, blank=True, default='')
     player_x = models.ForeignKey(User, on_delete=models.CASCADE, related_name='games_as_x')
     player_o = models.ForeignKey(User, on_delete=models.CASCADE, related_name='games_as_o')
     current_turn = models.CharField(max_length=1, choices=SYMBOL_CHOICES, default=X)
-    board = models.JSONField(default=list)  # 3x3 поле как list of lists
+    board_size = models.PositiveSmallIntegerField(default=3)
+    win_length = models.PositiveSmallIntegerField(default=3)
+    board_state = models.BinaryField(default=engine.EMPTY)  # упакованные битборды X и O (см. engine.Geometry.pack)
+    moves = models.BinaryField(default=b'')  # журнал ходов, по клетке на ход (см. engine.Geometry.pack_move)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=ONGOING)
     winner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='won_games')
+    version = models.PositiveIntegerField(default=0)  # счетчик ходов/изменений состояния
+    last_activity = models.DateTimeField(default=timezone.now)  # время последнего хода (см. game/reaper.py)
     created_at = models.DateTimeField(auto_now_add=True)
     finished_at = models.DateTimeField(null=True, blank=True)
+    #партия турнира и номер тура (game/tournaments.py); после удаления турнира партия остается в архиве
+    tournament = models.ForeignKey('Tournament', on_delete=models.SET_NULL, null=True, blank=True, related_name='games')
+    tournament_round = models.PositiveSmallIntegerField(null=True, blank=True)
     
-    def save(self, *args, **kwargs):
-        if not self.board:
-            self.board = [['', '', ''], ['', '', ''], ['', '', '']]
-        super().save(*args, **kwargs)
+    class Meta:
+        indexes = [
+            #инкрементальная выгрузка партий по отметке finished_at (game/export.py)
+            models.Index(fields=['finished_at', 'id'], name='game_finished_idx'),
+            #поиск зависших партий (game/reaper.py)
+            models.Index(fields=['status', 'last_activity'], name='game_status_activity_idx'),
+            #незавершенные партии тура и таблица турнира (game/tournaments.py)
+            models.Index(fields=['tournament', 'tournament_round', 'status'], name='game_tournament_round_idx'),
+        ]
     
     def __str__(self):
-        return f"Game in {self.room.name} - {self.status}"
+        return f"Game {self.pk} - {self.status}"
+    
+    @staticmethod
+    def room_fields(room):
+        #поля комнаты для архива партии - для bulk_create, где save() не вызывается
+        return {'origin_room_id': room.id, 'room_code': room.code, 'room_name': room.name}
+    
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.origin_room_id is None and self.room is not None:
+            for field, value in self.room_fields(self.room).items():
+                setattr(self, field, value)
+        return super().save(*args, **kwargs)
+    
+    @property
+    def geometry(self):
+        return engine.get_geometry(self.board_size, self.win_length)
+    
+    @property
+    def bitboards(self):
+        return self.geometry.unpack(self.board_state)
+    
+    @property
+    def board(self):
+        #поле NxN как list of lists - в таком виде его ждет API
+        return self.geometry.to_grid(*self.bitboards)
+    
+    def symbol_at(self, row, col):
+        return self.geometry.symbol_at(*self.bitboards, row, col)
     
     def check_winner(self):
-        board = self.board
-        
-        #проверка по строкам
-        for row in board:
-            if row[0] == row[1] == row[2] != '':
-                return row[0]
-        
-        #проверка по столбцам
-        for col in range(3):
-            if board[0][col] == board[1][col] == board[2][col] != '':
-                return board[0][col]
-        
-        #проверка по диагоналям
-        if board[0][0] == board[1][1] == board[2][2] != '':
-            return board[0][0]
-        if board[0][2] == board[1][1] == board[2][0] != '':
-            return board[0][2]
-        
-        #ничья
-        if all(cell != '' for row in board for cell in row):
-            return 'draw'
-        
-        return None
+        return self.geometry.outcome(*self.bitboards)
     
     def make_move(self, row, col, player):
         if self.status != self.ONGOING:
             return False, "Игра на данный момент не идет"
         
-        if self.board[row][col] != '':
+        geometry = self.geometry
+        if not geometry.contains(row, col):
+            return False, "Клетка вне поля"
+        
+        x_bits, o_bits = self.bitboards
+        if geometry.is_occupied(x_bits, o_bits, row, col):
             return False, "Клетка уже занята"
         
-        #чекаем кто сейчас ходит
-        if player == self.player_x:
+        #чекаем кто сейчас ходит (по id, без загрузки игроков из БД)
+        if player.id == self.player_x_id:
             symbol = self.X
-        elif player == self.player_o:
+        elif player.id == self.player_o_id:
             symbol = self.O
         else:
             return False, "Игрока нет в игре"
@@ -127,21 +246,139 @@ class Game(models.Model):
             return False, "Сейчас не твой ход!"
         
         #ходим
-        self.board[row][col] = symbol
+        x_bits, o_bits = geometry.place(x_bits, o_bits, row, col, symbol)
+        now = timezone.now()
+        changes = {
+            'board_state': geometry.pack(x_bits, o_bits),
+            #ход дописывается в журнал тем же условным UPDATE, что и доска
+            'moves': bytes(self.moves) + geometry.pack_move(row, col),
+            'last_activity': now,
+        }
         
-        #проверяем на победителя
-        result = self.check_winner()
+        #проверяем на победителя только по линиям через эту клетку
+        result = geometry.outcome_after(x_bits, o_bits, row, col, symbol)
         if result == 'X':
-            self.status = self.X_WINS
-            self.winner = self.player_x
+            changes.update(status=self.X_WINS, winner_id=self.player_x_id)
         elif result == 'O':
-            self.status = self.O_WINS
-            self.winner = self.player_o
+            changes.update(status=self.O_WINS, winner_id=self.player_o_id)
         elif result == 'draw':
-            self.status = self.DRAW
+            changes.update(status=self.DRAW)
         else:
             #меняем очередь
-            self.current_turn = self.O if self.current_turn == self.X else self.X
+            changes['current_turn'] = self.O if self.current_turn == self.X else self.X
+        
+        if result:
+            changes['finished_at'] = now
         
-        self.save()
-        return True, "Успешно сделан ход"
\ No newline at end of file
+        self.save_if_unchanged(**changes)
+        return True, "Успешно сделан ход"
+    
+    def player_results(self):
+        #{user_id: 'wins' | 'losses' | 'draws'} для завершенной игры - имена счетчиков статистики
+        if self.status == self.DRAW:
+            return {self.player_x_id: 'draws', self.player_o_id: 'draws'}
+        loser_id = self.player_o_id if self.winner_id == self.player_x_id else self.player_x_id
+        return {self.winner_id: 'wins', loser_id: 'losses'}
+    
+    def forfeit(self, winner):
+        #техническая победа winner, если игра еще идет; False - игра уже завершилась
+        if self.status != self.ONGOING:
+            return False
+        self.save_if_unchanged(
+            status=self.X_WINS if winner.id == self.player_x_id else self.O_WINS,
+            winner_id=winner.id,
+            finished_at=timezone.now()
+        )
+        return True
+    
+    def save_if_unchanged(self, **changes):
+        #UPDATE ... WHERE version = n: один запрос, пишутся только изменившиеся колонки;
+        #если версия уже другая, кто-то успел изменить игру раньше нас
+        expected = self.version
+        changes['version'] = expected + 1
+        updated = Game.objects.filter(pk=self.pk, version=expected).update(**changes)
+        if not updated:
+            raise StaleGameError(f"Game {self.pk} changed since version {expected}")
+        for field, value in changes.items():
+            setattr(self, field, value)
+
+class Tournament(models.Model):
+    ROUND_ROBIN = 'round_robin'
+    SINGLE_ELIMINATION = 'single_elimination'
+    
+    FORMAT_CHOICES = [
+        (ROUND_ROBIN, 'Round robin'),
+        (SINGLE_ELIMINATION, 'Single elimination'),
+    ]
+    
+    REGISTRATION = 'registration'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    
+    STATUS_CHOICES = [
+        (REGISTRATION, 'Registration'),
+        (RUNNING, 'Running'),
+        (FINISHED, 'Finished'),
+    ]
+    
+    name = models.CharField(max_length=100)
+    format = models.CharField(max_length=20, choices=FORMAT_CHOICES, default=ROUND_ROBIN)
+    status = models.CharField(max_length=15, choices=STATUS_CHOICES, default=REGISTRATION)
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_tournaments')
+    players = models.ManyToManyField(User, through='TournamentPlayer', related_name='tournaments')
+    board_size = models.PositiveSmallIntegerField(default=3)
+    win_length = models.PositiveSmallIntegerField(default=3)
+    current_round = models.PositiveSmallIntegerField(default=0)  # 0 - турнир еще не начался
+    winner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='won_tournaments')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Tournament {self.name} ({self.format})"
+
+class TournamentPlayer(models.Model):
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='entries')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tournament_entries')
+    seed = models.PositiveIntegerField(null=True, blank=True)  # номер посева, назначается при старте (1 - сильнейший)
+    eliminated_round = models.PositiveSmallIntegerField(null=True, blank=True)  # выбыл в этом туре (на выбывание)
+    joined_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tournament', 'user'], name='tournament_player_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} in {self.tournament}"
+
+class UserDailyStats(models.Model):
+    #суточная сводка игрока (game/rollups.py): пишется приращениями при завершении партии, день - по finished_at
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    games_played = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    draws = models.PositiveIntegerField(default=0)
+    duration_total = models.FloatField(default=0)  # суммарная длительность партий в секундах (среднее = / games_played)
+    
+    class Meta:
+        constraints = [
+            #он же индекс истории игрока по дням
+            models.UniqueConstraint(fields=['user', 'day'], name='user_daily_stats_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} {self.day} - W:{self.wins} L:{self.losses} D:{self.draws}"
+
+class HourlyStats(models.Model):
+    #почасовая сводка по всем партиям (game/rollups.py), час - начало часа finished_at
+    hour = models.DateTimeField(unique=True)
+    games_played = models.PositiveIntegerField(default=0)
+    x_wins = models.PositiveIntegerField(default=0)
+    o_wins = models.PositiveIntegerField(default=0)
+    draws = models.PositiveIntegerField(default=0)
+    duration_total = models.FloatField(default=0)
+    
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H}:00 - {self.games_played} games"
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+LOBBY_CHANNEL = 'lobby'
+
+def room_channel(room_id):
+    return f'room:{room_id}'
+
+class BaseBroker:
+    #интерфейс брокера: publish вызывается из синхронных view,
+    #subscribe - из event loop SSE-потока и возвращает подписку с async get() и close()
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+class QueueSubscription:
+    #подписка на канал in-process брокера: asyncio-очередь в event loop подписчика
+    def __init__(self, broker, channel, queue_size):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def deliver(self, message):
+        #медленный клиент теряет сообщения, а не копит их в памяти - он все равно перечитает состояние
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class InProcessBroker(BaseBroker):
+    #pub/sub внутри одного процесса
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                #loop подписчика уже закрыт, подписка снимется при закрытии потока
+                pass
+
+    def subscribe(self, channel):
+        subscription = QueueSubscription(self, channel, self.queue_size)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    #брокер задается в settings.GAME_PUSH_BROKER, чтобы его можно было заменить внешним (например, Redis)
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.GAME_PUSH_BROKER)()
+    return _broker
+
+def publish(channel, message):
+    #рассылаем только после коммита, чтобы клиент не увидел событие раньше данных в БД
+    transaction.on_commit(lambda: get_broker().publish(channel, message))
+
+def room_state_message(room):
+    return {
+        'type': 'room',
+        'room': room.id,
+        'status': room.status,
+        'player_count': room.player_count,
+    }
+
+def notify_room_changed(room, version):
+    message = room_state_message(room)
+    publish(room_channel(room.id), dict(message, version=version))
+    publish(LOBBY_CHANNEL, message)
+
+def notify_room_removed(room_id):
+    message = {'type': 'room_removed', 'room': room_id}
+    publish(room_channel(room_id), message)
+    publish(LOBBY_CHANNEL, message)
+
+def notify_move(room, game, row, col, symbol, version):
+    publish(room_channel(room.id), {
+        'type': 'move',
+        'room': room.id,
+        'version': version,
+        'row': row,
+        'col': col,
+        'symbol': symbol,
+        'current_turn': game.current_turn,
+        'status': game.status,
+        'winner': game.winner_id,
+    })
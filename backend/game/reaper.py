@@ -0,0 +1,91 @@
+#уборка брошенных комнат: игроки закрыли вкладку, не вызвав leave_room.
+#Партия без хода дольше GAME_MOVE_TIMEOUT секунд засчитывается как поражение того, чей ход (будь он на месте,
+#он бы уже походил); комната без активности игроков дольше GAME_ROOM_IDLE_TIMEOUT удаляется, партия
+#остается в архиве. Активность комнаты - room_detail, поток событий и любые изменения (Room.touch).
+#Все идет пачками по batch_size, каждая пачка - отдельная короткая транзакция
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import matchmaking, push, stats, tournaments
+from .cache import game_cache
+from .models import Room, Game, StaleGameError
+
+logger = logging.getLogger('game.reaper')
+
+def forfeit_stalled_games(now, batch_size):
+    #техническое поражение в зависших партиях; возвращает число завершенных партий
+    cutoff = now - timedelta(seconds=settings.GAME_MOVE_TIMEOUT)
+    stalled = Game.objects.filter(status=Game.ONGOING, last_activity__lt=cutoff).select_related(
+        'player_x', 'player_o'
+    ).order_by('id')
+    total = 0
+    last_id = 0
+    while True:
+        games = list(stalled.filter(id__gt=last_id)[:batch_size])
+        if not games:
+            return total
+        last_id = games[-1].id
+
+        finished = []
+        with transaction.atomic():
+            for game in games:
+                winner = game.player_o if game.current_turn == Game.X else game.player_x
+                try:
+                    game.forfeit(winner)
+                except StaleGameError:
+                    #игрок походил между выборкой и записью - партия жива
+                    continue
+                finished.append(game)
+            stats.record_games(finished)
+            tournaments.games_finished(finished)
+            #last_activity не трогаем: комнату без игроков удалит следующий шаг
+            room_ids = [game.room_id for game in finished if game.room_id]
+            Room.objects.filter(id__in=room_ids).update(status=Room.FINISHED, version=F('version') + 1)
+
+        for room in Room.objects.filter(id__in=room_ids):
+            game_cache.invalidate(room.id)
+            push.notify_room_changed(room, game_cache.version(room.id))
+        total += len(finished)
+
+def remove_idle_rooms(now, batch_size):
+    #удаляет комнаты без активности; возвращает число удаленных комнат
+    cutoff = now - timedelta(seconds=settings.GAME_ROOM_IDLE_TIMEOUT)
+    #комнаты с идущей партией ждут ее технического завершения
+    playing = Game.objects.filter(status=Game.ONGOING, room__isnull=False).values('room_id')
+    idle = Room.objects.filter(last_activity__lt=cutoff).exclude(id__in=playing).order_by('id')
+    total = 0
+    while True:
+        with transaction.atomic():
+            #занятые сейчас строки (вход в комнату, heartbeat) пропускаем до следующего прохода
+            rooms = list(idle.select_for_update(skip_locked=True).values_list('id', 'code')[:batch_size])
+            if not rooms:
+                return total
+            room_ids = [room_id for room_id, _ in rooms]
+            #членство удаляется каскадом, партии отвязываются (SET_NULL)
+            Room.objects.filter(id__in=room_ids).delete()
+
+        for room_id, code in rooms:
+            matchmaking.cancel(room_id)
+            game_cache.invalidate(room_id)
+            game_cache.forget_code(code)
+            push.notify_room_removed(room_id)
+        total += len(room_ids)
+
+def reap(batch_size=None):
+    #один проход уборки: сначала зависшие партии, потом пустующие комнаты; заодно доводим турниры,
+    #чей тур доигран, но следующий не создан (процесс упал до on_commit последней партии)
+    batch_size = batch_size or settings.GAME_REAPER_BATCH_SIZE
+    now = timezone.now()
+    forfeited = forfeit_stalled_games(now, batch_size)
+    removed = remove_idle_rooms(now, batch_size)
+    if forfeited or removed:
+        logger.info('Reaper: %d stalled games forfeited, %d idle rooms removed', forfeited, removed)
+    advanced = tournaments.advance_all()
+    if advanced:
+        logger.info('Reaper: %d tournaments advanced', advanced)
+    return forfeited, removed
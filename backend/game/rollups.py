@@ -0,0 +1,130 @@
+#сводки статистики по времени: игрок по дням (UserDailyStats) и все партии по часам (HourlyStats).
+#Строки сводок получают приращения в транзакции завершения партии (stats.record_games), поэтому история
+#читается из маленьких таблиц сводок, а не сканированием Game по finished_at. Партия попадает в день и час
+#своего finished_at, так что приращения пишутся только в текущие строки, а прошлые дни можно пересчитать
+#из Game (rebuild_day, manage.py backfill_stats) без гонки с завершающимися сейчас партиями.
+#Дни и часы считаются в UTC, независимо от TIME_ZONE: при поясе со сдвигом не на целый час границы
+#местного дня не совпали бы с границами часов, и пересчет дня задел бы чужие часы
+import datetime
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+
+from .models import Game, HourlyStats, UserDailyStats
+
+CHUNK_SIZE = 2000
+
+#исход партии -> счетчик почасовой сводки
+HOURLY_RESULTS = {Game.X_WINS: 'x_wins', Game.O_WINS: 'o_wins', Game.DRAW: 'draws'}
+
+#поля для пересчета сводок; остальные колонки партии (доска, журнал ходов) не читаем
+GAME_FIELDS = ('player_x_id', 'player_o_id', 'winner_id', 'status', 'created_at', 'finished_at')
+
+def day_of(moment):
+    return moment.astimezone(datetime.timezone.utc).date()
+
+def hour_of(moment):
+    return moment.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+def today():
+    return day_of(timezone.now())
+
+def day_bounds(day):
+    #начало дня и следующего дня (UTC)
+    start = datetime.datetime.combine(day, datetime.time.min, tzinfo=datetime.timezone.utc)
+    return start, start + datetime.timedelta(days=1)
+
+def game_deltas(games):
+    #приращения сводок для завершенных партий: {(user_id, день): Counter}, {час: Counter}
+    daily = defaultdict(Counter)
+    hourly = defaultdict(Counter)
+    for game in games:
+        duration = (game.finished_at - game.created_at).total_seconds()
+        day = day_of(game.finished_at)
+        for user_id, result in game.player_results().items():
+            daily[user_id, day].update({'games_played': 1, result: 1, 'duration_total': duration})
+        hourly[hour_of(game.finished_at)].update({
+            'games_played': 1, HOURLY_RESULTS[game.status]: 1, 'duration_total': duration
+        })
+    return dict(daily), dict(hourly)
+
+def _increment(model, rows):
+    #rows - [(поля ключа строки, Counter приращений)]: недостающие строки создаются одним INSERT
+    #(ON CONFLICT DO NOTHING), затем UPDATE ... SET поле = поле + n по строке - без чтения сводки в Python
+    if not rows:
+        return
+    model.objects.bulk_create([model(**key) for key, _ in rows], ignore_conflicts=True)
+    for key, delta in rows:
+        model.objects.filter(**key).update(**{field: F(field) + amount for field, amount in delta.items()})
+
+def apply_deltas(daily, hourly):
+    #вызывается в транзакции
+    _increment(UserDailyStats, [({'user_id': user_id, 'day': day}, delta) for (user_id, day), delta in daily.items()])
+    _increment(HourlyStats, [({'hour': hour}, delta) for hour, delta in hourly.items()])
+
+def rebuild_day(day, chunk_size=CHUNK_SIZE):
+    #пересчитывает сводки дня по партиям из Game в одной транзакции: читатели видят либо старый день,
+    #либо новый целиком. Повторный запуск дает тот же результат. Возвращает число партий дня
+    start, end = day_bounds(day)
+    games = Game.objects.exclude(status=Game.ONGOING).filter(
+        finished_at__gte=start, finished_at__lt=end
+    ).only(*GAME_FIELDS).order_by('finished_at', 'id')
+
+    #партии читаются пачками по chunk_size, в памяти - только сводки дня
+    daily, hourly = game_deltas(games.iterator(chunk_size=chunk_size))
+    count = sum(delta['games_played'] for delta in hourly.values())
+
+    with transaction.atomic():
+        UserDailyStats.objects.filter(day=day).delete()
+        HourlyStats.objects.filter(hour__gte=start, hour__lt=end).delete()
+        #строк дня после удаления нет - вставляем готовые строки пачками, без UPDATE на строку
+        UserDailyStats.objects.bulk_create([
+            UserDailyStats(user_id=user_id, day=row_day, **delta) for (user_id, row_day), delta in daily.items()
+        ], batch_size=chunk_size)
+        HourlyStats.objects.bulk_create([HourlyStats(hour=hour, **delta) for hour, delta in hourly.items()])
+    return count
+
+def first_game_day():
+    #день самой ранней завершенной партии (по индексу game_finished_idx); None - партий нет
+    first = Game.objects.exclude(status=Game.ONGOING).filter(finished_at__isnull=False).order_by('finished_at').values_list(
+        'finished_at', flat=True
+    ).first()
+    return day_of(first) if first else None
+
+def _with_average(rows):
+    #средняя длительность партии в секундах вместо суммы
+    for row in rows:
+        total = row.pop('duration_total')
+        row['avg_duration'] = round(total / row['games_played'], 1) if row['games_played'] else None
+    return rows
+
+def user_history(user_id, since, period='day'):
+    #история игрока с дня since по дням или неделям (неделя - с понедельника)
+    rows = UserDailyStats.objects.filter(user_id=user_id, day__gte=since)
+    if period == 'week':
+        rows = rows.annotate(period=TruncWeek('day')).values('period').annotate(
+            games_played=Sum('games_played'), wins=Sum('wins'), losses=Sum('losses'),
+            draws=Sum('draws'), duration_total=Sum('duration_total'),
+        )
+    else:
+        rows = rows.annotate(period=F('day')).values(
+            'period', 'games_played', 'wins', 'losses', 'draws', 'duration_total'
+        )
+    return _with_average(list(rows.order_by('period')))
+
+def global_history(since, period='hour'):
+    #все партии с момента since по часам или дням
+    rows = HourlyStats.objects.filter(hour__gte=since)
+    if period == 'day':
+        rows = rows.annotate(period=TruncDate('hour', tzinfo=datetime.timezone.utc)).values('period').annotate(
+            games_played=Sum('games_played'), x_wins=Sum('x_wins'), o_wins=Sum('o_wins'),
+            draws=Sum('draws'), duration_total=Sum('duration_total'),
+        )
+    else:
+        rows = rows.annotate(period=F('hour')).values(
+            'period', 'games_played', 'x_wins', 'o_wins', 'draws', 'duration_total'
+        )
+    return _with_average(list(rows.order_by('period')))
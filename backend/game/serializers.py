@@ -1,6 +1,10 @@
+from functools import lru_cache
+from operator import attrgetter
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import UserProfile, Room, Game
+from . import bot, engine
+from .models import UserProfile, Room, Game, Tournament
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -17,27 +21,90 @@ class UserProfileSerializer(serializers.ModelSerializer):
 class RoomSerializer(serializers.ModelSerializer):
     creator = UserSerializer(read_only=True)
     players = UserSerializer(many=True, read_only=True)
-    player_count = serializers.ReadOnlyField()
     
     class Meta:
         model = Room
-        fields = ['id', 'name', 'code', 'creator', 'players', 'player_count', 'status', 'created_at']
-        read_only_fields = ['code', 'created_at']
+        fields = ['id', 'name', 'code', 'creator', 'players', 'player_count', 'status', 'board_size', 'win_length', 'bot_level', 'created_at']
+        read_only_fields = ['code', 'player_count', 'bot_level', 'created_at']
+
+class TournamentSerializer(serializers.ModelSerializer):
+    creator = UserSerializer(read_only=True)
+    winner = UserSerializer(read_only=True)
+    #из аннотации в списке турниров, иначе считается по участникам
+    player_count = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Tournament
+        fields = ['id', 'name', 'format', 'status', 'creator', 'player_count', 'board_size', 'win_length', 'current_round', 'winner', 'created_at', 'started_at', 'finished_at']
+    
+    def get_player_count(self, tournament):
+        count = getattr(tournament, 'player_count', None)
+        return count if count is not None else tournament.entries.count()
 
 class GameSerializer(serializers.ModelSerializer):
     player_x = UserSerializer(read_only=True)
     player_o = UserSerializer(read_only=True)
     winner = UserSerializer(read_only=True)
     room = RoomSerializer(read_only=True)
+    board = serializers.ReadOnlyField()
     
     class Meta:
         model = Game
-        fields = ['id', 'room', 'player_x', 'player_o', 'current_turn', 'board', 'status', 'winner', 'created_at', 'finished_at']
+        fields = ['id', 'room', 'player_x', 'player_o', 'current_turn', 'board', 'board_size', 'win_length', 'status', 'winner', 'created_at', 'finished_at']
         read_only_fields = ['created_at', 'finished_at']
 
+#компактный ответ (?view=compact) для горячих эндпоинтов: только поле, ход, статус, id победителя и версия,
+#без ModelSerializer и вложенных комнат/пользователей
+COMPACT_GAME_FIELDS = ('board_size', 'win_length', 'board_state', 'current_turn', 'status', 'winner_id')
+_compact_game_fields = attrgetter(*COMPACT_GAME_FIELDS)
+
+@lru_cache(maxsize=4096)
+def _render_board(board_size, win_length, board_state):
+    #одинаковые позиции рендерятся один раз; кортежи, чтобы закэшированное поле нельзя было изменить
+    geometry = engine.get_geometry(board_size, win_length)
+    return tuple(map(tuple, geometry.to_grid(*geometry.unpack(board_state))))
+
+def compact_game_row(row, version):
+    #row - значения COMPACT_GAME_FIELDS (например, из values_list) или None, если игры еще нет
+    if row is None:
+        return {'version': version, 'board': None, 'current_turn': None, 'status': None, 'winner': None}
+    board_size, win_length, board_state, current_turn, game_status, winner_id = row
+    return {
+        'version': version,
+        'board': _render_board(board_size, win_length, bytes(board_state)),
+        'current_turn': current_turn,
+        'status': game_status,
+        'winner': winner_id,
+    }
+
+def compact_game_data(game, version):
+    return compact_game_row(_compact_game_fields(game), version)
+
 class MakeMoveSerializer(serializers.Serializer):
-    row = serializers.IntegerField(min_value=0, max_value=2)
-    col = serializers.IntegerField(min_value=0, max_value=2)
+    #границы конкретного поля проверяет Game.make_move
+    row = serializers.IntegerField(min_value=0, max_value=engine.MAX_SIZE - 1)
+    col = serializers.IntegerField(min_value=0, max_value=engine.MAX_SIZE - 1)
+
+class BoardOptionsSerializer(serializers.Serializer):
+    #размер поля и длина линии для новой комнаты; по умолчанию классика 3x3
+    board_size = serializers.IntegerField(min_value=engine.MIN_SIZE, max_value=engine.MAX_SIZE, default=3)
+    win_length = serializers.IntegerField(min_value=engine.MIN_WIN_LENGTH, required=False)
+    
+    def validate(self, data):
+        data.setdefault('win_length', engine.default_win_length(data['board_size']))
+        if data['win_length'] > data['board_size']:
+            raise serializers.ValidationError("Длина линии не может быть больше размера поля")
+        return data
+
+class TournamentOptionsSerializer(BoardOptionsSerializer):
+    #новый турнир: формат и поле, на котором играются все его партии
+    name = serializers.CharField(max_length=100, required=False)
+    format = serializers.ChoiceField(choices=[Tournament.ROUND_ROBIN, Tournament.SINGLE_ELIMINATION], default=Tournament.ROUND_ROBIN)
+
+class BotGameSerializer(BoardOptionsSerializer):
+    #игра с ботом: уровень сложности и символ игрока (по умолчанию случайный)
+    level = serializers.ChoiceField(choices=list(bot.LEVELS), default='hard')
+    symbol = serializers.ChoiceField(choices=[Game.X, Game.O], required=False)
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
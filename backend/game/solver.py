@@ -0,0 +1,326 @@
+#решатель для бота.
+#Классика 3x3: все достижимые позиции перебираются один раз (с учетом 8 симметрий поля), для каждой
+#сохраняются значение и лучший ход - один байт на позицию, индекс - запись поля в троичной системе.
+#Ход и оценка позиции - чтение одного байта; таблицу можно сохранить в файл и открывать через mmap.
+#Большие поля: alpha-beta с итеративным углублением, LRU-кэшем позиций и ограничением по времени
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from . import engine
+
+#значение позиции для того, кто ходит (старшие 4 бита байта таблицы); младшие 4 бита - лучшая клетка
+LOSS = 1
+DRAW = 2
+WIN = 3
+NO_MOVE = 0x0F
+
+_CELLS = 9
+TABLE_SIZE = 3 ** _CELLS
+
+#вклад набора клеток одного игрока в троичный индекс: X - цифра 1, O - цифра 2
+_TERNARY = tuple(sum(3 ** cell for cell in range(_CELLS) if bits >> cell & 1) for bits in range(1 << _CELLS))
+
+#при равных ходах выбираем центр, потом углы
+_MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+def _popcount(bits):
+    return bin(bits).count('1')
+
+def _symmetries():
+    #8 симметрий квадрата (4 поворота с отражением и без) как перестановки клеток
+    permutations = []
+    for reflect in (False, True):
+        for turns in range(4):
+            permutation = []
+            for cell in range(_CELLS):
+                row, col = divmod(cell, 3)
+                if reflect:
+                    col = 2 - col
+                for _ in range(turns):
+                    row, col = col, 2 - row
+                permutation.append(row * 3 + col)
+            permutations.append(permutation)
+    return permutations
+
+def _solve_classic():
+    geometry = engine.CLASSIC
+    permuted = [
+        [sum(1 << permutation[cell] for cell in range(_CELLS) if bits >> cell & 1) for bits in range(1 << _CELLS)]
+        for permutation in _symmetries()
+    ]
+    scores = {}
+
+    def children(x_bits, o_bits):
+        x_to_move = _popcount(x_bits) == _popcount(o_bits)
+        free = geometry.full_mask & ~(x_bits | o_bits)
+        for cell in _MOVE_ORDER:
+            if free >> cell & 1:
+                yield cell, (x_bits | 1 << cell, o_bits) if x_to_move else (x_bits, o_bits | 1 << cell)
+
+    def is_terminal(x_bits, o_bits):
+        return geometry.outcome(x_bits, o_bits) is not None
+
+    def score(x_bits, o_bits):
+        #для того, кто ходит: >0 выигрыш (чем быстрее, тем больше), <0 проигрыш, 0 ничья.
+        #Симметричные позиции считаются один раз
+        key = min(table[x_bits] | table[o_bits] << _CELLS for table in permuted)
+        if key in scores:
+            return scores[key]
+        result = geometry.outcome(x_bits, o_bits)
+        empty = _CELLS - _popcount(x_bits | o_bits)
+        if result == engine.DRAW:
+            value = 0
+        elif result:
+            #последним ходил соперник, значит он и выиграл
+            value = -(1 + empty)
+        else:
+            value = max(-score(*child) for _, child in children(x_bits, o_bits))
+        scores[key] = value
+        return value
+
+    table = bytearray(TABLE_SIZE)
+    seen = {(0, 0)}
+    stack = [(0, 0)]
+    while stack:
+        x_bits, o_bits = stack.pop()
+        value = score(x_bits, o_bits)
+        best_cell = NO_MOVE
+        if not is_terminal(x_bits, o_bits):
+            best_score = None
+            for cell, child in children(x_bits, o_bits):
+                child_score = -score(*child)
+                if best_score is None or child_score > best_score:
+                    best_score, best_cell = child_score, cell
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        outcome = WIN if value > 0 else LOSS if value < 0 else DRAW
+        table[_TERNARY[x_bits] + 2 * _TERNARY[o_bits]] = outcome << 4 | best_cell
+    return table
+
+class PerfectTable:
+    #идеальная игра на 3x3: байт на каждую позицию (недостижимые - нули)
+    def __init__(self, data):
+        if len(data) != TABLE_SIZE:
+            raise ValueError(f"Таблица решений должна занимать {TABLE_SIZE} байт")
+        self.data = data
+
+    @classmethod
+    def build(cls):
+        return cls(bytes(_solve_classic()))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def save(self, path):
+        #через временный файл: другой процесс не увидит недописанную таблицу
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(self.data)
+        os.replace(temporary, path)
+
+    def _entry(self, x_bits, o_bits):
+        return self.data[_TERNARY[x_bits] + 2 * _TERNARY[o_bits]]
+
+    def value(self, x_bits, o_bits):
+        #WIN/DRAW/LOSS для того, кто ходит
+        return self._entry(x_bits, o_bits) >> 4
+
+    def best_move(self, x_bits, o_bits):
+        #индекс клетки или None, если игра закончена
+        cell = self._entry(x_bits, o_bits) & 0x0F
+        return None if cell == NO_MOVE else cell
+
+def load_table(path=None):
+    #таблица из файла (mmap); если файла нет - считаем и сохраняем
+    if path and os.path.exists(path):
+        return PerfectTable.load(path)
+    table = PerfectTable.build()
+    if path:
+        table.save(path)
+    return table
+
+#alpha-beta для больших полей
+WIN_SCORE = 10 ** 18
+_INFINITY = float('inf')
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+class TranspositionCache:
+    #LRU-кэш позиций, общий для всех поисков процесса:
+    #(размер, длина линии, клетки ходящего, клетки соперника) -> (глубина, оценка, флаг, лучшая клетка)
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+class _Timeout(Exception):
+    pass
+
+@lru_cache(maxsize=None)
+def _neighbourhoods(size):
+    #для каждой клетки - маска соседних клеток: ходы ищем только рядом с уже поставленными
+    masks = []
+    for cell in range(size * size):
+        row, col = divmod(cell, size)
+        mask = 0
+        for neighbour_row in range(max(row - 1, 0), min(row + 2, size)):
+            for neighbour_col in range(max(col - 1, 0), min(col + 2, size)):
+                mask |= 1 << (neighbour_row * size + neighbour_col)
+        masks.append(mask)
+    return tuple(masks)
+
+def _cells(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+class Searcher:
+    #позиция задается как (клетки ходящего, клетки соперника), после хода они меняются местами
+    def __init__(self, geometry, cache, time_budget):
+        self.geometry = geometry
+        self.cache = cache
+        self.deadline = time.monotonic() + time_budget
+        self.neighbourhoods = _neighbourhoods(geometry.size)
+        #открытая линия с n своими камнями стоит 4^n
+        self.weights = tuple(0 if count == 0 else 4 ** count for count in range(geometry.win_length + 1))
+        self.nodes = 0
+
+    def candidates(self, mover, other):
+        occupied = mover | other
+        if not occupied:
+            center = self.geometry.size // 2
+            return [self.geometry.cell_index(center, center)]
+        near = 0
+        for cell in _cells(occupied):
+            near |= self.neighbourhoods[cell]
+        return list(_cells(near & ~occupied))
+
+    def ordered_moves(self, mover, other, first=None):
+        #сначала лучший ход из кэша, затем выигрыш, защита и клетки на самых заполненных линиях
+        geometry = self.geometry
+
+        def priority(cell):
+            if cell == first:
+                return _INFINITY
+            row, col = divmod(cell, geometry.size)
+            bit = 1 << cell
+            if geometry.wins_through(mover | bit, row, col):
+                return WIN_SCORE * 2
+            if geometry.wins_through(other | bit, row, col):
+                return WIN_SCORE
+            score = 0
+            for mask in geometry.lines_through[cell]:
+                if not mask & other:
+                    score += self.weights[_popcount(mask & mover)]
+                if not mask & mover:
+                    score += self.weights[_popcount(mask & other)]
+            return score
+
+        return sorted(self.candidates(mover, other), key=priority, reverse=True)
+
+    def evaluate(self, mover, other):
+        #сумма по линиям, где есть камни только одного игрока
+        score = 0
+        for mask in self.geometry.win_masks:
+            mine = mover & mask
+            theirs = other & mask
+            if mine and not theirs:
+                score += self.weights[_popcount(mine)]
+            elif theirs and not mine:
+                score -= self.weights[_popcount(theirs)]
+        return score
+
+    def negamax(self, mover, other, depth, alpha, beta, last_cell):
+        self.nodes += 1
+        if self.nodes & 255 == 0 and time.monotonic() > self.deadline:
+            raise _Timeout
+
+        geometry = self.geometry
+        #последний ход соперника мог закончить игру; ранний проигрыш хуже позднего
+        if last_cell is not None and geometry.wins_through(other, *divmod(last_cell, geometry.size)):
+            return -WIN_SCORE - depth
+        if geometry.is_full(mover, other):
+            return 0
+        if depth == 0:
+            return self.evaluate(mover, other)
+
+        key = (geometry.size, geometry.win_length, mover, other)
+        entry = self.cache.get(key)
+        cached_cell = None
+        if entry is not None:
+            entry_depth, score, flag, cached_cell = entry
+            if entry_depth >= depth and (
+                flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha)
+            ):
+                return score
+
+        original_alpha = alpha
+        best_score = -_INFINITY
+        best_cell = None
+        for cell in self.ordered_moves(mover, other, cached_cell):
+            score = -self.negamax(other, mover | 1 << cell, depth - 1, -beta, -alpha, cell)
+            if score > best_score:
+                best_score, best_cell = score, cell
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.cache.set(key, (depth, best_score, flag, best_cell))
+        return best_score
+
+    def best_move(self, mover, other):
+        #итеративное углубление: по истечении времени берем ход последней завершенной глубины
+        moves = self.ordered_moves(mover, other)
+        best_cell = moves[0]
+        if len(moves) == 1:
+            return best_cell
+
+        empty = self.geometry.cells - _popcount(mover | other)
+        for depth in range(1, empty + 1):
+            try:
+                alpha = -_INFINITY
+                depth_cell = None
+                for cell in self.ordered_moves(mover, other, best_cell):
+                    score = -self.negamax(other, mover | 1 << cell, depth - 1, -_INFINITY, -alpha, cell)
+                    if depth_cell is None or score > alpha:
+                        alpha, depth_cell = score, cell
+            except _Timeout:
+                break
+            best_cell = depth_cell
+            #исход форсирован - глубже искать незачем
+            if abs(alpha) >= WIN_SCORE:
+                break
+        return best_cell
@@ -0,0 +1,170 @@
+#режим зрителя: один готовый снимок комнаты на процесс, общий для всех ее зрителей.
+#Снимок - уже сериализованный JSON (bytes) с версией состояния: запрос зрителя не читает БД, не запускает
+#сериализаторы и не кодирует JSON, а отдает те же байты или 304 по ETag. Снимок пересобирается, только когда
+#меняется версия состояния: ход или изменение комнаты в этом процессе сбрасывают его сразу (сигнал
+#state_changed кэша), изменения в других процессах видны через проверку версии по кэшу состояния - не чаще
+#раза в GAME_SPECTATOR_REVALIDATE секунд на комнату, сколько бы зрителей ее ни смотрели
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from .cache import game_cache, state_changed, state_version
+from .models import Room
+from .serializers import COMPACT_GAME_FIELDS, compact_game_row
+
+#замки сборки по комнатам: одновременные промахи одной комнаты ждут одну сборку, а не строят снимок каждый
+BUILD_LOCKS = 64
+
+class Snapshot:
+    __slots__ = ('version', 'body', 'code', 'header', 'checked_at')
+
+    def __init__(self, version, body, code, header, checked_at):
+        self.version = version
+        self.body = body  # JSON ответа
+        self.code = code  # код комнаты: id удаленной комнаты может достаться новой
+        self.header = header  # название комнаты и имена игроков - не меняются от хода к ходу
+        self.checked_at = checked_at  # когда версия последний раз сверялась с кэшем состояния
+
+class SnapshotStore:
+    def __init__(self, size, revalidate):
+        self.size = size
+        self.revalidate = revalidate
+        self._lock = threading.Lock()
+        self._snapshots = OrderedDict()  # room_id -> Snapshot
+        self._build_locks = [threading.Lock() for _ in range(BUILD_LOCKS)]
+        self._counters = Counter()
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _fresh(self, snapshot, version, checked_after):
+        if snapshot is None:
+            return False
+        if version is not None and snapshot.version == version:
+            return True
+        if snapshot.checked_at is None:
+            return False
+        return snapshot.checked_at >= max(checked_after, time.monotonic() - self.revalidate)
+
+    def peek(self, room_id, version=None, checked_after=0):
+        #снимок без ввода-вывода (можно звать из event loop); None - снимок надо сверить или собрать (get)
+        with self._lock:
+            snapshot = self._snapshots.get(room_id)
+            if not self._fresh(snapshot, version, checked_after):
+                return None
+            self._snapshots.move_to_end(room_id)
+            self._counters['hits'] += 1
+        return snapshot
+
+    def get(self, room_id, version=None, checked_after=0):
+        #снимок, сверенный с кэшем состояния не раньше checked_after (или уже версии version).
+        #None - комнаты нет. Читает кэш состояния, при сборке - БД
+        with self._build_locks[room_id % BUILD_LOCKS]:
+            #пока ждали замок, снимок мог обновить другой зритель
+            snapshot = self.peek(room_id, version, checked_after)
+            if snapshot is not None:
+                return snapshot
+
+            #отметка до чтения состояния: изменение во время чтения увидит следующая сверка
+            checked_at = time.monotonic()
+            state = game_cache.get(room_id)
+            if state is None:
+                self.forget(room_id)
+                return None
+            with self._lock:
+                previous = self._snapshots.get(room_id)
+            if previous is not None and previous.code != state['room']['code']:
+                previous = None
+
+            version = state_version(state)
+            if previous is not None and previous.version == version:
+                self._count('revalidations')
+                snapshot = Snapshot(version, previous.body, previous.code, previous.header, checked_at)
+            else:
+                self._count('builds')
+                header = self._header(room_id, state, previous)
+                if header is None:
+                    self.forget(room_id)
+                    return None
+                snapshot = Snapshot(version, self._render(room_id, state, header, version), state['room']['code'], header, checked_at)
+
+            with self._lock:
+                self._snapshots[room_id] = snapshot
+                self._snapshots.move_to_end(room_id)
+                while len(self._snapshots) > self.size:
+                    self._snapshots.popitem(last=False)
+            return snapshot
+
+    def _header(self, room_id, state, previous):
+        #название и игроки: два запроса, только когда меняется состав; ходы берут их из прошлого снимка
+        members = sorted(state['members'])
+        if previous is not None and previous.header['member_ids'] == members:
+            return previous.header
+        name = Room.objects.filter(id=room_id).values_list('name', flat=True).first()
+        if name is None:
+            return None
+        usernames = dict(User.objects.filter(id__in=members).values_list('id', 'username'))
+        return {'name': name, 'member_ids': members, 'usernames': usernames}
+
+    def _render(self, room_id, state, header, version):
+        room = state['room']
+        usernames = header['usernames']
+
+        def player(user_id):
+            return {'id': user_id, 'username': usernames.get(user_id, '')}
+
+        game = state['game']
+        data = {
+            'id': room_id,
+            'name': header['name'],
+            'status': room['status'],
+            'board_size': room['board_size'],
+            'win_length': room['win_length'],
+            'players': [player(user_id) for user_id in header['member_ids']],
+            'game': None,
+            'version': version,
+        }
+        if game:
+            data['game'] = compact_game_row(tuple(game[field] for field in COMPACT_GAME_FIELDS), version)
+            data['game'].update(id=game['id'], player_x=player(game['player_x_id']), player_o=player(game['player_o_id']))
+        return json.dumps(data, ensure_ascii=False).encode()
+
+    def invalidate(self, room_id):
+        #состояние комнаты изменилось в этом процессе: следующий запрос сверит версию (тело переиспользуется,
+        #если версия та же)
+        with self._lock:
+            snapshot = self._snapshots.get(room_id)
+            if snapshot is not None:
+                snapshot.checked_at = None
+
+    def forget(self, room_id):
+        with self._lock:
+            self._snapshots.pop(room_id, None)
+
+    def stats(self):
+        #hits - ответы готовым снимком, revalidations - сверки версии без пересборки, builds - пересборки
+        with self._lock:
+            counters = dict(self._counters)
+            counters['snapshots'] = len(self._snapshots)
+        return counters
+
+_snapshots = None
+_snapshots_lock = threading.Lock()
+
+def get_snapshots():
+    global _snapshots
+    if _snapshots is None:
+        with _snapshots_lock:
+            if _snapshots is None:
+                _snapshots = SnapshotStore(settings.GAME_SPECTATOR_SNAPSHOTS, settings.GAME_SPECTATOR_REVALIDATE)
+    return _snapshots
+
+def _state_changed(sender, room_id, **kwargs):
+    get_snapshots().invalidate(room_id)
+
+state_changed.connect(_state_changed, dispatch_uid='game.spectators.state_changed')
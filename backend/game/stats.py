@@ -0,0 +1,120 @@
+#обновление статистики игроков: F()-выражения вместо чтения профиля, инкремента в python и save().
+#Вместе с профилями в той же транзакции пополняются сводки по дням и часам (game/rollups.py)
+import atexit
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from . import rollups
+from .leaderboard import get_leaderboard
+from .models import UserProfile
+
+def outcome_deltas(game):
+    #{user_id: Counter полей профиля} для завершенной игры
+    return {user_id: Counter(games_played=1, **{result: 1}) for user_id, result in game.player_results().items()}
+
+def apply_deltas(deltas):
+    #игроки с одинаковыми приращениями обновляются одним UPDATE (ничья - один запрос на двоих)
+    groups = defaultdict(list)
+    for user_id, delta in deltas.items():
+        groups[tuple(sorted(delta.items()))].append(user_id)
+
+    for delta, user_ids in groups.items():
+        values = {field: F(field) + amount for field, amount in delta}
+        updated = UserProfile.objects.filter(user_id__in=user_ids).update(**values)
+        if updated < len(user_ids):
+            #у кого-то еще нет профиля: создаем пустые и применяем приращения к ним
+            existing = set(UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+            missing = [user_id for user_id in user_ids if user_id not in existing]
+            UserProfile.objects.bulk_create([UserProfile(user_id=user_id) for user_id in missing], ignore_conflicts=True)
+            UserProfile.objects.filter(user_id__in=missing).update(**values)
+    
+    #таблица лидеров в памяти узнает о партиях только после коммита
+    transaction.on_commit(lambda: get_leaderboard().apply(deltas))
+
+def record_game(game):
+    #вызывается в транзакции завершения игры
+    record_games([game])
+
+def record_games(games):
+    #приращения нескольких партий суммируются и пишутся вместе (уборка брошенных игр - game/reaper.py)
+    deltas = defaultdict(Counter)
+    for game in games:
+        for user_id, delta in outcome_deltas(game).items():
+            deltas[user_id].update(delta)
+    if not deltas:
+        return
+    deltas = dict(deltas)
+    daily, hourly = rollups.game_deltas(games)
+    if settings.GAME_STATS_BUFFERED:
+        #в буфер попадает только закоммиченный результат
+        transaction.on_commit(lambda: get_buffer().add(deltas, daily, hourly))
+    else:
+        apply_deltas(deltas)
+        rollups.apply_deltas(daily, hourly)
+
+class StatsBuffer:
+    #копит приращения в памяти процесса и сбрасывает их пачкой по таймеру или при переполнении.
+    #Для турниров с большим потоком игр: меньше записей, но статистика отстает до flush_interval секунд
+    def __init__(self, flush_interval, flush_size):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._lock = threading.Lock()
+        self._pending = defaultdict(Counter)
+        self._daily = defaultdict(Counter)
+        self._hourly = defaultdict(Counter)
+        self._timer = None
+
+    def add(self, deltas, daily, hourly):
+        with self._lock:
+            for user_id, delta in deltas.items():
+                self._pending[user_id].update(delta)
+            for key, delta in daily.items():
+                self._daily[key].update(delta)
+            for hour, delta in hourly.items():
+                self._hourly[hour].update(delta)
+            overflow = len(self._pending) >= self.flush_size
+            if not overflow and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if overflow:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(Counter)
+            daily, self._daily = self._daily, defaultdict(Counter)
+            hourly, self._hourly = self._hourly, defaultdict(Counter)
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if pending:
+            with transaction.atomic():
+                apply_deltas(pending)
+                rollups.apply_deltas(daily, hourly)
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            #у потока таймера свое соединение с БД, не оставляем его открытым
+            connection.close()
+
+    def __len__(self):
+        return len(self._pending)
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+def get_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = StatsBuffer(settings.GAME_STATS_FLUSH_INTERVAL, settings.GAME_STATS_FLUSH_SIZE)
+                atexit.register(_buffer.flush)
+    return _buffer
@@ -0,0 +1,138 @@
+#ограничение частоты запросов: token bucket на пользователя (аноним - по IP) и группу эндпоинтов.
+#Ведро вмещает burst запросов и пополняется со скоростью rate в секунду; на пустое ведро - 429 и Retry-After:
+#через сколько секунд в ведре появится запрос, так что клиент ждет ровно столько, насколько превысил бюджет.
+#Ведра живут в памяти процесса; с GAME_THROTTLE_CACHE - в общем кэше воркеров (Redis). Там чтение и запись
+#ведра не атомарны, и одновременные запросы одного пользователя в разные воркеры могут пропустить лишний запрос
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+
+    def take(self, state, now):
+        #(новое состояние, None) - запрос проходит, (состояние, секунд до следующего запроса) - нет.
+        #Состояние - (запросов в ведре, время обновления); None - ведро еще не заводили, оно полное
+        tokens, updated = state if state is not None else (self.burst, now)
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            return (tokens - 1, now), None
+        return (tokens, now), (1 - tokens) / self.rate
+
+    def refill_time(self):
+        #через сколько секунд простоя ведро снова полное - дольше его хранить незачем
+        return self.burst / self.rate
+
+class MemoryStore:
+    #ведра процесса; при переполнении вытесняются давно не использованные (они и так уже полные)
+    def __init__(self, max_buckets):
+        self.max_buckets = max_buckets
+        self._lock = threading.Lock()
+        self._states = OrderedDict()
+
+    def take(self, key, bucket):
+        now = time.time()
+        with self._lock:
+            state, wait = bucket.take(self._states.get(key), now)
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_buckets:
+                self._states.popitem(last=False)
+        return wait
+
+    def size(self):
+        return len(self._states)
+
+class CacheStore:
+    #ведра в кэше, общем для воркеров; запись живет, пока ведро не наполнится снова
+    def __init__(self, alias):
+        self.alias = alias
+
+    def take(self, key, bucket):
+        backend = caches[self.alias]
+        key = f'throttle:{key}'
+        state, wait = bucket.take(backend.get(key), time.time())
+        backend.set(key, state, timeout=int(bucket.refill_time()) + 1)
+        return wait
+
+    def size(self):
+        return None
+
+class Throttle:
+    def __init__(self, rates, store):
+        self.buckets = {scope: TokenBucket(rate['rate'], rate['burst']) for scope, rate in rates.items()}
+        self.store = store
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    def check(self, scope, ident):
+        #None - запрос проходит, иначе через сколько секунд повторить
+        bucket = self.buckets.get(scope)
+        if bucket is None:
+            return None
+        wait = self.store.take(f'{scope}:{ident}', bucket)
+        with self._lock:
+            self._counters[scope, 'throttled' if wait is not None else 'allowed'] += 1
+        return wait
+
+    def stats(self):
+        #счетчики процесса по группам: сколько запросов прошло и сколько получили 429
+        with self._lock:
+            counters = dict(self._counters)
+        scopes = {
+            scope: {
+                'rate': bucket.rate,
+                'burst': bucket.burst,
+                'allowed': counters.get((scope, 'allowed'), 0),
+                'throttled': counters.get((scope, 'throttled'), 0),
+            }
+            for scope, bucket in self.buckets.items()
+        }
+        return {'enabled': settings.GAME_THROTTLE_ENABLED, 'buckets': self.store.size(), 'scopes': scopes}
+
+_throttle = None
+_throttle_lock = threading.Lock()
+
+def get_throttle():
+    global _throttle
+    if _throttle is None:
+        with _throttle_lock:
+            if _throttle is None:
+                if settings.GAME_THROTTLE_CACHE:
+                    store = CacheStore(settings.GAME_THROTTLE_CACHE)
+                else:
+                    store = MemoryStore(settings.GAME_THROTTLE_MAX_BUCKETS)
+                _throttle = Throttle(settings.GAME_THROTTLE_RATES, store)
+    return _throttle
+
+def get_ident(request):
+    #пользователь, а для анонима - IP (с учетом NUM_PROXIES из настроек DRF)
+    if request.user.is_authenticated:
+        return f'user:{request.user.id}'
+    return f'ip:{BaseThrottle().get_ident(request)}'
+
+def check(scope, request):
+    #проверка для async view (DRF-view используют GameRateThrottle); None - запрос проходит
+    if not settings.GAME_THROTTLE_ENABLED:
+        return None
+    return get_throttle().check(scope, get_ident(request))
+
+class GameRateThrottle(BaseThrottle):
+    #DRF сам отвечает 429 и ставит Retry-After из wait()
+    scope = None
+
+    def allow_request(self, request, view):
+        self.wait_seconds = check(self.scope, request)
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
+
+class QuickGameThrottle(GameRateThrottle):
+    scope = 'quick_game'
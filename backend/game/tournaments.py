@@ -0,0 +1,205 @@
+#турниры: круговая система и олимпийская (на выбывание). Комнаты, составы и партии тура создаются
+#тремя bulk_create в одной транзакции - сотня матчей тура стоит несколько запросов, а не сотни.
+#Следующий тур создает advance, когда в текущем не осталось идущих партий: после коммита последней
+#партии тура (games_finished) и на каждом проходе уборки (game/reaper.py), если процесс упал до этого.
+#Таблица считается одним запросом: очки, победы и ничьи - подзапросы-агрегаты по партиям турнира
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Game, Room, Tournament, TournamentPlayer
+
+logger = logging.getLogger('game.tournaments')
+
+MIN_PLAYERS = 2
+
+#очки в таблице: победа 2, ничья 1
+WIN_POINTS = 2
+DRAW_POINTS = 1
+
+def round_robin_pairs(user_ids, round_number):
+    #пары тура round_number (с 1) по методу вращения: первый на месте, остальные сдвигаются по кругу.
+    #При нечетном числе игроков добавляется пустое место - его соперник в этом туре отдыхает
+    players = list(user_ids)
+    if len(players) % 2:
+        players.append(None)
+    rest = players[1:]
+    shift = (round_number - 1) % len(rest)
+    players = players[:1] + rest[len(rest) - shift:] + rest[:len(rest) - shift]
+    pairs = []
+    for i in range(len(players) // 2):
+        first, second = players[i], players[-1 - i]
+        if first is None or second is None:
+            continue
+        #кто ходит первым, чередуется из тура в тур
+        pairs.append((first, second) if (i + round_number) % 2 else (second, first))
+    return pairs
+
+def round_robin_rounds(player_count):
+    return player_count - 1 if player_count % 2 == 0 else player_count
+
+def elimination_pairs(user_ids):
+    #оставшиеся игроки по посеву: сильнейший с самым слабым и т.д.; при нечетном числе первый посев отдыхает
+    players = list(user_ids)
+    if len(players) % 2:
+        players = players[1:]
+    return [(players[i], players[-1 - i]) for i in range(len(players) // 2)]
+
+def register(tournament, user):
+    #False - пользователь уже участвует
+    try:
+        with transaction.atomic():
+            TournamentPlayer.objects.create(tournament=tournament, user=user)
+    except IntegrityError:
+        return False
+    return True
+
+def _create_round(tournament, round_number, pairs):
+    #комнаты, составы комнат и партии тура: по одному bulk_create на каждую таблицу
+    Membership = Room.players.through
+    name = f'{tournament.name}: тур {round_number}'
+    for attempt in range(Room.CODE_ATTEMPTS):
+        #коды проверены одной выборкой, но их могли занять параллельно - тогда берем новые
+        codes = Room.free_codes(len(pairs))
+        try:
+            with transaction.atomic():
+                now = timezone.now()
+                rooms = Room.objects.bulk_create([
+                    Room(
+                        name=name, code=code, creator_id=tournament.creator_id, status=Room.PLAYING,
+                        player_count=Room.MAX_PLAYERS, board_size=tournament.board_size,
+                        win_length=tournament.win_length, last_activity=now,
+                    )
+                    for code in codes
+                ])
+                break
+        except IntegrityError:
+            if attempt == Room.CODE_ATTEMPTS - 1:
+                raise
+    Membership.objects.bulk_create([
+        Membership(room_id=room.id, user_id=user_id) for room, pair in zip(rooms, pairs) for user_id in pair
+    ])
+    Game.objects.bulk_create([
+        Game(
+            room_id=room.id, player_x_id=player_x_id, player_o_id=player_o_id,
+            board_size=tournament.board_size, win_length=tournament.win_length, last_activity=now,
+            tournament_id=tournament.id, tournament_round=round_number, **Game.room_fields(room),
+        )
+        for room, (player_x_id, player_o_id) in zip(rooms, pairs)
+    ])
+    return rooms
+
+def start(tournament):
+    #посев по рейтингу (победы - поражения) и первый тур; False - турнир уже идет или мало игроков.
+    #Вызывается в транзакции
+    tournament = Tournament.objects.select_for_update().get(pk=tournament.pk)
+    if tournament.status != Tournament.REGISTRATION:
+        return False
+    entries = list(tournament.entries.annotate(
+        rating=Coalesce(F('user__userprofile__wins') - F('user__userprofile__losses'), 0)
+    ).order_by('-rating', 'joined_at', 'id'))
+    if len(entries) < MIN_PLAYERS:
+        return False
+    for seed, entry in enumerate(entries, 1):
+        entry.seed = seed
+    TournamentPlayer.objects.bulk_update(entries, ['seed'])
+
+    tournament.status = Tournament.RUNNING
+    tournament.started_at = timezone.now()
+    tournament.save(update_fields=['status', 'started_at'])
+    _next_round(tournament)
+    return True
+
+def _eliminate(tournament):
+    #проигравшие тура выбывают; при ничьей проходит игрок с лучшим посевом
+    seeds = dict(tournament.entries.values_list('user_id', 'seed'))
+    losers = []
+    games = Game.objects.filter(tournament=tournament, tournament_round=tournament.current_round)
+    for player_x_id, player_o_id, winner_id in games.values_list('player_x_id', 'player_o_id', 'winner_id'):
+        if winner_id is None:
+            losers.append(max(player_x_id, player_o_id, key=seeds.get))
+        else:
+            losers.append(player_o_id if winner_id == player_x_id else player_x_id)
+    tournament.entries.filter(user_id__in=losers).update(eliminated_round=tournament.current_round)
+
+def _next_round(tournament):
+    #создает следующий тур или завершает турнир
+    round_number = tournament.current_round + 1
+    if tournament.format == Tournament.SINGLE_ELIMINATION:
+        alive = list(tournament.entries.filter(eliminated_round__isnull=True).order_by('seed').values_list('user_id', flat=True))
+        pairs = elimination_pairs(alive) if len(alive) > 1 else []
+    else:
+        players = list(tournament.entries.order_by('seed').values_list('user_id', flat=True))
+        pairs = round_robin_pairs(players, round_number) if round_number <= round_robin_rounds(len(players)) else []
+
+    if not pairs:
+        tournament.status = Tournament.FINISHED
+        tournament.finished_at = timezone.now()
+        leader = standings(tournament)[:1]
+        tournament.winner_id = leader[0]['user_id'] if leader else None
+        tournament.save(update_fields=['status', 'finished_at', 'winner'])
+        return
+
+    _create_round(tournament, round_number, pairs)
+    tournament.current_round = round_number
+    tournament.save(update_fields=['current_round'])
+    logger.info('Tournament %s: round %d started, %d games', tournament.id, round_number, len(pairs))
+
+def advance(tournament_id):
+    #следующий тур, если текущий доигран; True - турнир продвинулся.
+    #Строка турнира блокируется: две последние партии тура, завершившиеся одновременно, не создадут тур дважды
+    with transaction.atomic():
+        tournament = Tournament.objects.select_for_update().filter(id=tournament_id, status=Tournament.RUNNING).first()
+        if tournament is None:
+            return False
+        if tournament.games.filter(tournament_round=tournament.current_round, status=Game.ONGOING).exists():
+            return False
+        if tournament.format == Tournament.SINGLE_ELIMINATION:
+            _eliminate(tournament)
+        _next_round(tournament)
+    return True
+
+def advance_all():
+    #проход планировщика: все идущие турниры с доигранным туром; возвращает число продвинутых
+    tournament_ids = Tournament.objects.filter(status=Tournament.RUNNING).values_list('id', flat=True)
+    return sum(advance(tournament_id) for tournament_id in list(tournament_ids))
+
+def games_finished(games):
+    #вызывается в транзакции завершения партий: после коммита их турниры проверяют, доигран ли тур
+    for tournament_id in {game.tournament_id for game in games if game.tournament_id}:
+        transaction.on_commit(lambda tournament_id=tournament_id: advance(tournament_id))
+
+def standings(tournament):
+    #таблица одним запросом: сыграно, победы и ничьи - подзапросы COUNT по партиям турнира, сортировка в БД.
+    #На выбывание выше тот, кто дольше продержался в сетке
+    finished = Game.objects.filter(tournament=tournament).exclude(status=Game.ONGOING)
+    played_by = Q(player_x=OuterRef('user')) | Q(player_o=OuterRef('user'))
+
+    def count(games):
+        return Coalesce(Subquery(games.values('tournament').annotate(count=Count('id')).values('count')), 0)
+
+    entries = tournament.entries.annotate(
+        played=count(finished.filter(played_by)),
+        wins=count(finished.filter(winner=OuterRef('user'))),
+        draws=count(finished.filter(played_by, status=Game.DRAW)),
+    ).annotate(
+        losses=F('played') - F('wins') - F('draws'),
+        points=F('wins') * WIN_POINTS + F('draws') * DRAW_POINTS,
+    ).order_by(
+        F('eliminated_round').desc(nulls_first=True), '-points', '-wins', 'seed', 'id'
+    ).values('user_id', 'user__username', 'seed', 'eliminated_round', 'played', 'wins', 'draws', 'losses', 'points')
+    rows = []
+    for rank, entry in enumerate(entries, 1):
+        entry['username'] = entry.pop('user__username')
+        entry['rank'] = rank
+        rows.append(entry)
+    return rows
+
+def current_matches(tournament):
+    #партии текущего тура с комнатами - игрок находит здесь свою комнату
+    return list(tournament.games.filter(tournament_round=tournament.current_round).order_by('id').values(
+        'id', 'room_id', 'room__code', 'player_x_id', 'player_o_id', 'status', 'winner_id'
+    ))
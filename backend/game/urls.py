@@ -18,15 +18,41 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('user/', views.current_user, name='current_user'),
     path('stats/', views.user_stats, name='user_stats'),
+    path('stats/history/', views.stats_history, name='stats_history'),
+    path('stats/global/', views.stats_global, name='stats_global'),
+    path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('leaderboard/rank/', views.leaderboard_rank, name='leaderboard_rank'),
     
     #комнаты: список, создание, вход/выход, быстрый матч
     path('rooms/', views.room_list, name='room_list'),
     path('rooms/create/', views.create_room, name='create_room'),
+    path('rooms/events/', views.lobby_events, name='lobby_events'),
     path('rooms/<int:room_id>/', views.room_detail, name='room_detail'),
+    path('rooms/<int:room_id>/events/', views.room_events, name='room_events'),
+    path('rooms/<int:room_id>/spectate/', views.spectate_room, name='spectate_room'),
     path('rooms/<int:room_id>/join/', views.join_room, name='join_room'),
+    path('rooms/code/<str:code>/join/', views.join_room_by_code, name='join_room_by_code'),
     path('rooms/<int:room_id>/leave/', views.leave_room, name='leave_room'),
     path('quick-game/', views.quick_game, name='quick_game'),
+    path('bot-game/', views.bot_game, name='bot_game'),
+    path('matchmaking/', views.matchmaking_stats, name='matchmaking_stats'),
+    path('cache/', views.cache_stats, name='cache_stats'),
+    path('throttle/', views.throttle_stats, name='throttle_stats'),
+    path('metrics/', views.request_metrics, name='request_metrics'),
+    
+    #турниры: список, создание, регистрация, старт, таблица и текущий тур
+    path('tournaments/', views.tournament_list, name='tournament_list'),
+    path('tournaments/create/', views.create_tournament, name='create_tournament'),
+    path('tournaments/<int:tournament_id>/', views.tournament_detail, name='tournament_detail'),
+    path('tournaments/<int:tournament_id>/join/', views.join_tournament, name='join_tournament'),
+    path('tournaments/<int:tournament_id>/start/', views.start_tournament, name='start_tournament'),
     
     #игровой ход
     path('rooms/<int:room_id>/move/', views.make_move, name='make_move'),
+    
+    #повтор партии по журналу ходов
+    path('games/<int:game_id>/replay/', views.game_replay, name='game_replay'),
+    
+    #выгрузка для аналитики (только администраторы)
+    path('export/<str:kind>/', views.export_data, name='export_data'),
 ]
\ No newline at end of file
@@ -1,17 +1,38 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from rest_framework.authentication import CSRFCheck
+from rest_framework.request import Request
 from rest_framework.response import Response
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+from functools import wraps
+import asyncio
+import json
+import math
 import random
+import time
 
-from .models import UserProfile, Room, Game
+from . import authentication, bot, export, matchmaking, metrics, push, rollups, spectators, stats, throttling, tournaments
+from .leaderboard import get_leaderboard
+from .asgi import unpinned
+from .cache import game_cache, state_version
+from .models import UserProfile, Room, Game, StaleGameError, Tournament
+from .pagination import RoomCursorPagination
 from .serializers import (
     UserSerializer, UserProfileSerializer, RoomSerializer, 
-    GameSerializer, MakeMoveSerializer, RegisterSerializer
+    GameSerializer, MakeMoveSerializer, RegisterSerializer, BoardOptionsSerializer, BotGameSerializer,
+    TournamentSerializer, TournamentOptionsSerializer,
+    COMPACT_GAME_FIELDS, compact_game_row, compact_game_data
 )
 
 @api_view(['POST'])
@@ -36,7 +57,8 @@ def login_view(request):
         login(request, user)
         return Response({
             'message': 'Успешный вход',
-            'user': UserSerializer(user).data
+            'user': UserSerializer(user).data,
+            'token': authentication.make_token(user)
         })
     return Response({'error': 'Неверные данные'}, status=status.HTTP_401_UNAUTHORIZED)
 
@@ -50,7 +72,8 @@ def logout_view(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def current_user(request):
-    return Response(UserSerializer(request.user).data)
+    #токен для частых запросов выдаем и здесь: после перезагрузки страницы клиент входит по сессии
+    return Response(dict(UserSerializer(request.user).data, token=authentication.make_token(request.user)))
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -59,45 +82,136 @@ def user_stats(request):
     profile, created = UserProfile.objects.get_or_create(user=request.user)
     return Response(UserProfileSerializer(profile).data)
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def room_list(request):
-    #получаем список комнат
-    rooms = Room.objects.filter(status__in=[Room.WAITING, Room.PLAYING]).order_by('-created_at')
-    return Response(RoomSerializer(rooms, many=True).data)
+def _async_view(*methods, throttle=None):
+    #для async view то же, что @api_view, IsAuthenticated и throttle_classes у DRF: допустимые методы,
+    #вход по токену или сессии и бюджет запросов группы throttle (game/throttling.py).
+    #После проверки request.user уже загружен, и его можно читать без sync_to_async
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse({'error': 'Метод не поддерживается'}, status=405)
+            token = authentication.get_request_token(request)
+            if token is not None:
+                #как SignedTokenAuthentication: с токеном сессия не читается
+                user = await sync_to_async(authentication.user_from_token)(token)
+                if user is None:
+                    return JsonResponse({'error': 'Недействительный токен'}, status=401,
+                                        headers={'WWW-Authenticate': authentication.TOKEN_KEYWORD})
+                request.user = user
+            if not await sync_to_async(lambda: request.user.is_authenticated)():
+                return JsonResponse({'error': 'Требуется авторизация'}, status=403)
+            if token is None and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+                #вход по сессии, как у SessionAuthentication, требует CSRF-токен; запросы с токеном - нет
+                check = CSRFCheck(lambda request: None)
+                check.process_request(request)
+                reason = check.process_view(request, None, (), {})
+                if reason:
+                    return JsonResponse({'error': f'Ошибка CSRF: {reason}'}, status=403)
+            if throttle:
+                wait = await sync_to_async(throttling.check)(throttle, request)
+                if wait is not None:
+                    return JsonResponse({'error': 'Слишком много запросов', 'retry_after': round(wait, 2)}, status=429,
+                                        headers={'Retry-After': str(math.ceil(wait))})
+            return await view(request, *args, **kwargs)
+        #CSRF проверяем сами (csrf_exempt в Django 4.2 превращает async view в синхронную)
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+def _request_data(request):
+    #тело запроса для async view: JSON (как шлет фронтенд) или форма; None - JSON не разобран
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+    return request.POST
+
+@_async_view('GET', throttle='poll')
+async def room_list(request):
+    #получаем список комнат постранично; курсорная пагинация DRF синхронная, страница читается в потоке ORM
+    return JsonResponse(await sync_to_async(_room_page)(request))
+
+def _room_page(request):
+    #создатель и игроки подгружаются двумя запросами на страницу
+    rooms = Room.objects.filter(
+        status__in=[Room.WAITING, Room.PLAYING]
+    ).select_related('creator').prefetch_related('players')
+    
+    #фильтры: ?status=waiting|playing и ?free=1 (есть свободное место)
+    status_filter = request.GET.get('status')
+    if status_filter in (Room.WAITING, Room.PLAYING):
+        rooms = rooms.filter(status=status_filter)
+    if request.GET.get('free') in ('1', 'true'):
+        rooms = rooms.filter(player_count__lt=Room.MAX_PLAYERS)
+    
+    paginator = RoomCursorPagination()
+    page = paginator.paginate_queryset(rooms, Request(request))
+    return paginator.get_paginated_response(RoomSerializer(page, many=True).data).data
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_room(request):
     #создаем новую комнату, имя по дефолту с ником пользователя
     name = request.data.get('name', f"Комната {request.user.username}")
-    room = Room.objects.create(name=name, creator=request.user)
-    room.players.add(request.user)
+    
+    #размер поля и длина линии (например, 15x15 и 5 в ряд для гомоку)
+    options = BoardOptionsSerializer(data=request.data)
+    if not options.is_valid():
+        return Response(options.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    room = Room.objects.create(name=name, creator=request.user, **options.validated_data)
+    room.add_player(request.user)
+    _room_changed(room)
     return Response(RoomSerializer(room).data, status=status.HTTP_201_CREATED)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def join_room(request, room_id):
-    #подключаемся к комнате, если есть место и статус позволяет
     room = get_object_or_404(Room, id=room_id)
-    
+    return _join(request, room)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def join_room_by_code(request, code):
+    #вход по коду приглашения: код -> id из кэша (при промахе - по уникальному индексу), затем сама комната по id
+    code = Room.normalize_code(code)
+    room_id = game_cache.room_id_by_code(code)
+    if room_id is None:
+        return Response({'error': 'Комната с таким кодом не найдена'}, status=status.HTTP_404_NOT_FOUND)
+    room = Room.objects.filter(id=room_id, code=code).first()
+    if room is None:
+        #устаревшая запись кэша (комнату удалил другой процесс, id мог достаться новой) - ищем по индексу
+        game_cache.forget_code(code)
+        room = Room.objects.filter(code=code).first()
+    if room is None:
+        return Response({'error': 'Комната с таким кодом не найдена'}, status=status.HTTP_404_NOT_FOUND)
+    return _join(request, room)
+
+def _join(request, room):
+    #подключаемся к комнате, если есть место и статус позволяет
     if room.status != Room.WAITING:
         return Response({'error': 'Комната недоступна'}, status=status.HTTP_400_BAD_REQUEST)
     
-    if room.player_count >= 2:
+    if room.player_count >= Room.MAX_PLAYERS:
         return Response({'error': 'Комната заполнена'}, status=status.HTTP_400_BAD_REQUEST)
     
-    if request.user in room.players.all():
+    if room.players.filter(id=request.user.id).exists():
         return Response({'error': 'Уже в комнате'}, status=status.HTTP_400_BAD_REQUEST)
     
-    room.players.add(request.user)
+    #место могли занять параллельно - add_player это проверяет
+    if not room.add_player(request.user):
+        return Response({'error': 'Комната заполнена'}, status=status.HTTP_400_BAD_REQUEST)
     
     #если комната заполнилась начинаем игру
-    if room.player_count == 2:
+    if room.player_count == Room.MAX_PLAYERS:
         room.status = Room.PLAYING
-        room.save()
+        matchmaking.cancel(room.id)
 
-        Game.objects.filter(room=room).delete()
+        #прошлая партия комнаты обычно уже отвязана при выходе игрока (leave_room); если нет - отвязываем,
+        #а не удаляем: она остается в архиве для повторов, выгрузки и сводок
+        Game.objects.filter(room=room).update(room=None)
 
         #создание новой игры
         players = list(room.players.all())
@@ -106,40 +220,52 @@ def join_room(request, room_id):
         Game.objects.create(
             room=room,
             player_x=players[0],
-            player_o=players[1]
+            player_o=players[1],
+            board_size=room.board_size,
+            win_length=room.win_length
         )
 
+    #версию поднимаем после создания игры, чтобы ожидающий клиент сразу получил её
+    room.touch('status')
+    _room_changed(room)
+
     return Response(RoomSerializer(room).data)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([throttling.QuickGameThrottle])
 def quick_game(request):
-    from django.db.models import Count
+    #вариант игры: по умолчанию классика 3x3
+    options = BoardOptionsSerializer(data=request.data)
+    if not options.is_valid():
+        return Response(options.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    #ищем свободную комнату с одним игроком
-    available_room = Room.objects.annotate(
-        player_count_annotated=Count('players')
-    ).filter(
-        status=Room.WAITING,
-        player_count_annotated=1
-    ).exclude(players=request.user).first()
+    #берем ожидающую комнату из очереди подбора (с тем же вариантом поля и близким рейтингом);
+    #комната уже захвачена для нас и переведена в PLAYING
+    available_room = matchmaking.find_match(request.user, **options.validated_data)
     
+    joined = False
     if available_room:
-        #заходим в существующую комнату
-        available_room.players.add(request.user)
-        available_room.status = Room.PLAYING
-        available_room.save()
-        
-        #создание игры
-        players = list(available_room.players.all())
-        random.shuffle(players)
-        
-        Game.objects.create(
-            room=available_room,
-            player_x=players[0],
-            player_o=players[1]
-        )
-        
+        #заходим в существующую комнату; вход и выход создателя (leave_room) идут в транзакциях
+        #и не перемешиваются. Если создатель успел выйти и комната удалена, add_player вернет False
+        with transaction.atomic():
+            joined = available_room.add_player(request.user)
+            if joined:
+                #создание игры
+                players = list(available_room.players.all())
+                random.shuffle(players)
+                
+                Game.objects.create(
+                    room=available_room,
+                    player_x=players[0],
+                    player_o=players[1],
+                    board_size=available_room.board_size,
+                    win_length=available_room.win_length
+                )
+                available_room.touch('status')
+                _room_changed(available_room)
+    
+    if joined:
         return Response({
             'room': RoomSerializer(available_room).data,
             'action': 'joined'
@@ -148,92 +274,389 @@ def quick_game(request):
         #если нет подходящих комнат создаем новую
         room = Room.objects.create(
             name=f"Быстрая игра {request.user.username}",
-            creator=request.user
+            creator=request.user,
+            **options.validated_data
         )
-        room.players.add(request.user)
+        room.add_player(request.user)
+        matchmaking.enqueue(room, request.user)
+        _room_changed(room)
         
         return Response({
             'room': RoomSerializer(room).data,
             'action': 'created'
         })
 
-@api_view(['GET'])
+@api_view(['POST'])
 @permission_classes([IsAuthenticated])
-def room_detail(request, room_id):
-    #возвращаем инфу о комнате (и игре если уже началась)
-    room = get_object_or_404(Room, id=room_id)
+def bot_game(request):
+    #игра против бота: комната сразу в игре, второй игрок - служебный пользователь бота
+    options = BotGameSerializer(data=request.data)
+    if not options.is_valid():
+        return Response(options.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    if request.user not in room.players.all():
-        return Response({'error': 'Не является игроком в комнате'}, status=status.HTTP_403_FORBIDDEN)
+    level = options.validated_data.pop('level')
+    symbol = options.validated_data.pop('symbol', None) or random.choice([Game.X, Game.O])
+    bot_user = bot.get_bot_user()
     
-    data = RoomSerializer(room).data
+    with transaction.atomic():
+        room = Room.objects.create(
+            name=f"Игра с ботом {request.user.username}",
+            creator=request.user,
+            status=Room.PLAYING,
+            bot_level=level,
+            **options.validated_data
+        )
+        room.add_player(request.user)
+        room.add_player(bot_user)
+        
+        player_x, player_o = (request.user, bot_user) if symbol == Game.X else (bot_user, request.user)
+        game = Game.objects.create(
+            room=room,
+            player_x=player_x,
+            player_o=player_o,
+            board_size=room.board_size,
+            win_length=room.win_length
+        )
+        #бот играет крестиками - сразу делает первый ход
+        if player_x == bot_user:
+            bot.reply(game, level)
+    _room_changed(room)
     
-    #добавляем данные игры если она уже есть
+    return Response({
+        'room': RoomSerializer(room).data,
+        'game': GameSerializer(game).data
+    }, status=status.HTTP_201_CREATED)
+
+def _int_param(request, name, default, maximum):
     try:
-        game = room.game
-        data['game'] = GameSerializer(game).data
-    except Game.DoesNotExist:
-        data['game'] = None
-    
-    return Response(data)
+        value = int(request.query_params.get(name, default))
+    except ValueError:
+        value = default
+    return min(max(value, 0), maximum)
 
-@api_view(['POST'])
+@api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def make_move(request, room_id):
-    #ход игрока в активной игре
-    room = get_object_or_404(Room, id=room_id)
+def leaderboard(request):
+    #топ игроков по победам (?limit=, до 100) - из таблицы в памяти, без сортировки профилей в БД
+    total, results = get_leaderboard().top(_int_param(request, 'limit', 10, 100))
+    return Response({'total': total, 'results': results})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def leaderboard_rank(request):
+    #место игрока (?user=<id>, по умолчанию текущий) и соседи по таблице (?around=, до 25)
+    user_id = _int_param(request, 'user', request.user.id, 2 ** 63 - 1)
+    total, rank, neighbors = get_leaderboard().around(user_id, _int_param(request, 'around', 2, 25))
+    return Response({'total': total, 'rank': rank, 'neighbors': neighbors})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def stats_history(request):
+    #история игрока (?user=<id>, по умолчанию текущий) за ?days= дней (до 365) по дням или неделям (?period=):
+    #только сводки UserDailyStats, без сканирования партий
+    period = request.query_params.get('period', 'day')
+    if period not in ('day', 'week'):
+        return Response({'error': 'Период должен быть day или week'}, status=status.HTTP_400_BAD_REQUEST)
+    user_id = _int_param(request, 'user', request.user.id, 2 ** 63 - 1)
+    since = rollups.today() - timedelta(days=max(_int_param(request, 'days', 30, 365), 1) - 1)
+    if period == 'week':
+        #неделя целиком, с понедельника
+        since -= timedelta(days=since.weekday())
+    return Response({'period': period, 'results': rollups.user_history(user_id, since, period)})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def stats_global(request):
+    #все партии за ?days= дней (до 31) по часам или дням (?period=) - из сводок HourlyStats
+    period = request.query_params.get('period', 'hour')
+    if period not in ('hour', 'day'):
+        return Response({'error': 'Период должен быть hour или day'}, status=status.HTTP_400_BAD_REQUEST)
+    days = max(_int_param(request, 'days', 1, 31), 1)
+    if period == 'day':
+        since, _ = rollups.day_bounds(rollups.today() - timedelta(days=days - 1))
+    else:
+        since = rollups.hour_of(timezone.now() - timedelta(days=days))
+    return Response({'period': period, 'results': rollups.global_history(since, period)})
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def matchmaking_stats(request):
+    #глубина очереди быстрой игры и время ожидания пары
+    return Response(matchmaking.get_queue().metrics())
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    #попадания/промахи кэша состояния комнат и снимков для зрителей
+    return Response(dict(game_cache.stats(), spectators=spectators.get_snapshots().stats()))
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def throttle_stats(request):
+    #бюджеты групп и сколько запросов прошло/получило 429 в этом процессе
+    return Response(throttling.get_throttle().stats())
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def request_metrics(request):
+    #время, SQL и размер ответов по view; ?output=prometheus - текстовый формат для Prometheus
+    registry = metrics.get_registry()
+    if request.query_params.get('output') == 'prometheus':
+        return HttpResponse(registry.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    return Response({'enabled': settings.GAME_METRICS_ENABLED, 'views': registry.snapshot()})
+
+def _room_state_version(room_id):
+    #версия комнаты вместе с версией игры (из кэша состояния, при промахе - из БД)
+    return game_cache.version(room_id)
+
+def _room_changed(room):
+    #после изменения состава/статуса комнаты: сбрасываем кэш и рассылаем новое состояние
+    game_cache.invalidate(room.id)
+    push.notify_room_changed(room, _room_state_version(room.id))
+
+def _heartbeat(room_id):
+    #запросы игроков продлевают жизнь комнаты (game/reaper.py); в БД пишем не чаще GAME_HEARTBEAT_INTERVAL
+    if game_cache.heartbeat_due(room_id, settings.GAME_HEARTBEAT_INTERVAL):
+        Room.objects.filter(id=room_id).update(last_activity=timezone.now())
+
+def _is_compact(request):
+    return request.GET.get('view') == 'compact'
+
+def _client_state_version(request):
+    #версия, которая уже есть у клиента: из ?version= или заголовка If-None-Match
+    version = request.GET.get('version')
+    if version is None:
+        version = request.headers.get('If-None-Match')
+    if not version:
+        return None
+    if version.startswith('W/'):
+        version = version[2:]
+    return version.strip('"')
+
+@_async_view('GET', throttle='poll')
+async def room_detail(request, room_id):
+    #возвращаем инфу о комнате (и игре если уже началась); состояние и состав берем из кэша
+    state = await sync_to_async(game_cache.get)(room_id)
+    if state is None:
+        return JsonResponse({'error': 'Комната не найдена'}, status=404)
     
-    if request.user not in room.players.all():
-        return Response({'error': 'Не является игроком в комнате'}, status=status.HTTP_403_FORBIDDEN)
+    if request.user.id not in state['members']:
+        return JsonResponse({'error': 'Не является игроком в комнате'}, status=403)
+    await unpinned(_heartbeat)(room_id)
+    
+    #long-poll: если версия у клиента актуальна, ждем изменений до ?wait= секунд, затем отдаем 304
+    version = state_version(state)
+    client_version = _client_state_version(request)
+    if client_version == version:
+        try:
+            wait = float(request.GET.get('wait', 0))
+        except ValueError:
+            wait = 0
+        state = await _wait_for_change(room_id, version, min(max(wait, 0), settings.GAME_LONG_POLL_TIMEOUT))
+        version = state_version(state) if state else None
+        
+        if version == client_version:
+            response = HttpResponseNotModified()
+            response['ETag'] = f'"{version}"'
+            return response
+        if version is None:
+            return JsonResponse({'error': 'Комната не найдена'}, status=404)
     
+    if _is_compact(request):
+        #только состояние игры, без комнаты и игроков
+        game = state['game']
+        row = tuple(game[field] for field in COMPACT_GAME_FIELDS) if game else None
+        return JsonResponse(compact_game_row(row, version), headers={'ETag': f'"{version}"'})
+    
+    data = await sync_to_async(_render_room)(room_id, state, version)
+    if data is None:
+        return JsonResponse({'error': 'Комната не найдена'}, status=404)
+    return JsonResponse(data, headers={'ETag': f'"{version}"'})
+
+async def _wait_for_change(room_id, version, timeout):
+    #состояние комнаты, как только его версия отличается от version, или последнее прочитанное по таймауту.
+    #Ожидающий клиент не занимает поток: ждем уведомления брокера (push) и только тогда перечитываем кэш.
+    #Раз в GAME_PUSH_HEARTBEAT перечитываем и без уведомления - изменение мог сделать процесс без общего брокера
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    #подписка до чтения состояния: изменение между чтением и подпиской не потеряется
+    subscription = push.get_broker().subscribe(push.room_channel(room_id))
     try:
-        game = room.game
-    except Game.DoesNotExist:
-        return Response({'error': 'Нет активной игры'}, status=status.HTTP_400_BAD_REQUEST)
+        while True:
+            state = await sync_to_async(game_cache.get)(room_id)
+            remaining = deadline - loop.time()
+            if state is None or state_version(state) != version or remaining <= 0:
+                return state
+            try:
+                await asyncio.wait_for(subscription.get(), min(remaining, settings.GAME_PUSH_HEARTBEAT))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        subscription.close()
+
+def _render_room(room_id, state, version):
+    #полный ответ рендерится один раз на версию состояния; None - комнату успели удалить
+    data = game_cache.get_rendered(room_id, state)
+    if data is None:
+        room = Room.objects.filter(id=room_id).first()
+        if room is None:
+            return None
+        data = RoomSerializer(room).data
+        
+        #добавляем данные игры если она уже есть
+        try:
+            game = room.game
+            data['game'] = GameSerializer(game).data
+        except Game.DoesNotExist:
+            data['game'] = None
+        
+        #версия, прочитанная до сериализации: при гонке клиент просто получит изменения повторно
+        data['version'] = version
+        game_cache.set_rendered(room_id, state, data)
+    return data
+
+@_async_view('GET', throttle='poll')
+async def spectate_room(request, room_id):
+    #режим зрителя для любого пользователя: один готовый снимок на комнату (game/spectators.py) вместо
+    #чтения и сериализации на каждый запрос. ETag/?version= и ?wait= - как у room_detail
+    snapshots = spectators.get_snapshots()
+    snapshot = snapshots.peek(room_id) or await sync_to_async(snapshots.get)(room_id)
+    if snapshot is None:
+        return JsonResponse({'error': 'Комната не найдена'}, status=404)
+    
+    client_version = _client_state_version(request)
+    if client_version == snapshot.version:
+        try:
+            wait = float(request.GET.get('wait', 0))
+        except ValueError:
+            wait = 0
+        if wait > 0:
+            snapshot = await _wait_for_snapshot(room_id, snapshot, min(wait, settings.GAME_LONG_POLL_TIMEOUT))
+        if snapshot is None:
+            return JsonResponse({'error': 'Комната не найдена'}, status=404)
+        if snapshot.version == client_version:
+            response = HttpResponseNotModified()
+            response['ETag'] = f'"{snapshot.version}"'
+            return response
+    
+    return HttpResponse(snapshot.body, content_type='application/json', headers={'ETag': f'"{snapshot.version}"'})
+
+async def _wait_for_snapshot(room_id, snapshot, timeout):
+    #новый снимок, как только изменится версия, или тот же по таймауту. После уведомления о ходе снимок
+    #пересобирает первый проснувшийся зритель, остальные получают его готовым (peek по версии из уведомления)
+    snapshots = spectators.get_snapshots()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    version = snapshot.version
+    subscription = push.get_broker().subscribe(push.room_channel(room_id))
+    try:
+        #изменение могло случиться до подписки
+        snapshot = await sync_to_async(snapshots.get)(room_id)
+        while snapshot is not None and snapshot.version == version:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(subscription.get(), min(remaining, settings.GAME_PUSH_HEARTBEAT))
+            except asyncio.TimeoutError:
+                message = {}
+            woke = time.monotonic()
+            expected = message.get('version')
+            snapshot = (
+                snapshots.peek(room_id, expected, woke)
+                or await sync_to_async(snapshots.get)(room_id, expected, woke)
+            )
+    finally:
+        subscription.close()
+    return snapshot
+
+def _finish_if_over(room, game):
+    #когда игра закончилась, в той же транзакции обновляем статус комнаты и статистику
+    #(finished_at записан вместе с ходом)
+    if game.status != Game.ONGOING:
+        room.status = Room.FINISHED
+        room.touch('status')
+        stats.record_game(game)
+        tournaments.games_finished([game])
+
+def _apply_move(room, game, row, col, player):
+    #ход и, если он закончил игру, статус комнаты и статистика - в одной транзакции
+    with transaction.atomic():
+        success, message = game.make_move(row, col, player)
+        if success:
+            _finish_if_over(room, game)
+    return success, message
+
+def _publish_moves(room, game, moves):
+    #write-through: продолжающаяся игра сразу обновляется в кэше, завершенная из него выпадает
+    if game.status == Game.ONGOING:
+        game_cache.store_game(room.id, game)
+    else:
+        game_cache.invalidate(room.id)
+    
+    version = _room_state_version(room.id)
+    for row, col in moves:
+        push.notify_move(room, game, row, col, game.symbol_at(row, col), version)
+    return version
+
+@_async_view('POST', throttle='move')
+async def make_move(request, room_id):
+    #ход игрока в активной игре; комната и игра берутся из кэша, запись - условным UPDATE в БД
+    state = await sync_to_async(game_cache.get)(room_id)
+    if state is None:
+        return JsonResponse({'error': 'Комната не найдена'}, status=404)
+    
+    if request.user.id not in state['members']:
+        return JsonResponse({'error': 'Не является игроком в комнате'}, status=403)
     
-    serializer = MakeMoveSerializer(data=request.data)
+    if state['game'] is None:
+        return JsonResponse({'error': 'Нет активной игры'}, status=400)
+    
+    data = _request_data(request)
+    if data is None:
+        return JsonResponse({'error': 'Неверный JSON'}, status=400)
+    serializer = MakeMoveSerializer(data=data)
     if not serializer.is_valid():
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return JsonResponse(serializer.errors, status=400)
     
     row = serializer.validated_data['row']
     col = serializer.validated_data['col']
     
-    success, message = game.make_move(row, col, request.user)
+    room = game_cache.build_room(room_id, state)
+    game = game_cache.build_game(room_id, state)
+    moves = [(row, col)]
+    try:
+        #запись может ждать блокировку SQLite до busy_timeout - не в закрепленном потоке запросов (game/asgi.py)
+        success, message = await unpinned(_apply_move)(room, game, row, col, request.user)
+        
+        #в игре с ботом он отвечает в том же запросе, отдельной транзакцией: поиск хода на большом поле
+        #идет в отдельном потоке и не держит ни блокировку записи, ни поток ORM с запросами других игроков
+        if success and room.bot_level and game.status == Game.ONGOING:
+            bot_move = await sync_to_async(bot.choose_move, thread_sensitive=False)(game, room.bot_level)
+            await unpinned(lambda: _apply_move(room, game, *bot_move, bot.get_bot_user()))()
+            moves.append(bot_move)
+    except StaleGameError:
+        #параллельный запрос уже изменил игру (или кэш устарел) - клиенту нужно перечитать состояние
+        await sync_to_async(game_cache.invalidate)(room_id)
+        return JsonResponse({'error': 'Состояние игры изменилось, обновите поле'}, status=409)
     
     if not success:
-        return Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
+        return JsonResponse({'error': message}, status=400)
     
-    #когда игра закончилась, обновляем статистику и статус игры
-    if game.status != Game.ONGOING:
-        game.finished_at = timezone.now()
-        game.save()
-        
-        room.status = Room.FINISHED
-        room.save()
-        
-        #статистика
-        for player in [game.player_x, game.player_o]:
-            profile, created = UserProfile.objects.get_or_create(user=player)
-            profile.games_played += 1
-            
-            if game.status == Game.DRAW:
-                profile.draws += 1
-            elif game.winner == player:
-                profile.wins += 1
-            else:
-                profile.losses += 1
-            
-            profile.save()
-    
-    return Response({
-        'message': message,
-        'game': GameSerializer(game).data
-    })
+    version = await sync_to_async(_publish_moves)(room, game, moves)
+    if _is_compact(request):
+        game_data = compact_game_data(game, version)
+    else:
+        game_data = await sync_to_async(lambda: GameSerializer(game).data)()
+    return JsonResponse({'message': message, 'game': game_data})
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@transaction.atomic
 def leave_room(request, room_id):
-    room = get_object_or_404(Room, id=room_id)
+    #одна транзакция с блокировкой строки комнаты: одновременный выход обоих игроков или выход
+    #во время входа соперника (quick_game) выполняются по очереди
+    room = get_object_or_404(Room.objects.select_for_update(), id=room_id)
     
     if request.user not in room.players.all():
         return Response({'error': 'Не является игроком в комнате'}, status=status.HTTP_400_BAD_REQUEST)
@@ -249,37 +672,261 @@ def leave_room(request, room_id):
     if game and game.status == Game.ONGOING:
          other_player = room.players.exclude(id=request.user.id).first()
          if other_player:
-            game.winner = other_player
-            game.status = Game.X_WINS if other_player == game.player_x else Game.O_WINS
-            game.finished_at = timezone.now()
-            game.save()
-
-            #обновляем статистику
-            winner_profile, _ = UserProfile.objects.get_or_create(user=other_player)
-            loser_profile, _ = UserProfile.objects.get_or_create(user=request.user)
-
-            winner_profile.games_played += 1
-            winner_profile.wins += 1
-            winner_profile.save()
-
-            loser_profile.games_played += 1
-            loser_profile.losses += 1
-            loser_profile.save()
+            #условная запись: если соперник как раз сделал победный ход, техническую победу не засчитываем
+            for _ in range(3):
+                try:
+                    with transaction.atomic():
+                        forfeited = game.forfeit(other_player)
+                        #обновляем статистику в той же транзакции
+                        if forfeited:
+                            stats.record_game(game)
+                            tournaments.games_finished([game])
+                    break
+                except StaleGameError:
+                    game.refresh_from_db()
+            else:
+                #ходы идут быстрее, чем мы успеваем записать выход - без результата партии из комнаты не выходим
+                return Response({'error': 'Состояние игры изменилось, попробуйте еще раз'}, status=status.HTTP_409_CONFLICT)
 
-    #удаляем объект игры, если он был найден
+    #отвязываем партию от комнаты: она остается в архиве (повтор, статистика), а в комнате можно начать новую
     if game:
-        game.delete()
+        Game.objects.filter(pk=game.pk).update(room=None)
 
-    room.players.remove(request.user) #удаляем игрока из комнаты ПОСЛЕ обработки статистики и игры
+    room.remove_player(request.user) #удаляем игрока из комнаты ПОСЛЕ обработки статистики и игры
+    
+    #без игрока комната с ботом не нужна - бот выходит следом
+    if room.bot_level and room.player_count == 1:
+        room.remove_player(bot.get_bot_user())
 
     #если комната пустая - удаляем её
     if room.player_count == 0:
+        room_id = room.id
         room.delete()
+        matchmaking.cancel(room_id)
+        game_cache.invalidate(room_id)
+        game_cache.forget_code(room.code)
+        push.notify_room_removed(room_id)
         return Response({'message': 'Вышел из комнаты, комната удалена'})
 
     # Если остался один игрок, переводим комнату в статус ожидания, чтобы другие могли зайти и поиграть
     if room.player_count == 1:
-        room.status = Room.WAITING
-        room.save()
+        if game and game.tournament_id:
+            #комната матча турнира: результат уже записан (техническая победа выше), в общий подбор ее не отдаем
+            room.status = Room.FINISHED
+        else:
+            room.status = Room.WAITING
+            matchmaking.enqueue(room, room.players.get())
+    room.touch('status')
+    _room_changed(room)
 
     return Response({'message': 'Вышел из комнаты'})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def tournament_list(request):
+    #последние турниры; ?status=registration|running|finished
+    tournaments_qs = Tournament.objects.select_related('creator', 'winner').annotate(
+        player_count=Count('entries')
+    ).order_by('-created_at')
+    if request.query_params.get('status'):
+        tournaments_qs = tournaments_qs.filter(status=request.query_params['status'])
+    return Response(TournamentSerializer(tournaments_qs[:50], many=True).data)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_tournament(request):
+    #создатель сразу участвует; остальные регистрируются до старта
+    options = TournamentOptionsSerializer(data=request.data)
+    if not options.is_valid():
+        return Response(options.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = options.validated_data
+    data.setdefault('name', f"Турнир {request.user.username}")
+    with transaction.atomic():
+        tournament = Tournament.objects.create(creator=request.user, **data)
+        tournaments.register(tournament, request.user)
+    return Response(TournamentSerializer(tournament).data, status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def tournament_detail(request, tournament_id):
+    #турнир, таблица (один запрос с агрегатами) и партии текущего тура с комнатами
+    tournament = get_object_or_404(Tournament.objects.select_related('creator', 'winner'), id=tournament_id)
+    data = TournamentSerializer(tournament).data
+    data['standings'] = tournaments.standings(tournament)
+    data['matches'] = tournaments.current_matches(tournament)
+    return Response(data)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def join_tournament(request, tournament_id):
+    #блокировка строки турнира: регистрация не проскочит между посевом и первым туром (start)
+    with transaction.atomic():
+        tournament = get_object_or_404(Tournament.objects.select_for_update(), id=tournament_id)
+        if tournament.status != Tournament.REGISTRATION:
+            return Response({'error': 'Регистрация на турнир закрыта'}, status=status.HTTP_400_BAD_REQUEST)
+        if not tournaments.register(tournament, request.user):
+            return Response({'error': 'Уже участвует в турнире'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(TournamentSerializer(tournament).data)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def start_tournament(request, tournament_id):
+    #посев и первый тур: комнаты и партии всего тура создаются пачкой в одной транзакции
+    tournament = get_object_or_404(Tournament, id=tournament_id)
+    if tournament.creator_id != request.user.id:
+        return Response({'error': 'Начать турнир может только его создатель'}, status=status.HTTP_403_FORBIDDEN)
+    
+    with transaction.atomic():
+        started = tournaments.start(tournament)
+    if not started:
+        return Response(
+            {'error': f'Турнир уже начат или в нем меньше {tournaments.MIN_PLAYERS} игроков'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    tournament.refresh_from_db()
+    data = TournamentSerializer(tournament).data
+    data['matches'] = tournaments.current_matches(tournament)
+    return Response(data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def game_replay(request, game_id):
+    #ходы партии из журнала; ?ply=N - позиция после N ходов, ?stream=1 - ходы построчно (NDJSON)
+    game = get_object_or_404(Game, id=game_id)
+    if request.user.id not in (game.player_x_id, game.player_o_id) and not request.user.is_staff:
+        return Response({'error': 'Не является игроком в партии'}, status=status.HTTP_403_FORBIDDEN)
+    
+    geometry = game.geometry
+    cells = geometry.unpack_moves(game.moves)
+    moves = [divmod(cell, geometry.size) for cell in cells]
+    #журнал, который не сходится с доской (камни без записанных ходов), дал бы неверный повтор
+    x_bits, o_bits = game.bitboards
+    if len(cells) != bin(x_bits | o_bits).count('1'):
+        return Response({'error': 'Журнал ходов партии неполон, повтор недоступен'}, status=status.HTTP_409_CONFLICT)
+    
+    if request.query_params.get('stream'):
+        #не больше board_size² строк - обычный ответ, без потоковой отдачи
+        lines = [
+            json.dumps({'ply': ply, 'row': row, 'col': col, 'symbol': Game.X if ply % 2 else Game.O}) + '\n'
+            for ply, (row, col) in enumerate(moves, 1)
+        ]
+        return HttpResponse(''.join(lines), content_type='application/x-ndjson')
+    
+    data = {
+        'game': game.id,
+        'board_size': game.board_size,
+        'win_length': game.win_length,
+        'player_x': game.player_x_id,
+        'player_o': game.player_o_id,
+        'status': game.status,
+        'winner': game.winner_id,
+        'moves': moves,
+    }
+    
+    if 'ply' in request.query_params:
+        try:
+            ply = int(request.query_params['ply'])
+        except ValueError:
+            ply = -1
+        if not 0 <= ply <= len(cells):
+            return Response({'error': 'Неверный номер хода'}, status=status.HTTP_400_BAD_REQUEST)
+        data['ply'] = ply
+        data['board'] = geometry.to_grid(*geometry.replay(cells[:ply]))
+        data['current_turn'] = Game.X if ply % 2 == 0 else Game.O
+    
+    return Response(data)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_data(request, kind):
+    #потоковая выгрузка для аналитики: ?output=ndjson|csv, ?since=<ISO-время> - только записи с этого момента
+    exporter = export.EXPORTS.get(kind)
+    if exporter is None:
+        return Response({'error': 'Неизвестная выгрузка'}, status=status.HTTP_404_NOT_FOUND)
+    
+    output = request.query_params.get('output', 'ndjson')
+    if output not in export.CONTENT_TYPES:
+        return Response({'error': 'Формат должен быть ndjson или csv'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    since = None
+    if 'since' in request.query_params:
+        if exporter.watermark is None:
+            return Response({'error': 'Эта выгрузка не поддерживает since'}, status=status.HTTP_400_BAD_REQUEST)
+        since = export.parse_since(request.query_params['since'])
+        if since is None:
+            return Response({'error': 'Неверный формат since, нужно ISO 8601'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    #каждый обработчик потоково отдает только свой вид итератора, иначе Django 4.2 читает ответ целиком
+    render = export.arender if isinstance(request, ASGIRequest) else export.render
+    response = StreamingHttpResponse(render(exporter, output, since), content_type=export.CONTENT_TYPES[output])
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{output}"'
+    return response
+
+#push-уведомления (SSE): асинхронные view, работают только под ASGI (tictactoe/asgi.py)
+def _sse_stream(channel, first_message=None, on_ping=None):
+    #on_ping - корутина, которую вызываем при каждом heartbeat (отметка активности комнаты)
+    async def stream():
+        if first_message is not None:
+            yield _sse_format(first_message)
+        
+        subscription = push.get_broker().subscribe(channel)
+        loop = asyncio.get_running_loop()
+        #поток ограничен по времени: EventSource сам переподключится, а брошенные подписки не копятся
+        deadline = loop.time() + settings.GAME_PUSH_STREAM_TIMEOUT
+        try:
+            while loop.time() < deadline:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), settings.GAME_PUSH_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if on_ping is not None:
+                        await on_ping()
+                    yield ': ping\n\n'
+                    continue
+                yield _sse_format(message)
+        finally:
+            subscription.close()
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _sse_format(message):
+    return f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+
+async def _sse_user(request):
+    if not isinstance(request, ASGIRequest):
+        return None, JsonResponse({'error': 'Поток событий доступен только под ASGI'}, status=501)
+    user = await sync_to_async(lambda: request.user if request.user.is_authenticated else None)()
+    if user is None:
+        return None, JsonResponse({'error': 'Требуется авторизация'}, status=403)
+    return user, None
+
+async def room_events(request, room_id):
+    #дельты ходов и изменений комнаты для двух её игроков
+    user, error = await _sse_user(request)
+    if error:
+        return error
+    
+    if not await Room.objects.filter(id=room_id).aexists():
+        return JsonResponse({'error': 'Комната не найдена'}, status=404)
+    if not await Room.objects.filter(id=room_id, players=user).aexists():
+        return JsonResponse({'error': 'Не является игроком в комнате'}, status=403)
+    
+    version = await sync_to_async(_room_state_version)(room_id)
+    heartbeat = unpinned(_heartbeat)
+    await heartbeat(room_id)
+    return _sse_stream(
+        push.room_channel(room_id),
+        {'type': 'hello', 'room': room_id, 'version': version},
+        on_ping=lambda: heartbeat(room_id)
+    )
+
+async def lobby_events(request):
+    #изменения списка комнат для всех, кто смотрит лобби
+    user, error = await _sse_user(request)
+    if error:
+        return error
+    return _sse_stream(push.LOBBY_CHANNEL, {'type': 'hello'})
\ No newline at end of file
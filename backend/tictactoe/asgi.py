@@ -0,0 +1,11 @@
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tictactoe.settings')
+
+django.setup(set_prefix=False)
+
+from game.asgi import GameASGIHandler  # noqa: E402
+
+application = GameASGIHandler()
@@ -23,6 +23,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'game.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,13 +52,52 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'tictactoe.wsgi.application'
+ASGI_APPLICATION = 'tictactoe.asgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# База данных задается переменными окружения.
+# DB_ENGINE=postgresql - PostgreSQL (нужен пакет psycopg): DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT.
+# По умолчанию SQLite в файле DB_NAME (db.sqlite3).
+# Соединение живет DB_CONN_MAX_AGE секунд между запросами (0 - новое на каждый запрос) и проверяется
+# перед повторным использованием, так что оборванное соединение не ломает следующий запрос
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'tictactoe'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+        }
     }
-}
+else:
+    # SQLite для параллельной записи (game/backends/sqlite3): WAL - читатели не ждут писателя и наоборот,
+    # busy_timeout - писатель ждет блокировку файла (мс) вместо ошибки "database is locked",
+    # synchronous=NORMAL - в режиме WAL fsync только при checkpoint, IMMEDIATE - блокировка записи с начала
+    # транзакции. DB_SQLITE_TUNED=0 - настройки SQLite по умолчанию
+    DATABASES = {
+        'default': {
+            'ENGINE': 'game.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('DB_SQLITE_TUNED', '1') == '1':
+        DATABASES['default']['OPTIONS'] = {
+            'init_command': (
+                'PRAGMA journal_mode = WAL; '
+                f"PRAGMA busy_timeout = {int(os.environ.get('DB_SQLITE_BUSY_TIMEOUT', 5000))}; "
+                'PRAGMA synchronous = NORMAL'
+            ),
+            'transaction_mode': 'IMMEDIATE',
+        }
+
+DATABASES['default'].update(
+    CONN_MAX_AGE=int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+    CONN_HEALTH_CHECKS=True,
+)
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -85,9 +125,49 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Кэши: 'games' - состояние активных комнат и игр (game/cache.py). locmem работает внутри процесса,
+# для нескольких воркеров замените на общий Redis:
+#   'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'games': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'games',
+        'TIMEOUT': 300,  # TTL записи в секундах
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,  # при переполнении вытесняются давно не читанные записи
+        },
+    },
+    # сессии (SESSION_CACHE_ALIAS): при нескольких воркерах - только общий Redis, иначе выход из аккаунта
+    # в одном воркере не виден другим до истечения TTL
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    },
+}
+
+# Сессии: SESSION_BACKEND=cached_db (по умолчанию) читает сессию из кэша 'sessions' и идет в БД только при промахе,
+# cache - только кэш (сессии теряются при его очистке), db - каждый запрос читает django_session
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('SESSION_BACKEND', 'cached_db')
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Пользователь сессии берется из кэша процесса (game/authentication.py); ModelBackend - для сессий,
+# созданных до его появления
+AUTHENTICATION_BACKENDS = [
+    'game.authentication.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'game.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -103,8 +183,85 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# ETag нужен клиенту для long-poll запросов к комнате, Retry-After - чтобы выждать после 429
+CORS_EXPOSE_HEADERS = ['ETag', 'Retry-After']
+
 # CSRF settings
 CSRF_TRUSTED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
-]
\ No newline at end of file
+]
+
+# Long-poll для /api/rooms/<id>/: максимальное ожидание (в секундах). Ожидание не занимает поток -
+# room_detail асинхронный и ждет push-уведомления об изменении комнаты
+GAME_LONG_POLL_TIMEOUT = 25
+
+# Режим зрителя (/api/rooms/<id>/spectate/, game/spectators.py): сколько снимков комнат держать в памяти процесса
+# и как часто (в секундах) сверять версию снимка с кэшем состояния - изменения из других процессов видны
+# с такой задержкой (long-poll зрителей с ?wait= узнает о них сразу через push)
+GAME_SPECTATOR_SNAPSHOTS = 1000
+GAME_SPECTATOR_REVALIDATE = 1.0
+
+# Токены для опроса (заголовок "Authorization: Token <токен>", выдаются при входе и в /api/user/): срок жизни
+# в секундах; кэш пользователей процесса - размер и TTL записи (блокировка в другом процессе видна через TTL секунд)
+GAME_AUTH_TOKEN_MAX_AGE = 7 * 24 * 3600
+GAME_AUTH_USER_CACHE_SIZE = 10000
+GAME_AUTH_USER_CACHE_TTL = 60
+
+# Ограничение частоты запросов (game/throttling.py): у каждого пользователя на группу эндпоинтов ведро на burst
+# запросов, которое пополняется rate запросами в секунду; сверх бюджета - 429 с Retry-After.
+# poll - состояние комнаты и список комнат, move - ходы, quick_game - быстрая игра.
+# GAME_THROTTLE_CACHE - алиас кэша, общего для воркеров (None - ведра в памяти процесса, не больше MAX_BUCKETS)
+GAME_THROTTLE_ENABLED = True
+GAME_THROTTLE_RATES = {
+    'poll': {'rate': 2, 'burst': 10},
+    'move': {'rate': 2, 'burst': 6},
+    'quick_game': {'rate': 0.2, 'burst': 3},
+}
+GAME_THROTTLE_CACHE = None
+GAME_THROTTLE_MAX_BUCKETS = 100000
+
+# ASGI (uvicorn tictactoe.asgi:application): сколько потоков выполняют синхронный код запросов (game/asgi.py).
+# Столько же будет и соединений с БД на процесс
+GAME_ASGI_THREADS = 16
+
+# Push-уведомления (SSE): брокер pub/sub, период heartbeat и максимальная длина одного потока (в секундах)
+GAME_PUSH_BROKER = 'game.push.InProcessBroker'
+GAME_PUSH_HEARTBEAT = 15
+GAME_PUSH_STREAM_TIMEOUT = 300
+
+# Статистика игроков: буферизованный режим копит приращения в памяти и пишет их пачкой
+# (раз в GAME_STATS_FLUSH_INTERVAL секунд или при GAME_STATS_FLUSH_SIZE игроках в буфере)
+GAME_STATS_BUFFERED = False
+GAME_STATS_FLUSH_INTERVAL = 5
+GAME_STATS_FLUSH_SIZE = 500
+
+# Быстрая игра: ширина диапазона рейтинга (победы - поражения), сколько соседних диапазонов просматривать
+# и через сколько секунд ожидания комната доступна игрокам с любым рейтингом
+GAME_MATCHMAKING_BAND_WIDTH = 10
+GAME_MATCHMAKING_BAND_SPREAD = 1
+GAME_MATCHMAKING_BAND_TIMEOUT = 10
+
+# Бот: имя служебного пользователя (скобки нельзя использовать при регистрации), время на ход на больших полях
+# (в секундах), размер LRU-кэша позиций alpha-beta и файл таблицы решений 3x3 (None - считается в памяти)
+GAME_BOT_USERNAME = '[bot]'
+GAME_BOT_TIME_BUDGET = 1.0
+GAME_SOLVER_CACHE_SIZE = 200000
+GAME_SOLVER_TABLE_PATH = None
+
+# Таблица лидеров в памяти: как часто перечитывать её из БД (в секундах), чтобы учесть партии других процессов
+GAME_LEADERBOARD_REFRESH_INTERVAL = 60
+
+# Метрики запросов (game/middleware.py): время view, SQL-запросы, сериализаторы, размер ответа - /api/metrics/.
+# Запросы дольше GAME_METRICS_SLOW_REQUEST_MS (мс) пишутся в лог game.metrics вместе с SQL; None - не писать
+GAME_METRICS_ENABLED = True
+GAME_METRICS_SLOW_REQUEST_MS = None
+
+# Уборка брошенных комнат (manage.py reap_rooms, game/reaper.py): партия без хода дольше GAME_MOVE_TIMEOUT
+# засчитывается как поражение того, чей ход; комната без запросов игроков дольше GAME_ROOM_IDLE_TIMEOUT удаляется.
+# room_detail и поток событий отмечают активность не чаще раза в GAME_HEARTBEAT_INTERVAL (все в секундах)
+GAME_HEARTBEAT_INTERVAL = 30
+GAME_MOVE_TIMEOUT = 300
+GAME_ROOM_IDLE_TIMEOUT = 900
+GAME_REAPER_INTERVAL = 60
+GAME_REAPER_BATCH_SIZE = 200
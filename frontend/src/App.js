@@ -6,6 +6,7 @@ import Register from './components/Register';
 import Home from './components/Home';
 import RoomList from './components/RoomList';
 import GameRoom from './components/GameRoom';
+import Spectate from './components/Spectate';
 import Stats from './components/Stats';
 import './App.css';
 
@@ -15,6 +16,15 @@ axios.defaults.xsrfCookieName = 'csrftoken';
 axios.defaults.xsrfHeaderName = 'X-CSRFToken';
 axios.defaults.withCredentials = true;
 
+// Частые запросы (опрос комнаты и списка) идут с токеном: сервер не читает сессию из БД
+const setAuthToken = (token) => {
+  if (token) {
+    axios.defaults.headers.common['Authorization'] = `Token ${token}`;
+  } else {
+    delete axios.defaults.headers.common['Authorization'];
+  }
+};
+
 function App() {
   const [user, setUser] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -29,21 +39,25 @@ function App() {
       await axios.get('/api/csrf/');
       
       const response = await axios.get('/api/user/');
+      setAuthToken(response.data.token);
       setUser(response.data);
     } catch (error) {
+      setAuthToken(null);
       setUser(null);
     } finally {
       setLoading(false);
     }
   };
 
-  const handleLogin = (userData) => {
+  const handleLogin = (userData, token) => {
+    setAuthToken(token);
     setUser(userData);
   };
 
   const handleLogout = async () => {
     try {
       await axios.post('/api/logout/');
+      setAuthToken(null);
       setUser(null);
     } catch (error) {
       console.error('Ошибка при выходе:', error);
@@ -78,6 +92,10 @@ function App() {
             path="/room/:roomId" 
             element={user ? <GameRoom user={user} onLogout={handleLogout} /> : <Navigate to="/login" />} 
           />
+          <Route 
+            path="/watch/:roomId" 
+            element={user ? <Spectate user={user} onLogout={handleLogout} /> : <Navigate to="/login" />} 
+          />
           <Route 
             path="/stats" 
             element={user ? <Stats user={user} onLogout={handleLogout} /> : <Navigate to="/login" />} 
@@ -11,24 +11,95 @@ function GameRoom({ user, onLogout }) {
   const [error, setError] = useState('');
 
   useEffect(() => {
-    fetchRoomData();
-    const interval = setInterval(fetchRoomData, 1000); // Обновляем каждую 1 секунду
-    return () => clearInterval(interval);
-  }, [roomId]);
+    let active = true;
+    let version = null;
+    let source = null;
 
-  const fetchRoomData = async () => {
-    try {
-      const response = await axios.get(`/api/rooms/${roomId}/`);
-      setRoom(response.data);
-      setGame(response.data.game);
-      setError('');
-    } catch (error) {
-      console.error('Ошибка загрузки данных комнаты:', error);
-      setError('Ошибка загрузки данных комнаты');
-    } finally {
-      setLoading(false);
-    }
-  };
+    // Возвращает, сколько мс подождать перед следующим запросом (0 - можно сразу)
+    const fetchRoomData = async (params = {}) => {
+      try {
+        const response = await axios.get(`/api/rooms/${roomId}/`, {
+          params,
+          validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+        });
+        if (active && response.status !== 304) {
+          version = response.data.version;
+          setRoom(response.data);
+          setGame(response.data.game);
+        }
+        setError('');
+        return 0;
+      } catch (error) {
+        if (error.response?.status === 429) {
+          // Слишком частые запросы: сервер подсказывает, через сколько секунд повторить
+          return Number(error.response.headers['retry-after'] || 1) * 1000;
+        }
+        console.error('Ошибка загрузки данных комнаты:', error);
+        setError('Ошибка загрузки данных комнаты');
+        return 1000;
+      } finally {
+        setLoading(false);
+      }
+    };
+
+    // Long-poll: сервер держит запрос, пока версия комнаты не изменится (или отвечает 304 по таймауту)
+    const pollRoomData = async () => {
+      while (active) {
+        const delay = await fetchRoomData(version ? { version, wait: 25 } : {});
+        if (delay) {
+          await new Promise((resolve) => setTimeout(resolve, delay));
+        }
+      }
+    };
+
+    // Push: сервер присылает дельты ходов, полное состояние перечитываем только при изменении комнаты
+    const subscribe = () => {
+      let opened = false;
+      source = new EventSource(`${axios.defaults.baseURL}/api/rooms/${roomId}/events/`, {
+        withCredentials: true,
+      });
+      source.onopen = () => {
+        opened = true;
+      };
+      source.onerror = () => {
+        // Сервер без ASGI: переходим на long-poll
+        if (!opened) {
+          source.close();
+          pollRoomData();
+        }
+      };
+      source.addEventListener('hello', (event) => {
+        if (JSON.parse(event.data).version !== version) fetchRoomData();
+      });
+      source.addEventListener('room', () => fetchRoomData());
+      source.addEventListener('move', (event) => {
+        const delta = JSON.parse(event.data);
+        version = delta.version;
+        setGame((current) => {
+          if (!current) return current;
+          const board = current.board.map((row) => [...row]);
+          board[delta.row][delta.col] = delta.symbol;
+          // В событии победитель - id, в состоянии игры - объект игрока, как в полном ответе
+          const winner = [current.player_x, current.player_o].find((player) => player.id === delta.winner) || null;
+          return { ...current, board, current_turn: delta.current_turn, status: delta.status, winner };
+        });
+      });
+    };
+
+    fetchRoomData().then(() => {
+      if (!active) return;
+      if (window.EventSource) {
+        subscribe();
+      } else {
+        pollRoomData();
+      }
+    });
+
+    return () => {
+      active = false;
+      if (source) source.close();
+    };
+  }, [roomId]);
 
   const handleCellClick = async (row, col) => {
     if (!game || game.status !== 'ongoing') return;
@@ -60,6 +131,7 @@ function GameRoom({ user, onLogout }) {
         navigate('/');
       } catch (error) {
         console.error('Ошибка при выходе из комнаты:', error);
+        alert(error.response?.data?.error || 'Ошибка при выходе из комнаты');
       }
     }
   };
@@ -156,10 +228,13 @@ function GameRoom({ user, onLogout }) {
                   {getGameStatus()}
                   {isMyTurn() && <div style={{ color: '#27ae60' }}>Ваш ход!</div>}
                   {game && <div>Вы играете за: <strong>{getMySymbol()}</strong></div>}
+                  {game && game.board_size > 3 && (
+                    <div>Поле {game.board_size}x{game.board_size}, для победы нужно {game.win_length} в ряд</div>
+                  )}
                 </div>
                 
                 {game && (
-                  <div className="game-board">
+                  <div className="game-board" style={{ '--board-size': game.board_size }}>
                     {game.board.map((row, rowIndex) =>
                       row.map((cell, colIndex) => (
                         <button
@@ -4,6 +4,7 @@ import axios from 'axios';
 
 function Home({ user, onLogout }) {
   const [loading, setLoading] = useState(false);
+  const [botLevel, setBotLevel] = useState('medium');
   const navigate = useNavigate();
 
   const handleQuickGame = async () => {
@@ -20,6 +21,19 @@ function Home({ user, onLogout }) {
     }
   };
 
+  const handleBotGame = async () => {
+    setLoading(true);
+    try {
+      const response = await axios.post('/api/bot-game/', { level: botLevel });
+      navigate(`/room/${response.data.room.id}`);
+    } catch (error) {
+      console.error('Ошибка при создании игры с ботом:', error);
+      alert('Ошибка при создании игры с ботом');
+    } finally {
+      setLoading(false);
+    }
+  };
+
   return (
     <div>
       <header className="header">
@@ -48,6 +62,22 @@ function Home({ user, onLogout }) {
               {loading ? 'Поиск игры...' : '🎮 Быстрая игра'}
             </button>
             
+            <div style={{ display: 'flex', gap: '0.5rem' }}>
+              <button
+                onClick={handleBotGame}
+                className="btn btn-primary"
+                style={{ padding: '1rem', fontSize: '1.1rem', flex: 1 }}
+                disabled={loading}
+              >
+                🤖 Игра с ботом
+              </button>
+              <select value={botLevel} onChange={(e) => setBotLevel(e.target.value)}>
+                <option value="easy">Легко</option>
+                <option value="medium">Средне</option>
+                <option value="hard">Сложно</option>
+              </select>
+            </div>
+            
             <Link to="/rooms" className="btn btn-primary" style={{ padding: '1rem', fontSize: '1.1rem' }}>
               🏠 Список комнат
             </Link>
@@ -61,6 +91,7 @@ function Home({ user, onLogout }) {
             <h3>Как играть:</h3>
             <ul style={{ textAlign: 'left', maxWidth: '400px', margin: '1rem auto' }}>
               <li><strong>Быстрая игра</strong> - автоматически найдет игру или создаст новую комнату</li>
+              <li><strong>Игра с ботом</strong> - партия против компьютера, на уровне "Сложно" на поле 3x3 бот не проигрывает</li>
               <li><strong>Список комнат</strong> - просмотр всех доступных комнат, создание новой</li>
               <li><strong>Статистика</strong> - ваши результаты игр</li>
             </ul>
@@ -24,7 +24,7 @@ function Login({ onLogin }) {
 
     try {
       const response = await axios.post('/api/login/', formData);
-      onLogin(response.data.user);
+      onLogin(response.data.user, response.data.token);
     } catch (error) {
       setError(error.response?.data?.error || 'Ошибка входа');
     } finally {
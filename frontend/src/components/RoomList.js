@@ -1,25 +1,88 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import axios from 'axios';
 
+// Новые комнаты из событий лобби подгружаются одним запросом не чаще раза в это время (мс)
+const LOBBY_REFRESH_DELAY = 2000;
+
 function RoomList({ user, onLogout }) {
   const [rooms, setRooms] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(true);
   const [creating, setCreating] = useState(false);
   const [newRoomName, setNewRoomName] = useState('');
+  const [boardSize, setBoardSize] = useState(3);
   const [showCreateForm, setShowCreateForm] = useState(false);
+  const [joinCode, setJoinCode] = useState('');
   const navigate = useNavigate();
+  const roomIds = useRef(new Set());
+
+  useEffect(() => {
+    roomIds.current = new Set(rooms.map((room) => room.id));
+  }, [rooms]);
 
   useEffect(() => {
     fetchRooms();
-    const interval = setInterval(fetchRooms, 3000); // Обновляем каждые 3 секунды
-    return () => clearInterval(interval);
+    let interval = null;
+    let source = null;
+    let refreshTimer = null;
+
+    const scheduleRefresh = (delay = LOBBY_REFRESH_DELAY) => {
+      if (refreshTimer) return;
+      refreshTimer = setTimeout(async () => {
+        refreshTimer = null;
+        const retryAfter = await fetchNewRooms();
+        if (retryAfter) scheduleRefresh(retryAfter);
+      }, delay);
+    };
+
+    // Событие лобби - дельта комнаты: известные комнаты обновляем на месте, без запроса;
+    // незнакомую (новую) подгружаем отложенным запросом первой страницы
+    const applyRoomEvent = (event) => {
+      const delta = JSON.parse(event.data);
+      const listed = delta.type === 'room' && ['waiting', 'playing'].includes(delta.status);
+      if (roomIds.current.has(delta.room)) {
+        setRooms((current) => listed
+          ? current.map((room) => room.id === delta.room
+            ? { ...room, status: delta.status, player_count: delta.player_count }
+            : room)
+          : current.filter((room) => room.id !== delta.room));
+      } else if (listed) {
+        scheduleRefresh();
+      }
+    };
+
+    // Push: список меняется по событиям лобби
+    if (window.EventSource) {
+      let opened = false;
+      source = new EventSource(`${axios.defaults.baseURL}/api/rooms/events/`, { withCredentials: true });
+      source.onopen = () => {
+        opened = true;
+      };
+      source.onerror = () => {
+        // Сервер без ASGI: возвращаемся к периодическому опросу
+        if (!opened) {
+          source.close();
+          interval = setInterval(fetchRooms, 3000);
+        }
+      };
+      ['room', 'room_removed'].forEach((type) => source.addEventListener(type, applyRoomEvent));
+    } else {
+      interval = setInterval(fetchRooms, 3000); // Обновляем каждые 3 секунды
+    }
+
+    return () => {
+      if (source) source.close();
+      if (interval) clearInterval(interval);
+      if (refreshTimer) clearTimeout(refreshTimer);
+    };
   }, []);
 
   const fetchRooms = async () => {
     try {
       const response = await axios.get('/api/rooms/');
-      setRooms(response.data);
+      setRooms(response.data.results);
+      setNextPage(response.data.next);
     } catch (error) {
       console.error('Ошибка загрузки данных комнаты:', error);
     } finally {
@@ -27,6 +90,38 @@ function RoomList({ user, onLogout }) {
     }
   };
 
+  // Первая страница поверх уже загруженного списка: новые комнаты (они в начале - сортировка по
+  // времени создания) добавляются, известные обновляются, догруженные страницы и курсор остаются.
+  // Возвращает, через сколько мс повторить (0 - повторять не нужно)
+  const fetchNewRooms = async () => {
+    try {
+      const response = await axios.get('/api/rooms/');
+      const fresh = new Map(response.data.results.map((room) => [room.id, room]));
+      setRooms((current) => [
+        ...response.data.results.filter((room) => !current.some((known) => known.id === room.id)),
+        ...current.map((room) => fresh.get(room.id) || room),
+      ]);
+      return 0;
+    } catch (error) {
+      if (error.response?.status === 429) {
+        // Слишком частые запросы: сервер подсказывает, через сколько секунд повторить
+        return Number(error.response.headers['retry-after'] || 1) * 1000;
+      }
+      console.error('Ошибка загрузки данных комнаты:', error);
+      return 0;
+    }
+  };
+
+  const fetchMoreRooms = async () => {
+    try {
+      const response = await axios.get(nextPage);
+      setRooms((current) => [...current, ...response.data.results]);
+      setNextPage(response.data.next);
+    } catch (error) {
+      console.error('Ошибка загрузки данных комнаты:', error);
+    }
+  };
+
   const handleCreateRoom = async (e) => {
     e.preventDefault();
     if (!newRoomName.trim()) return;
@@ -34,7 +129,8 @@ function RoomList({ user, onLogout }) {
     setCreating(true);
     try {
       const response = await axios.post('/api/rooms/create/', {
-        name: newRoomName
+        name: newRoomName,
+        board_size: boardSize
       });
       const roomId = response.data.id;
       navigate(`/room/${roomId}`);
@@ -56,6 +152,20 @@ function RoomList({ user, onLogout }) {
     }
   };
 
+  const handleJoinByCode = async (e) => {
+    e.preventDefault();
+    const code = joinCode.trim();
+    if (!code) return;
+
+    try {
+      const response = await axios.post(`/api/rooms/code/${encodeURIComponent(code)}/join/`);
+      navigate(`/room/${response.data.id}`);
+    } catch (error) {
+      console.error('Ошибка при входе по коду:', error);
+      alert(error.response?.data?.error || 'Ошибка при входе по коду');
+    }
+  };
+
   const getStatusText = (status) => {
     switch (status) {
       case 'waiting': return 'Ожидание игроков';
@@ -100,6 +210,18 @@ function RoomList({ user, onLogout }) {
           <button onClick={fetchRooms} className="btn btn-secondary">
             🔄 Обновить
           </button>
+          <form onSubmit={handleJoinByCode} style={{ display: 'inline-flex', gap: '8px' }}>
+            <input
+              type="text"
+              value={joinCode}
+              onChange={(e) => setJoinCode(e.target.value)}
+              placeholder="Код комнаты"
+              maxLength={6}
+            />
+            <button type="submit" className="btn btn-success">
+              Войти по коду
+            </button>
+          </form>
         </div>
 
         {showCreateForm && (
@@ -116,6 +238,13 @@ function RoomList({ user, onLogout }) {
                   required
                 />
               </div>
+              <div className="form-group">
+                <label>Поле:</label>
+                <select value={boardSize} onChange={(e) => setBoardSize(Number(e.target.value))}>
+                  <option value={3}>Классика 3x3</option>
+                  <option value={15}>Гомоку 15x15, 5 в ряд</option>
+                </select>
+              </div>
               <button 
                 type="submit" 
                 className="btn btn-success"
@@ -145,6 +274,7 @@ function RoomList({ user, onLogout }) {
                       <div>Код: <strong>{room.code}</strong></div>
                       <div>Создатель: {room.creator.username}</div>
                       <div>Игроки: {room.player_count}/2</div>
+                      <div>Поле: {room.board_size}x{room.board_size}, {room.win_length} в ряд</div>
                       <div style={{ color: getStatusColor(room.status) }}>
                         Статус: {getStatusText(room.status)}
                       </div>
@@ -162,15 +292,24 @@ function RoomList({ user, onLogout }) {
                       <Link to={`/room/${room.id}`} className="btn btn-primary">
                         Войти в игру
                       </Link>
+                    ) : room.status === 'playing' ? (
+                      <Link to={`/watch/${room.id}`} className="btn btn-secondary">
+                        Смотреть
+                      </Link>
                     ) : (
                       <button className="btn btn-secondary" disabled>
-                        {room.status === 'playing' ? 'Игра идет' : 'Недоступно'}
+                        Недоступно
                       </button>
                     )}
                   </div>
                 </div>
               ))
             )}
+            {nextPage && (
+              <button onClick={fetchMoreRooms} className="btn btn-secondary">
+                Показать еще
+              </button>
+            )}
           </div>
         )}
       </div>
@@ -0,0 +1,138 @@
+import React, { useState, useEffect } from 'react';
+import { Link, useParams } from 'react-router-dom';
+import axios from 'axios';
+
+function Spectate({ user, onLogout }) {
+  const { roomId } = useParams();
+  const [room, setRoom] = useState(null);
+  const [loading, setLoading] = useState(true);
+  const [error, setError] = useState('');
+
+  useEffect(() => {
+    let active = true;
+    let version = null;
+
+    // Возвращает, сколько мс подождать перед следующим запросом (0 - можно сразу)
+    const fetchSnapshot = async () => {
+      try {
+        const response = await axios.get(`/api/rooms/${roomId}/spectate/`, {
+          params: version ? { version, wait: 25 } : {},
+          validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+        });
+        if (active && response.status !== 304) {
+          version = response.data.version;
+          setRoom(response.data);
+        }
+        setError('');
+        return 0;
+      } catch (error) {
+        if (error.response?.status === 429) {
+          return Number(error.response.headers['retry-after'] || 1) * 1000;
+        }
+        if (error.response?.status === 404) {
+          active = false;
+          setError('Комната закрыта');
+          return 0;
+        }
+        console.error('Ошибка загрузки комнаты:', error);
+        setError('Ошибка загрузки комнаты');
+        return 1000;
+      } finally {
+        setLoading(false);
+      }
+    };
+
+    // Long-poll: сервер отвечает, как только в партии появится ход (или 304 по таймауту)
+    const poll = async () => {
+      while (active) {
+        const delay = await fetchSnapshot();
+        if (delay) {
+          await new Promise((resolve) => setTimeout(resolve, delay));
+        }
+      }
+    };
+    poll();
+
+    return () => {
+      active = false;
+    };
+  }, [roomId]);
+
+  const game = room?.game;
+
+  const getGameStatus = () => {
+    if (!game) return 'Ожидание начала игры...';
+
+    switch (game.status) {
+      case 'ongoing':
+        const currentPlayer = game.current_turn === 'X' ? game.player_x : game.player_o;
+        return `Ход игрока: ${currentPlayer.username} (${game.current_turn})`;
+      case 'x_wins':
+        return `Победил ${game.player_x.username} (X)`;
+      case 'o_wins':
+        return `Победил ${game.player_o.username} (O)`;
+      case 'draw':
+        return 'Ничья';
+      default:
+        return 'Игра завершена';
+    }
+  };
+
+  if (loading) {
+    return <div className="loading">Загрузка...</div>;
+  }
+
+  return (
+    <div>
+      <header className="header">
+        <div className="header-content">
+          <h1>Просмотр: {room?.name}</h1>
+          <div className="header-actions">
+            <Link to="/rooms" className="btn btn-secondary">Список комнат</Link>
+            <span>Привет, {user.username}!</span>
+            <button onClick={onLogout} className="btn btn-secondary">
+              Выйти
+            </button>
+          </div>
+        </div>
+      </header>
+
+      <div className="container">
+        <div className="card">
+          {error ? (
+            <p>{error}</p>
+          ) : (
+            <div className="game-info">
+              {game && (
+                <div className="players-info">
+                  <div className={`player ${game.current_turn === 'X' ? 'active' : ''}`}>
+                    <strong>{game.player_x.username}</strong> (X)
+                  </div>
+                  <div className={`player ${game.current_turn === 'O' ? 'active' : ''}`}>
+                    <strong>{game.player_o.username}</strong> (O)
+                  </div>
+                </div>
+              )}
+
+              <div className="game-status">{getGameStatus()}</div>
+
+              {game && (
+                <div className="game-board" style={{ '--board-size': room.board_size }}>
+                  {game.board.map((row, rowIndex) =>
+                    row.map((cell, colIndex) => (
+                      <button key={`${rowIndex}-${colIndex}`} className="game-cell" disabled>
+                        {cell}
+                      </button>
+                    ))
+                  )}
+                </div>
+              )}
+            </div>
+          )}
+        </div>
+      </div>
+    </div>
+  );
+}
+
+export default Spectate;
@@ -4,6 +4,8 @@ import axios from 'axios';
 
 function Stats({ user, onLogout }) {
   const [stats, setStats] = useState(null);
+  const [rank, setRank] = useState(null);
+  const [history, setHistory] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
 
@@ -13,8 +15,14 @@ function Stats({ user, onLogout }) {
 
   const fetchStats = async () => {
     try {
-      const response = await axios.get('/api/stats/');
+      const [response, rankResponse, historyResponse] = await Promise.all([
+        axios.get('/api/stats/'),
+        axios.get('/api/leaderboard/rank/'),
+        axios.get('/api/stats/history/?days=14')
+      ]);
       setStats(response.data);
+      setRank(rankResponse.data);
+      setHistory(historyResponse.data.results);
     } catch (error) {
       console.error('Ошибка загрузки статистики:', error);
       setError('Ошибка загрузки статистики');
@@ -151,8 +159,42 @@ function Stats({ user, onLogout }) {
                     <span>Процент побед:</span>
                     <strong style={{ color: getWinRateColor() }}>{getWinRate()}%</strong>
                   </div>
+                  {rank?.rank && (
+                    <div style={{ display: 'flex', justifyContent: 'space-between' }}>
+                      <span>Место в рейтинге:</span>
+                      <strong>{rank.rank} из {rank.total}</strong>
+                    </div>
+                  )}
                 </div>
               </div>
+
+              {history.length > 0 && (
+                <div className="card" style={{ marginTop: '2rem' }}>
+                  <h3 style={{ textAlign: 'center', marginBottom: '1rem' }}>Последние 14 дней</h3>
+                  <div style={{ display: 'grid', gap: '0.5rem' }}>
+                    <div style={{ display: 'flex', justifyContent: 'space-between', color: '#7f8c8d' }}>
+                      <span>День</span>
+                      <span>Игр · победы / поражения / ничьи · средняя партия</span>
+                    </div>
+                    {history.map(row => (
+                      <div key={row.period} style={{ display: 'flex', justifyContent: 'space-between' }}>
+                        <span>{new Date(row.period).toLocaleDateString(undefined, { timeZone: 'UTC' })}</span>
+                        <span>
+                          <strong>{row.games_played}</strong>
+                          {' · '}
+                          <span style={{ color: '#27ae60' }}>{row.wins}</span>
+                          {' / '}
+                          <span style={{ color: '#e74c3c' }}>{row.losses}</span>
+                          {' / '}
+                          <span style={{ color: '#f39c12' }}>{row.draws}</span>
+                          {' · '}
+                          {row.avg_duration !== null ? `${Math.round(row.avg_duration)} с` : '—'}
+                        </span>
+                      </div>
+                    ))}
+                  </div>
+                </div>
+              )}
             </>
           )}
           